@@ -1,6 +1,5 @@
 import os
 import sys
-import json
 import logging
 from flask import Flask
 from pathlib import Path
@@ -20,8 +19,66 @@ env_path = Path(".") / ".secret"
 load_dotenv(dotenv_path=env_path)
 SECRET_KEY = os.environ["SECRET_KEY"]
 
+# Set by web-lgsm.py for the gunicorn server it starts, shared by all of its
+# workers. Only set for real server runs.
+BOOT_ID_ENV = "WEB_LGSM_BOOT_ID"
 
-def main():
+
+def start_background(app):
+    """
+    Clears state shared between workers left over from the last server run
+    & starts this process' background threads.
+
+    Args:
+        app (Flask): App the threads run in the context of.
+    """
+    from .utils import shared_state, output_publisher, remove_output_spills
+
+    # All gunicorn workers of one server share a boot id, so only the first
+    # one to start wipes. No boot id (ex: debug server), nothing is wiped.
+    boot_id = os.environ.get(BOOT_ID_ENV)
+    if boot_id is not None and shared_state.reset(boot_id):
+        # Last run's workers' output spill files.
+        remove_output_spills()
+    output_publisher.start()
+
+    # Start background game server status monitor.
+    from .status_monitor import status_monitor
+
+    status_monitor.start(app)
+
+    # Start background system usage sampler.
+    from .system_sampler import system_sampler
+
+    system_sampler.start()
+
+    # Start background per game server resource usage collector.
+    from .server_metrics import server_metrics
+
+    server_metrics.start(app)
+
+    # Start background remote host usage sampler.
+    from .remote_metrics import remote_metrics
+
+    remote_metrics.start(app)
+
+    # Start background metrics history recorder.
+    from .metrics_recorder import metrics_recorder
+
+    metrics_recorder.start(app)
+
+
+def main(background=None):
+    """
+    Builds the app.
+
+    Args:
+        background (bool): Start background threads. Defaults to only when
+                           run by the gunicorn server web-lgsm.py starts.
+
+    Returns:
+        Flask: The app.
+    """
     # Setup logging.
     log_level_map = {
         "info": logging.INFO,        # General operational info.
@@ -78,10 +135,27 @@ def main():
     # Initialize DB.
     from .models import User, GameServer
 
+    from .db_setup import setup_engine
+
     with app.app_context():
+        setup_engine(db.engine)
         db.create_all()
         print(" * Database Loaded!")
 
+    # Background threads & the shared state reset only belong to a running
+    # server. CLI cmds (ex: --passwd) & tests call main() too, those must not
+    # wipe a live server's state or take its leases. Without the monitor
+    # thread, status lookups probe for themselves (see StatusMonitor.get()).
+    if background is None:
+        background = os.environ.get(BOOT_ID_ENV) is not None
+    if background:
+        start_background(app)
+
+    # Size the command job pool.
+    from .utils import configure_job_executor
+
+    configure_job_executor()
+
     # Setup LoginManager.
     login_manager = LoginManager()
 
@@ -90,14 +164,20 @@ def main():
     login_manager.login_message = None
     login_manager.init_app(app)
 
-    # Decorator to set up login session.
+    # Decorator to set up login session. Users come out of the user cache,
+    # so most requests don't touch the db for them.
+    from .utils import user_cache, permissions_cache
+
     @login_manager.user_loader
     def load_user(id):
-        return db.session.get(User, int(id))
+        return user_cache.get(
+            int(id), lambda user_id: db.session.get(User, user_id)
+        )
+
+    # Filter for jinja2 access to a user's compiled permissions.
 
-    # Filter for jinja2 json parsing for user permissions.
-    @app.template_filter("from_json")
-    def from_json_filter(s):
-        return json.loads(s)
+    @app.template_filter("permissions")
+    def permissions_filter(user):
+        return permissions_cache.get(user)
 
     return app
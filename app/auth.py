@@ -4,7 +4,11 @@ from . import db
 from pathlib import Path
 from datetime import timedelta
 from .models import User, GameServer
-from .utils import check_require_auth_setup_fields, valid_password
+from .utils import (
+    check_require_auth_setup_fields,
+    valid_password,
+    invalidate_user,
+)
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import (
     login_user,
@@ -114,6 +118,7 @@ def setup():
         )
         db.session.add(new_user)
         db.session.commit()
+        invalidate_user(new_user.id)
 
         flash("User created!")
         login_user(new_user, remember=True)
@@ -191,8 +196,10 @@ def edit_users():
                 )
                 return redirect(url_for("auth.edit_users"))
 
+            user_id = user_ident.id
             db.session.delete(user_ident)
             db.session.commit()
+            invalidate_user(user_id)
             flash(f"User {selected_user} deleted!")
             return redirect(url_for("auth.edit_users"))
 
@@ -329,11 +336,13 @@ def edit_users():
             user_ident.role = role
             user_ident.permissions = json.dumps(permissions)
             db.session.commit()
+            invalidate_user(user_ident.id)
             flash(f"User {username} Updated!")
             return redirect(url_for("auth.edit_users", username=username))
 
         user_ident.role = role
         user_ident.permissions = json.dumps(permissions)
         db.session.commit()
+        invalidate_user(user_ident.id)
         flash(f"User {username} Updated!")
         return redirect(url_for("auth.edit_users", username=username))
@@ -0,0 +1,364 @@
+import os
+import re
+import time
+import shlex
+import signal
+import threading
+import subprocess
+
+from flask import current_app
+
+from .utils import (
+    PATHS,
+    get_tmux_socket_name,
+    get_server_proc_info,
+    get_ssh_key_file,
+    should_use_ssh,
+    docker_cmd_build,
+    run_cmd_popen,
+    run_cmd_ssh,
+)
+
+# Lines of console history loaded when a console stream starts.
+CONSOLE_HISTORY = 200
+# Max seconds to wait for that history when a console stream starts.
+START_WAIT = 2
+# Seconds a viewer's lease lasts without being renewed.
+LEASE_TTL = 15
+# Seconds between checks for console streams with no viewers left.
+REAP_INTERVAL = 5
+# Max seconds to wait on stopping a docker install's follow cmd.
+DOCKER_STOP_TIMEOUT = 10
+
+
+def ere_escape(text):
+    """Escapes text for use as a literal in a POSIX extended regex."""
+    return re.sub(r"([.\[\]()*+?{}|^$\\])", r"\\\1", text)
+
+
+class ConsoleStream:
+    """
+    Class used to follow a game server's tmux console output. Attaches
+    `tmux pipe-pane` to the game server's session, writing pane output to
+    LGSM's console log, unless the pane is already piped (ex: LGSM's console
+    logging is on), then follows that log with `tail -F` in a daemon thread.
+    New console lines land in the stream's own ProcInfoVessel as they're
+    written, without re-reading the pane's history.
+
+    Works the same for local, docker, & ssh installs, the follow cmd is just
+    run through run_cmd_popen, docker exec, or run_cmd_ssh.
+
+    One stream is shared by every viewer of a game server's console, so the
+    cost of following a console stays the same no matter how many are
+    watching. Viewers subscribe, either for as long as an output stream
+    connection is open or with a lease that has to be renewed, and the
+    follow cmd is stopped once the last one is gone.
+
+    Args:
+        server (GameServer): Game server to follow console of.
+    """
+
+    def __init__(self, server):
+        self.server_name = server.install_name
+        self.proc_info = get_server_proc_info(f"{server.install_name}-console")
+        self.thread = None
+        # Docker installs' cmd to stop the follow cmd inside the container.
+        self.docker_stop_cmd = None
+        # Seq of the last console change copied by mirror_into().
+        self.mirror_seq = 0
+        # Holds viewer token -> lease expire time, None = until unsubscribed.
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, token, ttl=None):
+        """
+        Adds or renews a viewer.
+
+        Args:
+            token (str): Unique id of viewer.
+            ttl (float): Seconds until lease expires. None = until
+                         unsubscribe() is called.
+        """
+        with self._lock:
+            self._leases[token] = None if ttl == None else time.time() + ttl
+
+    def unsubscribe(self, token):
+        """Removes a viewer."""
+        with self._lock:
+            self._leases.pop(token, None)
+
+    def subscribers(self):
+        """Returns number of viewers, dropping expired leases."""
+        now = time.time()
+        with self._lock:
+            self._leases = {
+                token: expires
+                for token, expires in self._leases.items()
+                if expires == None or expires > now
+            }
+            return len(self._leases)
+
+    def tail_cmd(self, server):
+        """Builds cmd that follows game server's console log."""
+        log_dir = os.path.join(server.install_path, "log/console")
+        log_path = os.path.join(log_dir, f"{server.script_name}-console.log")
+        return [PATHS["tail"], "-n", str(CONSOLE_HISTORY), "-F", log_path]
+
+    def pipe_script(self, server, socket):
+        """
+        Builds shell script that pipes the game server's pane into its
+        console log, unless the pane is already piped (ex: by LGSM's own
+        console logging). `pipe-pane -o` isn't enough, it toggles an existing
+        pipe off.
+        """
+        log_path = self.tail_cmd(server)[-1]
+        tmux = [PATHS["tmux"], "-L", socket]
+        check_cmd = tmux + ["display", "-p", "-t", server.script_name, "#{pane_pipe}"]
+
+        pipe_cmd = f"exec {PATHS['cat']} >> {shlex.quote(log_path)}"
+        tmux_cmd = tmux + ["pipe-pane", "-t", server.script_name, pipe_cmd]
+
+        return (
+            f"mkdir -p {shlex.quote(os.path.dirname(log_path))} && "
+            f'{{ [ "$({shlex.join(check_cmd)})" = 1 ] || {shlex.join(tmux_cmd)}; }}'
+        )
+
+    def build_cmd(self, server, socket):
+        """Builds shell cmd that attaches pipe-pane & follows console log."""
+        script = (
+            f"{self.pipe_script(server, socket)} && "
+            f"exec {shlex.join(self.tail_cmd(server))}"
+        )
+        return ["/bin/sh", "-c", script]
+
+    def is_running(self):
+        return self.thread != None and self.thread.is_alive()
+
+    def start(self, server):
+        """
+        Starts following the console in a daemon thread.
+
+        Args:
+            server (GameServer): Game server to follow console of.
+
+        Returns:
+            bool: True if started, False if can't get game server's socket.
+        """
+        socket = get_tmux_socket_name(server)
+        if socket == None:
+            return False
+
+        cmd = self.build_cmd(server, socket)
+        app_context = current_app.app_context()
+
+        if should_use_ssh(server):
+            keyfile = get_ssh_key_file(server.username, server.install_host)
+            target = run_cmd_ssh
+            args = (
+                cmd,
+                server.install_host,
+                server.username,
+                keyfile,
+                self.proc_info,
+                app_context,
+            )
+        else:
+            if server.install_type == "docker":
+                cmd = docker_cmd_build(server) + cmd
+                # Matches the exec'd tail's exact cmdline, & nothing else.
+                pattern = ere_escape(" ".join(self.tail_cmd(server)))
+                self.docker_stop_cmd = docker_cmd_build(server) + [
+                    "pkill",
+                    "-x",
+                    "-f",
+                    pattern,
+                ]
+            target = run_cmd_popen
+            args = (cmd, self.proc_info, app_context)
+
+        # Follow cmd resets the vessel's output when it starts.
+        self.mirror_seq = 0
+        self.thread = threading.Thread(
+            target=target, args=args, daemon=True, name="Console"
+        )
+        self.thread.start()
+        return True
+
+    def wait_for_history(self, timeout=START_WAIT):
+        """Waits for initial console history or the follow cmd to fail."""
+        seq = self.proc_info.seq
+        remaining = timeout
+        while remaining > 0:
+            if len(self.proc_info.stdout) > 0 or not self.is_running():
+                break
+            self.proc_info.wait_for_change(seq, timeout=0.1)
+            seq = self.proc_info.seq
+            remaining -= 0.1
+
+    def stop(self):
+        """Stops the follow cmd, if it's running."""
+        if not self.is_running():
+            return
+
+        # Remote follow cmd, closing its channel ends the ssh output pump.
+        channel = self.proc_info.channel
+        if channel != None:
+            channel.close()
+            return
+
+        # Docker follow cmd, the local pid is sudo docker exec's. Killing it
+        # would leave tail running in the container.
+        if self.docker_stop_cmd != None:
+            try:
+                subprocess.run(
+                    self.docker_stop_cmd,
+                    capture_output=True,
+                    timeout=DOCKER_STOP_TIMEOUT,
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+            return
+
+        if self.proc_info.pid:
+            try:
+                os.kill(self.proc_info.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def failed(self):
+        """Returns True if follow cmd exited with an error."""
+        return not self.is_running() and (self.proc_info.exit_status or 0) > 0
+
+    def mirror_into(self, proc_info):
+        """
+        Copies console lines that are new since the last call into proc_info,
+        so /api/cmd-output?server= keeps serving console output like it did
+        with capture-pane. Only new lines are copied, unless the stream
+        restarted & reloaded its history, then proc_info is cleared first.
+
+        Args:
+            proc_info (ProcInfoVessel): Game server's command output vessel.
+        """
+        changes = self.proc_info.changes_since(self.mirror_seq)
+        if changes["reset"]:
+            proc_info.stdout.clear()
+            proc_info.stderr.clear()
+
+        proc_info.stdout.extend(changes["stdout"])
+        proc_info.stderr.extend(changes["stderr"])
+        self.mirror_seq = changes["seq"]
+
+
+# Holds install_name -> ConsoleStream.
+console_streams = {}
+console_streams_lock = threading.Lock()
+reaper_thread = None
+
+
+def get_console_stream(server, token, ttl=None):
+    """
+    Subscribes a viewer to the console stream for a game server, starting it
+    if it isn't already running. Newly started streams get a moment to load
+    history.
+
+    Args:
+        server (GameServer): Game server to get console stream for.
+        token (str): Unique id of viewer.
+        ttl (float): Seconds until viewer's lease expires. None = until
+                     unsubscribed.
+
+    Returns:
+        ConsoleStream: Console stream, or None if it couldn't be started.
+    """
+    start_reaper()
+
+    started = False
+    with console_streams_lock:
+        stream = console_streams.get(server.install_name)
+        if stream == None:
+            stream = ConsoleStream(server)
+            console_streams[server.install_name] = stream
+
+        stream.subscribe(token, ttl)
+
+        if not stream.is_running():
+            if not stream.start(server):
+                stream.unsubscribe(token)
+                return None
+            started = True
+
+    if started:
+        stream.wait_for_history()
+
+    return stream
+
+
+def find_console_stream(server_name):
+    """
+    Get's a game server's console stream without subscribing or starting it.
+
+    Args:
+        server_name (str): Name of game server.
+
+    Returns:
+        ConsoleStream: Console stream, or None if there isn't one.
+    """
+    with console_streams_lock:
+        return console_streams.get(server_name)
+
+
+def remove_console_stream(server_name):
+    """Stops & forgets console stream for a deleted game server."""
+    with console_streams_lock:
+        stream = console_streams.pop(server_name, None)
+
+    if stream != None:
+        stream.stop()
+        stream.proc_info.remove_spill()
+
+
+def reap_console_streams():
+    """Stops console streams that have no viewers left."""
+    with console_streams_lock:
+        streams = list(console_streams.values())
+
+    for stream in streams:
+        if stream.is_running() and stream.subscribers() == 0:
+            stream.stop()
+
+
+def start_reaper():
+    """Starts thread that reaps unwatched console streams, once per process."""
+    global reaper_thread
+
+    with console_streams_lock:
+        if reaper_thread and reaper_thread.is_alive():
+            return
+
+        def reap():
+            while True:
+                time.sleep(REAP_INTERVAL)
+                reap_console_streams()
+
+        reaper_thread = threading.Thread(
+            target=reap, daemon=True, name="ConsoleReaper"
+        )
+        reaper_thread.start()
+
+
+def console_stats():
+    """
+    Returns:
+        dict: Dictionary of game server names to console stream viewer count
+              & whether its follow cmd is running.
+    """
+    with console_streams_lock:
+        streams = list(console_streams.values())
+
+    return {
+        stream.server_name: {
+            "subscribers": stream.subscribers(),
+            "running": stream.is_running(),
+        }
+        for stream in streams
+    }
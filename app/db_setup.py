@@ -0,0 +1,55 @@
+from sqlalchemy import event
+
+# Milliseconds a connection waits on a locked database before giving up.
+# Long enough that the ansible connector's post install commit can outlast
+# concurrent web writes, instead of failing with "database is locked".
+BUSY_TIMEOUT = 30000
+
+# Applied to every new connection to app/database.db.
+SQLITE_PRAGMAS = (
+    # Readers don't block the writer & vice versa. Stored in the db file, so
+    # this only does work on the first connection. When run as root (ex: the
+    # ansible connector) SQLite gives the -wal & -shm files the db file's
+    # owner, so the web app can still write them.
+    "PRAGMA journal_mode=WAL",
+    # Safe with WAL, only fsyncs on checkpoints.
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT}",
+)
+
+
+def apply_pragmas(dbapi_conn, connection_record=None):
+    """
+    Applies SQLITE_PRAGMAS to a raw sqlite3 connection.
+
+    Args:
+        dbapi_conn (sqlite3.Connection): Connection to tune.
+        connection_record (object): Unused, passed by SQLAlchemy's connect
+                                    event.
+    """
+    cursor = dbapi_conn.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def setup_engine(engine):
+    """
+    Makes every connection an SQLAlchemy engine opens use SQLITE_PRAGMAS.
+    Used by both the web app & playbooks/ansible_connector.py, so they agree
+    on journal mode & lock waiting.
+
+    Args:
+        engine (Engine): SQLAlchemy engine for app/database.db.
+
+    Returns:
+        Engine: The same engine, for chaining.
+    """
+    if engine.dialect.name != "sqlite":
+        return engine
+
+    if not event.contains(engine, "connect", apply_pragmas):
+        event.listen(engine, "connect", apply_pragmas)
+    return engine
@@ -0,0 +1,114 @@
+import math
+
+# Numpy's optional, used when installed to speed up picking points.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def lttb_indices(xs, ys, threshold, use_numpy=True):
+    """
+    Picks which points to keep with Largest-Triangle-Three-Buckets. Keeps the
+    first & last points, splits the rest into threshold - 2 buckets, & keeps
+    the point of each bucket forming the largest triangle with the previous
+    kept point & the next bucket's average. Keeps peaks & dips that plain
+    averaging or every-Nth-point sampling would flatten.
+
+    Args:
+        xs (list): X values, ascending.
+        ys (list): Y values.
+        threshold (int): Number of points to keep.
+        use_numpy (bool): Use numpy if it's installed.
+
+    Returns:
+        list: Indexes of points to keep, ascending.
+    """
+    count = len(xs)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    if use_numpy and np != None:
+        return _lttb_numpy(xs, ys, threshold)
+    return _lttb_python(xs, ys, threshold)
+
+
+def _bucket_bounds(i, every, count):
+    """Returns (start, end) of bucket i & end of bucket i + 1."""
+    start = int(math.floor(i * every)) + 1
+    end = int(math.floor((i + 1) * every)) + 1
+    next_end = min(int(math.floor((i + 2) * every)) + 1, count)
+    return start, end, next_end
+
+
+def _lttb_python(xs, ys, threshold):
+    count = len(xs)
+    every = (count - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end, next_end = _bucket_bounds(i, every, count)
+
+        # Next bucket's average point, the last point for the last bucket.
+        span = next_end - end
+        avg_x = sum(xs[end:next_end]) / span
+        avg_y = sum(ys[end:next_end]) / span
+
+        max_area = -1
+        pick = start
+        for j in range(start, end):
+            area = abs(
+                (xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a])
+            )
+            if area > max_area:
+                max_area = area
+                pick = j
+        kept.append(pick)
+        a = pick
+
+    kept.append(count - 1)
+    return kept
+
+
+def _lttb_numpy(xs, ys, threshold):
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    count = len(xs)
+    every = (count - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end, next_end = _bucket_bounds(i, every, count)
+        avg_x = xs[end:next_end].mean()
+        avg_y = ys[end:next_end].mean()
+
+        areas = np.abs(
+            (xs[a] - avg_x) * (ys[start:end] - ys[a])
+            - (xs[a] - xs[start:end]) * (avg_y - ys[a])
+        )
+        a = start + int(areas.argmax())
+        kept.append(a)
+
+    kept.append(count - 1)
+    return kept
+
+
+def downsample(points, target, x="time", y="avg"):
+    """
+    Downsamples a series of point dicts with lttb_indices().
+
+    Args:
+        points (list): Point dicts, oldest first.
+        target (int): Max number of points to return.
+        x (str): Key of points' x value.
+        y (str): Key of points' y value.
+
+    Returns:
+        list: Kept point dicts, oldest first.
+    """
+    if len(points) <= target:
+        return points
+
+    xs = [point[x] for point in points]
+    ys = [point[y] for point in points]
+    return [points[i] for i in lttb_indices(xs, ys, target)]
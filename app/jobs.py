@@ -0,0 +1,405 @@
+import os
+import time
+import uuid
+import psutil
+import threading
+
+from collections import OrderedDict, deque
+
+
+class Job:
+    """
+    Class used to track a command run through the JobExecutor.
+
+    Args:
+        name (str): Name of job, ex: Install_Minecraft.
+        lane (str): Lane job runs in, "interactive" or "heavy".
+        host (str): Host the command runs against, for per host limits.
+        func (function): Function that does the work.
+        args (tuple): Arguments to pass to func.
+        proc_info (ProcInfoVessel): Vessel holding command's output, if any.
+        server_name (str): Game server job is for, if any. Output can be
+                           read from /api/cmd-output?server=server_name.
+    """
+
+    def __init__(self, name, lane, host, func, args, proc_info=None, server_name=None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.lane = lane
+        self.host = host
+        self.func = func
+        self.args = args
+        self.proc_info = proc_info
+        self.server_name = server_name
+
+        self.state = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.exit_status = None
+        self.error = None
+
+    def is_active(self):
+        return self.state in ("queued", "running")
+
+    def toJSON(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "lane": self.lane,
+            "host": self.host,
+            "server": self.server_name,
+            "state": self.state,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "exit_status": self.exit_status,
+            "error": self.error,
+            "pid": os.getpid(),
+        }
+
+    def __str__(self):
+        return f"Job({self.name}, {self.id}, {self.state})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class JobExecutor:
+    """
+    Class used to run commands on a bounded pool of worker threads, instead of
+    starting a new thread per button click. Jobs go into one of two lanes,
+    "interactive" for quick commands (start/stop/send) & "heavy" for long
+    running ones (install/update/backup), so a few big jobs can't hold up
+    everything else. Each lane has a fixed number of workers & no more than
+    host_limit of a lane's jobs run against the same host at once, so heavy
+    jobs on a host never hold up its interactive ones. Jobs queue when their
+    lane, or their lane's share of the host, is saturated.
+
+    Finished jobs are kept in the registry until there are more than
+    keep_finished of them. If given a SharedState, job state is also mirrored
+    there so every worker can see every worker's jobs.
+
+    Args:
+        interactive_workers (int): Max workers for the interactive lane.
+        heavy_workers (int): Max workers for the heavy lane.
+        host_limit (int): Max jobs per lane running against a single host.
+        keep_finished (int): Number of finished jobs to keep in registry.
+        shared (SharedState): Optional shared state to mirror jobs to.
+    """
+
+    LANES = ("interactive", "heavy")
+
+    # Seconds finished jobs are kept in the shared state.
+    SHARED_MAX_AGE = 3600
+
+    def __init__(
+        self,
+        interactive_workers=4,
+        heavy_workers=2,
+        host_limit=2,
+        keep_finished=100,
+        shared=None,
+    ):
+        self.limits = {"interactive": interactive_workers, "heavy": heavy_workers}
+        self.host_limit = host_limit
+        self.keep_finished = keep_finished
+        self.shared = shared
+
+        # Counters.
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        # Seconds recent jobs spent queued.
+        self.waits = deque(maxlen=100)
+        self.max_wait = 0
+
+        self._cond = threading.Condition()
+        self._queues = {lane: deque() for lane in self.LANES}
+        self._workers = {lane: 0 for lane in self.LANES}
+        self._idle = {lane: 0 for lane in self.LANES}
+        self._running = {lane: 0 for lane in self.LANES}
+        # Holds lane -> {host -> running job count}.
+        self._host_running = {lane: {} for lane in self.LANES}
+        # Holds job id -> Job, oldest first.
+        self._jobs = OrderedDict()
+
+    def set_limits(self, interactive_workers, heavy_workers, host_limit):
+        """Updates pool limits. Extra running workers exit as they go idle."""
+        with self._cond:
+            self.limits = {
+                "interactive": max(interactive_workers, 1),
+                "heavy": max(heavy_workers, 1),
+            }
+            self.host_limit = max(host_limit, 1)
+            self._cond.notify_all()
+
+    def submit(
+        self,
+        func,
+        *args,
+        name="Job",
+        lane="interactive",
+        host="localhost",
+        proc_info=None,
+        server_name=None,
+    ):
+        """
+        Queues func(*args) to run in lane.
+
+        Args:
+            func (function): Function that does the work.
+            name (str): Name of job.
+            lane (str): Lane to run in, "interactive" or "heavy".
+            host (str): Host the command runs against.
+            proc_info (ProcInfoVessel): Vessel holding command's output.
+            server_name (str): Game server job is for.
+
+        Returns:
+            Job: The queued job.
+        """
+        if lane not in self.LANES:
+            raise ValueError(f"Invalid lane: {lane}")
+
+        job = Job(name, lane, host, func, args, proc_info, server_name)
+        with self._cond:
+            self.submitted += 1
+            self._jobs[job.id] = job
+            self._queues[lane].append(job)
+            # Lets output viewers tell a queued cmd from a finished one.
+            if proc_info != None:
+                proc_info.queued += 1
+            self._prune()
+
+            # Only grow the lane if there aren't enough idle workers to take
+            # every queued job. Idle workers only stop counting as idle once
+            # they wake, so a burst of jobs can't all land on one of them.
+            queued = len(self._queues[lane])
+            if queued > self._idle[lane] and self._workers[lane] < self.limits[lane]:
+                self._workers[lane] += 1
+                worker = threading.Thread(
+                    target=self._work,
+                    args=(lane,),
+                    daemon=True,
+                    name=f"Worker_{lane}",
+                )
+                worker.start()
+
+            self._cond.notify_all()
+
+        self._share(job)
+        return job
+
+    def _share(self, job):
+        """Mirrors job's current state to the shared state, if there is one."""
+        if self.shared == None:
+            return
+
+        try:
+            self.shared.put("jobs", job.id, job.toJSON())
+            if not job.is_active():
+                self.shared.prune("jobs", self.SHARED_MAX_AGE)
+        except Exception:
+            # Shared copy is best effort, never fail the job over it.
+            pass
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.is_active()]
+        for job_id in finished[: max(len(finished) - self.keep_finished, 0)]:
+            del self._jobs[job_id]
+
+    def _next_job(self, lane):
+        """Pops the oldest queued job in lane whose host isn't saturated."""
+        if self._running[lane] >= self.limits[lane]:
+            return None
+
+        host_running = self._host_running[lane]
+        for job in self._queues[lane]:
+            if host_running.get(job.host, 0) < self.host_limit:
+                self._queues[lane].remove(job)
+                return job
+        return None
+
+    def _take(self, lane):
+        """Blocks until there's a job for lane, None if worker should exit."""
+        with self._cond:
+            while True:
+                if self._workers[lane] > self.limits[lane]:
+                    self._workers[lane] -= 1
+                    return None
+
+                job = self._next_job(lane)
+                if job != None:
+                    break
+
+                self._idle[lane] += 1
+                self._cond.wait()
+                self._idle[lane] -= 1
+
+            job.state = "running"
+            job.started_at = time.time()
+            wait = job.started_at - job.created_at
+            self.waits.append(wait)
+            self.max_wait = max(self.max_wait, wait)
+            self._running[lane] += 1
+            host_running = self._host_running[lane]
+            host_running[job.host] = host_running.get(job.host, 0) + 1
+
+            # Locked before it's unqueued, so viewers never see the job as
+            # neither queued nor running.
+            if job.proc_info != None:
+                job.proc_info.process_lock = True
+                job.proc_info.queued -= 1
+
+        self._share(job)
+        return job
+
+    def _work(self, lane):
+        while True:
+            job = self._take(lane)
+            if job == None:
+                return
+
+            result = None
+            try:
+                result = job.func(*job.args)
+            except Exception as e:
+                job.error = str(e)
+                # Cmd died before it could unlock its output.
+                if job.proc_info != None:
+                    job.proc_info.process_lock = False
+
+            with self._cond:
+                job.finished_at = time.time()
+                if job.proc_info != None:
+                    job.exit_status = job.proc_info.exit_status
+                elif isinstance(result, int) and not isinstance(result, bool):
+                    job.exit_status = result
+
+                if job.error == None and (job.exit_status or 0) == 0:
+                    job.state = "finished"
+                    self.completed += 1
+                else:
+                    job.state = "failed"
+                    self.failed += 1
+
+                self._running[lane] -= 1
+                host_running = self._host_running[lane]
+                host_running[job.host] -= 1
+                if host_running[job.host] == 0:
+                    del host_running[job.host]
+                self._cond.notify_all()
+
+            self._share(job)
+
+    def cancel(self, job_id):
+        """
+        Cancels a job that hasn't started yet.
+
+        Returns:
+            bool: True if job was cancelled, False if it's unknown or already
+                  started.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job == None or job.state != "queued":
+                return False
+
+            self._queues[job.lane].remove(job)
+            if job.proc_info != None:
+                job.proc_info.queued -= 1
+            job.state = "cancelled"
+            job.finished_at = time.time()
+            self.cancelled += 1
+
+        self._share(job)
+        return True
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self, name=None, active=False):
+        """
+        Returns list of jobs in registry, optionally filtered.
+
+        Args:
+            name (str): Only jobs with this name.
+            active (bool): Only queued & running jobs.
+        """
+        with self._cond:
+            return [
+                job
+                for job in self._jobs.values()
+                if (name == None or job.name == name)
+                and (not active or job.is_active())
+            ]
+
+    def registry(self, name=None, active=False):
+        """
+        Returns list of job dicts from every worker, or just this one if there
+        is no shared state. Active jobs of workers that have since died are
+        left out.
+
+        Args:
+            name (str): Only jobs with this name.
+            active (bool): Only queued & running jobs.
+        """
+        if self.shared == None:
+            return [job.toJSON() for job in self.jobs(name, active)]
+
+        try:
+            jobs = list(self.shared.items("jobs").values())
+        except Exception:
+            return [job.toJSON() for job in self.jobs(name, active)]
+
+        jobs.sort(key=lambda job: job["created_at"])
+        registry = []
+        for job in jobs:
+            if name != None and job["name"] != name:
+                continue
+
+            is_active = job["state"] in ("queued", "running")
+            # Worker that owned the job is gone, so is the job.
+            if is_active and not psutil.pid_exists(job["pid"]):
+                continue
+            if active and not is_active:
+                continue
+
+            registry.append(job)
+
+        return registry
+
+    def stats(self):
+        """
+        Returns:
+            dict: Dictionary of executor metrics, per lane queue depth,
+                  running & worker counts, per host running counts, & job
+                  queue wait times.
+        """
+        with self._cond:
+            waits = list(self.waits)
+            hosts = {}
+            for host_running in self._host_running.values():
+                for host, running in host_running.items():
+                    hosts[host] = hosts.get(host, 0) + running
+            return {
+                "lanes": {
+                    lane: {
+                        "limit": self.limits[lane],
+                        "workers": self._workers[lane],
+                        "running": self._running[lane],
+                        "queued": len(self._queues[lane]),
+                    }
+                    for lane in self.LANES
+                },
+                "host_limit": self.host_limit,
+                "hosts": hosts,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "avg_wait_ms": int(sum(waits) / len(waits) * 1000) if waits else 0,
+                "max_wait_ms": int(self.max_wait * 1000),
+            }
@@ -0,0 +1,219 @@
+import os
+import json
+import threading
+
+from .cmd_descriptor import CmdDescriptor
+
+
+class JsonRegistry:
+    """
+    Class used to keep the json/ data files loaded & indexed in memory.
+    Each file is parsed once & only re-read when its mtime, ctime, inode, or
+    size changes. On load, the raw lists are turned into lookup tables, so
+    validating user input is a dict or set lookup instead of a re-parse plus a
+    linear scan.
+
+    Tables built:
+        commands: Per game server script command list, with ctrl exemptions
+                  & the send cmd (if disabled) already removed, plus a short
+                  cmd -> CmdDescriptor index for each.
+        cfgs: Set of accepted cfg file names.
+        servers: Script name -> long name map & the reverse, unix friendly
+                 install dir name -> script name map.
+
+    Args:
+        json_dir (str): Path to directory holding the json files.
+    """
+
+    FILES = {
+        "commands": "commands.json",
+        "exemptions": "ctrl_exemptions.json",
+        "cfgs": "accepted_cfgs.json",
+        "servers": "game_servers.json",
+    }
+
+    # Table -> files it's built from.
+    TABLES = {
+        "commands": ("commands", "exemptions"),
+        "cfgs": ("cfgs",),
+        "servers": ("servers",),
+    }
+
+    SEND_CMD = "sd"
+
+    def __init__(self, json_dir):
+        self.json_dir = json_dir
+        self.loads = 0
+        self.errors = 0
+        # Holds table name -> (stat keys, table).
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.json_dir, self.FILES[name])
+
+    def _stat_key(self, name):
+        try:
+            stat = os.stat(self._path(name))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino, stat.st_size)
+
+    def _read(self, name):
+        with open(self._path(name), "r") as file:
+            return json.load(file)
+
+    def _table(self, table):
+        """
+        Returns table, rebuilding it first if any of its files changed.
+
+        Raises:
+            Exception: If a file is missing or can't be parsed. Nothing is
+                       cached in that case, so the next call tries again.
+        """
+        keys = tuple(self._stat_key(name) for name in self.TABLES[table])
+        with self._lock:
+            cached = self._tables.get(table)
+            if cached != None and cached[0] == keys:
+                return cached[1]
+
+            try:
+                built = getattr(self, f"_build_{table}")()
+            except Exception:
+                self.errors += 1
+                raise
+
+            self._tables[table] = (keys, built)
+            self.loads += 1
+            return built
+
+    def _build_commands(self):
+        json_data = self._read("commands")
+        exemptions_data = self._read("exemptions")
+
+        base = []
+        for short_cmd, long_cmd, description in zip(
+            json_data["short_cmds"], json_data["long_cmds"], json_data["descriptions"]
+        ):
+            cmd = CmdDescriptor()
+            cmd.long_cmd = long_cmd
+            cmd.short_cmd = short_cmd
+            cmd.description = description
+            base.append(cmd)
+
+        def build(exempt_short=(), exempt_long=()):
+            cmds = [
+                cmd
+                for cmd in base
+                if cmd.short_cmd not in exempt_short
+                and cmd.long_cmd not in exempt_long
+            ]
+            no_send = [cmd for cmd in cmds if cmd.short_cmd != self.SEND_CMD]
+            return {
+                send_cmd: (tuple(table), {cmd.short_cmd: cmd for cmd in table})
+                for send_cmd, table in ((True, cmds), (False, no_send))
+            }
+
+        # Game servers w/o exemptions all share the default tables.
+        tables = {None: build()}
+        for script_name, exempt in exemptions_data.items():
+            tables[script_name] = build(
+                set(exempt["short_cmds"]), set(exempt["long_cmds"])
+            )
+
+        return tables
+
+    def _build_cfgs(self):
+        accepted_cfgs = self._read("cfgs")["accepted_cfgs"]
+        return (tuple(accepted_cfgs), frozenset(accepted_cfgs))
+
+    def _build_servers(self):
+        json_data = self._read("servers")
+        servers = dict(zip(json_data["servers"], json_data["server_names"]))
+
+        # Long names as install dir names, see valid_server_name().
+        dir_names = {
+            full_name.replace(" ", "_").replace(":", ""): script_name
+            for script_name, full_name in servers.items()
+        }
+
+        return {
+            "servers": servers,
+            "by_dir_name": dir_names,
+        }
+
+    def _command_tables(self, script_name, send_cmd):
+        tables = self._table("commands")
+        # Only an explicit False disables the send cmd.
+        return tables.get(script_name, tables[None])[send_cmd != False]
+
+    def commands(self, script_name, send_cmd):
+        """
+        Args:
+            script_name (str): Game server script name, ex: mcserver.
+            send_cmd (bool): Whether or not the send cmd is enabled.
+
+        Returns:
+            tuple: CmdDescriptors for game server, in commands.json order.
+                   Shared, don't modify them.
+        """
+        return self._command_tables(script_name, send_cmd)[0]
+
+    def command(self, script_name, send_cmd, short_cmd):
+        """
+        Returns:
+            CmdDescriptor: Command for short_cmd, None if it isn't a valid
+                           command for game server.
+        """
+        try:
+            return self._command_tables(script_name, send_cmd)[1].get(short_cmd)
+        except TypeError:
+            # Unhashable garbage input.
+            return None
+
+    def accepted_cfgs(self):
+        """
+        Returns:
+            tuple: Accepted cfg file names, in accepted_cfgs.json order.
+        """
+        return self._table("cfgs")[0]
+
+    def is_accepted_cfg(self, cfg_file):
+        try:
+            return cfg_file in self._table("cfgs")[1]
+        except TypeError:
+            return False
+
+    def servers(self):
+        """
+        Returns:
+            dict: Script name -> long name of every installable game server.
+                  Shared, don't modify it.
+        """
+        return self._table("servers")["servers"]
+
+    def script_name_for_dir(self, dir_name):
+        """
+        Returns script name for a long name turned install dir name, ex:
+        Action_Half-Life -> ahlserver. None if unknown.
+        """
+        try:
+            return self._table("servers")["by_dir_name"].get(dir_name)
+        except TypeError:
+            return None
+
+    def invalidate(self):
+        with self._lock:
+            self._tables.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Dictionary of registry load & error counters.
+        """
+        with self._lock:
+            return {
+                "loads": self.loads,
+                "errors": self.errors,
+                "tables": sorted(self._tables),
+            }
@@ -0,0 +1,87 @@
+import re
+import codecs
+
+# Line terminators, CRLF counts as one newline.
+LINE_END = re.compile(r"\r\n|\r|\n")
+
+
+class LineAssembler:
+    """
+    Class used to turn a stream of raw output chunks into lines. Keeps an
+    incremental UTF-8 decoder so multibyte characters split across reads
+    decode properly & carries partial lines over to the next chunk.
+
+    Lines keep their terminator. Lines ended by a bare carriage return (ex:
+    progress bars) end in "\\r", everything else ends in "\\n". Empty lines are
+    dropped.
+
+    Args:
+        end_in_newlines (bool): Add a newline to "\\r" ended lines too. Old
+                                style output setting from main.conf.
+        max_line (int): Partial lines longer than this are emitted as is, so
+                        output with no line breaks can't grow without bound.
+    """
+
+    def __init__(self, end_in_newlines=False, max_line=65536):
+        self.end_in_newlines = end_in_newlines
+        self.max_line = max_line
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buf = ""
+
+    def _terminate(self, line, end):
+        line += end
+        if self.end_in_newlines and not line.endswith("\n"):
+            line += "\n"
+        return line
+
+    def _split(self, final):
+        buf = self._buf
+        limit = len(buf)
+        # Trailing CR might be the first half of a CRLF, wait for more.
+        if not final and buf.endswith("\r"):
+            limit -= 1
+
+        lines = []
+        pos = 0
+        for match in LINE_END.finditer(buf, 0, limit):
+            line = buf[pos : match.start()]
+            pos = match.end()
+            if line == "":
+                continue
+            end = "\r" if match.group() == "\r" else "\n"
+            lines.append(self._terminate(line, end))
+
+        rest = buf[pos:]
+        if rest and (final or len(rest) > self.max_line):
+            rest = rest.rstrip("\r")
+            if rest:
+                lines.append(self._terminate(rest, "\n"))
+            rest = ""
+
+        self._buf = rest
+        return lines
+
+    def feed(self, chunk):
+        """
+        Feeds raw chunk of output in.
+
+        Args:
+            chunk (bytes|str): Next piece of output.
+
+        Returns:
+            list: Lines completed by this chunk.
+        """
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self._buf += chunk
+        return self._split(False)
+
+    def flush(self):
+        """
+        Ends the stream.
+
+        Returns:
+            list: Any remaining partial line.
+        """
+        self._buf += self._decoder.decode(b"", final=True)
+        return self._split(True)
@@ -0,0 +1,184 @@
+import time
+import sqlite3
+import threading
+
+from .models import GameServer
+from .utils import metrics_store, shared_state, log_wrap
+from .metrics_store import RAW_INTERVAL
+from .system_sampler import system_sampler
+from .server_metrics import server_metrics, LOCAL_INSTALL_TYPES
+from .remote_metrics import remote_metrics
+
+# Seconds between compactions of the metrics store.
+COMPACT_INTERVAL = 600
+
+# Host metric name -> (section, key) in a system usage sample.
+HOST_METRICS = {
+    "cpu_usage": ("cpu", "cpu_usage"),
+    "mem_percent": ("mem", "percent_used"),
+    "disk_percent": ("disk", "percent_used"),
+    "bytes_sent_rate": ("network", "bytes_sent_rate"),
+    "bytes_recv_rate": ("network", "bytes_recv_rate"),
+}
+
+# Game server metric names, keys of a server_metrics entry.
+SERVER_METRICS = ("cpu_percent", "rss")
+
+
+def series_name(source, metric):
+    """
+    Args:
+        source (str): "local", "host:HOSTNAME", or "server:ID".
+        metric (str): Metric name.
+
+    Returns:
+        str: Series name in the metrics store.
+    """
+    return f"{source}.{metric}"
+
+
+def host_points(source, sample):
+    """Returns list of (series, time, value) for a system usage sample."""
+    return [
+        (series_name(source, metric), sample["time"], sample[section][key])
+        for metric, (section, key) in HOST_METRICS.items()
+    ]
+
+
+def server_points(source, entry):
+    """Returns list of (series, time, value) for a server_metrics entry."""
+    return [
+        (series_name(source, metric), entry["checked_at"], entry[metric])
+        for metric in SERVER_METRICS
+        if entry.get(metric) != None
+    ]
+
+
+class MetricsRecorder:
+    """
+    Class used to copy the latest local host, remote host, & game server
+    metrics into the metrics store every RAW_INTERVAL seconds. Samples
+    already recorded (ex: remote hosts are only sampled every 15s) are
+    skipped by their timestamps. Only one worker records at a time.
+
+    Args:
+        store (MetricsStore): Store to write to.
+        interval (float): Seconds between recordings.
+        shared (SharedState): Optional state shared with other workers.
+    """
+
+    # Seconds the recording lease lasts without being renewed.
+    LEASE_TTL = 60
+
+    def __init__(self, store, interval=RAW_INTERVAL, shared=None):
+        self.store = store
+        self.interval = interval
+        self.shared = shared
+        self.app = None
+        self.thread = None
+        self.leader = False
+        self.errors = 0
+        self.last_compact = 0
+
+        # Holds source -> time of its last recorded sample.
+        self._recorded = {}
+
+    def fresh(self, source, sample_time):
+        """True if source's sample at sample_time isn't recorded yet."""
+        if sample_time == None or self._recorded.get(source) == sample_time:
+            return False
+        self._recorded[source] = sample_time
+        return True
+
+    def collect(self):
+        """Gathers points not yet recorded. Needs an app context."""
+        sample = system_sampler.latest()
+        points = []
+        if self.fresh("local", sample.get("time")):
+            points += host_points("local", sample)
+
+        servers = GameServer.query.filter_by(install_finished=True).all()
+        hosts = {
+            server.install_host for server in servers if server.install_type == "remote"
+        }
+        for host in hosts:
+            sample = remote_metrics.latest(host)
+            source = f"host:{host}"
+            if sample != None and self.fresh(source, sample["time"]):
+                points += host_points(source, sample)
+
+        for server in servers:
+            if server.install_type not in LOCAL_INSTALL_TYPES:
+                continue
+            entry = server_metrics.get(server.id)
+            source = f"server:{server.id}"
+            if entry == None or not entry["running"]:
+                continue
+            if self.fresh(source, entry["checked_at"]):
+                points += server_points(source, entry)
+        return points
+
+    def record(self, now=None):
+        """Writes fresh points & compacts when due. Needs an app context."""
+        now = now or time.time()
+        points = self.collect()
+        if points:
+            self.store.write(points)
+
+        if now - self.last_compact >= COMPACT_INTERVAL:
+            self.store.compact(now)
+            self.last_compact = now
+
+    def forget_server(self, server_id):
+        """Deletes a deleted game server's history."""
+        source = f"server:{server_id}"
+        self._recorded.pop(source, None)
+        self.store.delete([series_name(source, metric) for metric in SERVER_METRICS])
+
+    def is_leader(self):
+        """Takes or renews the recording lease, True if this worker has it."""
+        if self.shared == None:
+            return True
+
+        try:
+            self.leader = self.shared.acquire_lease("metrics_recorder", self.LEASE_TTL)
+        except sqlite3.Error:
+            self.leader = False
+        return self.leader
+
+    def run(self):
+        while True:
+            if self.is_leader():
+                try:
+                    with self.app.app_context():
+                        self.record()
+                except Exception as e:
+                    self.errors += 1
+                    self.app.logger.info(log_wrap("metrics recorder error", e))
+            time.sleep(self.interval)
+
+    def start(self, app):
+        """Starts the recording thread once per process."""
+        if self.thread and self.thread.is_alive():
+            return
+
+        self.app = app
+        self.thread = threading.Thread(
+            target=self.run, daemon=True, name="MetricsRecorder"
+        )
+        self.thread.start()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Dictionary of recorder & store counters.
+        """
+        return dict(
+            self.store.stats(),
+            errors=self.errors,
+            leader=self.leader,
+            sources=len(self._recorded),
+        )
+
+
+metrics_recorder = MetricsRecorder(metrics_store, shared=shared_state)
@@ -0,0 +1,193 @@
+import os
+import time
+import sqlite3
+import threading
+
+# Seconds between raw samples.
+RAW_INTERVAL = 10
+
+# (Bucket seconds, seconds kept) per resolution, finest first. 0 is raw.
+RESOLUTIONS = (
+    (0, 6 * 3600),
+    (60, 2 * 86400),
+    (900, 35 * 86400),
+    (3600, 400 * 86400),
+)
+
+# Default max points per series returned by a range query.
+MAX_POINTS = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    series TEXT NOT NULL,
+    res INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    lo REAL NOT NULL,
+    hi REAL NOT NULL,
+    total REAL NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (series, res, ts)
+) WITHOUT ROWID;
+"""
+
+# Merges a value into an existing bucket.
+UPSERT = """
+INSERT INTO points VALUES (?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT (series, res, ts) DO UPDATE SET
+    lo = min(lo, excluded.lo),
+    hi = max(hi, excluded.hi),
+    total = total + excluded.total,
+    n = n + 1
+"""
+
+
+class MetricsStore:
+    """
+    Class used to keep metrics history in its own SQLite db, apart from
+    app/database.db so metrics writes never contend with the web app's.
+
+    Each write lands as a raw point & is merged into its 1 minute, 15 minute,
+    & 1 hour buckets in the same transaction, so rollups are always current
+    & never need a separate pass. Buckets keep min, max, sum, & count, so
+    their averages are exact. compact() drops each resolution's points past
+    its retention. Range queries pick the finest resolution that still
+    covers the range in at most max_points points per series.
+
+    Args:
+        path (str): Path to SQLite db file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        # Counters.
+        self.writes = 0
+        self.points = 0
+        self.compactions = 0
+        self.last_write_ms = 0
+
+    def _conn(self):
+        """Returns this thread's connection, creating the db if needed."""
+        conn = getattr(self._local, "conn", None)
+        if conn != None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def write(self, points):
+        """
+        Stores points & rolls them up.
+
+        Args:
+            points (list): List of (series name, unix time, value).
+        """
+        start = time.perf_counter()
+        rows = []
+        for series, ts, value in points:
+            ts = int(ts)
+            value = float(value)
+            for res, _ in RESOLUTIONS:
+                bucket = ts - ts % res if res else ts
+                rows.append((series, res, bucket, value, value, value))
+
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(UPSERT, rows)
+
+        self.writes += 1
+        self.points += len(points)
+        self.last_write_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    def compact(self, now=None):
+        """Deletes points older than their resolution's retention."""
+        now = now or time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for res, retention in RESOLUTIONS:
+                conn.execute(
+                    "DELETE FROM points WHERE res = ? AND ts < ?",
+                    (res, int(now - retention)),
+                )
+        self.compactions += 1
+
+    def delete(self, series):
+        """Deletes all points of the given series names."""
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "DELETE FROM points WHERE series = ?", [(name,) for name in series]
+            )
+
+    def pick_resolution(self, start, end, max_points=MAX_POINTS, now=None):
+        """
+        Picks the finest resolution that still has points back to start &
+        covers start to end in at most max_points points.
+
+        Returns:
+            int: Bucket seconds, 0 for raw.
+        """
+        now = now or time.time()
+        for res, retention in RESOLUTIONS:
+            if start < now - retention:
+                continue
+            if (end - start) / (res or RAW_INTERVAL) <= max_points:
+                return res
+        return RESOLUTIONS[-1][0]
+
+    def query(self, series, start, end, max_points=MAX_POINTS, now=None):
+        """
+        Reads points of several series between start & end.
+
+        Args:
+            series (list): Series names.
+            start (float): Unix time to read from.
+            end (float): Unix time to read to.
+            max_points (int): Max points per series.
+            now (float): Current unix time, defaults to now.
+
+        Returns:
+            dict: {"resolution": seconds per point, "series": {name: list of
+                  {"time", "min", "max", "avg"} dicts, oldest first}}.
+        """
+        res = self.pick_resolution(start, end, max_points, now)
+        first = int(start) - int(start) % res if res else int(start)
+        placeholders = ", ".join("?" * len(series))
+        rows = self._conn().execute(
+            "SELECT series, ts, lo, hi, total, n FROM points "
+            f"WHERE series IN ({placeholders}) AND res = ? AND ts BETWEEN ? AND ? "
+            "ORDER BY series, ts",
+            (*series, res, first, int(end)),
+        )
+
+        results = {name: [] for name in series}
+        for name, ts, lo, hi, total, n in rows:
+            results[name].append({"time": ts, "min": lo, "max": hi, "avg": total / n})
+        return {"resolution": res or RAW_INTERVAL, "series": results}
+
+    def stats(self):
+        """
+        Returns:
+            dict: Dictionary of write counters & db size.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+
+        return {
+            "writes": self.writes,
+            "points": self.points,
+            "compactions": self.compactions,
+            "last_write_ms": self.last_write_ms,
+            "db_bytes": size,
+        }
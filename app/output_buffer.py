@@ -0,0 +1,233 @@
+import os
+import json
+import bisect
+
+
+def read_spilled(path, before, limit):
+    """
+    Reads up to limit (seq, line) records with seq lower than before from
+    the end of a spill file. Records are in seq order, so the end
+    offset is found by binary search & only the needed tail is read.
+    """
+    try:
+        spill_file = open(path, "rb")
+    except FileNotFoundError:
+        return []
+
+    with spill_file:
+        spill_file.seek(0, os.SEEK_END)
+        lo, hi = 0, spill_file.tell()
+
+        # Find offset of the first record with seq >= before.
+        while lo < hi:
+            mid = (lo + hi) // 2
+            # Skip to the first record starting at or after mid.
+            if mid > 0:
+                spill_file.seek(mid - 1)
+                spill_file.readline()
+            else:
+                spill_file.seek(0)
+            record_start = spill_file.tell()
+            record = spill_file.readline()
+            if not record or json.loads(record)[0] >= before:
+                hi = mid
+            else:
+                lo = record_start + len(record)
+        end = lo
+
+        # Read backwards from end until there are enough records.
+        start = end
+        chunk = b""
+        while start > 0 and chunk.count(b"\n") <= limit:
+            step = min(8192, start)
+            start -= step
+            spill_file.seek(start)
+            chunk = spill_file.read(step) + chunk
+
+        records = chunk.splitlines()
+        # First record is partial unless chunk starts at file start.
+        if start > 0:
+            records = records[1:]
+
+    return [tuple(json.loads(record)) for record in records[-limit:]]
+
+
+class OutputBuffer:
+    """
+    Class used to hold a bounded window of output lines for a ProcInfoVessel.
+    Every appended line is numbered with the vessel's seq counter. Once the
+    in memory lines go over max_lines or max_bytes, the oldest segment is
+    evicted and, if the buffer has a spill_path, appended to that file so it
+    can still be paged back through with history(). Memory use stays flat no
+    matter how much output a process produces.
+
+    Supports the list operations the rest of the app uses on output (append,
+    clear, len, iteration, indexing, & in).
+
+    Args:
+        vessel (ProcInfoVessel): Vessel this output belongs to.
+        max_lines (int): Max lines held in memory.
+        max_bytes (int): Max bytes of output held in memory.
+        spill_path (str): Optional file to spill evicted lines to. Evicted
+                          lines are dropped if not set.
+    """
+
+    # Evict down to this fraction of the caps, so spills happen in segments.
+    LOW_WATER = 0.75
+
+    def __init__(self, vessel, max_lines=5000, max_bytes=1048576, spill_path=None):
+        self.vessel = vessel
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+
+        self._lines = []
+        self._seqs = []
+        self._sizes = []
+        self._bytes = 0
+        # Number of lines evicted from memory since last clear.
+        self.evicted = 0
+        # Seq number of the newest line evicted since last clear, 0 if none.
+        self.evicted_seq = 0
+
+    def append(self, line):
+        with self.vessel.cond:
+            size = len(line.encode("utf-8", "replace"))
+            self._lines.append(line)
+            self._seqs.append(self.vessel.bump())
+            self._sizes.append(size)
+            self._bytes += size
+
+            if len(self._lines) > self.max_lines or self._bytes > self.max_bytes:
+                self._evict()
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def clear(self):
+        with self.vessel.cond:
+            self._lines.clear()
+            self._seqs.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self.evicted = 0
+            self.evicted_seq = 0
+            self.vessel.reset_seq = self.vessel.bump()
+
+    def _evict(self):
+        """Evicts oldest segment of lines, spilling it to disk if enabled."""
+        max_lines = int(self.max_lines * self.LOW_WATER)
+        max_bytes = int(self.max_bytes * self.LOW_WATER)
+
+        count = 0
+        freed = 0
+        remaining = len(self._lines)
+        while remaining > 0 and (
+            remaining > max_lines or self._bytes - freed > max_bytes
+        ):
+            freed += self._sizes[count]
+            count += 1
+            remaining -= 1
+
+        if count == 0:
+            return
+
+        if self.spill_path:
+            self._spill(self._seqs[:count], self._lines[:count])
+
+        self.evicted_seq = self._seqs[count - 1]
+
+        del self._lines[:count]
+        del self._seqs[:count]
+        del self._sizes[:count]
+        self._bytes -= freed
+        self.evicted += count
+
+    def _spill(self, seqs, lines):
+        os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+
+        # Spill file starts over with the first spill after a clear, so it
+        # never mixes in output from an earlier run.
+        mode = "a" if self.evicted > 0 else "w"
+        with open(self.spill_path, mode) as spill_file:
+            for seq, line in zip(seqs, lines):
+                spill_file.write(json.dumps([seq, line]) + "\n")
+
+    def since(self, seq):
+        """Returns list of in memory lines appended after seq number seq."""
+        with self.vessel.cond:
+            return self._lines[bisect.bisect_right(self._seqs, seq) :]
+
+    def records_since(self, seq):
+        """Returns list of (seq, line) of in memory lines appended after seq."""
+        with self.vessel.cond:
+            index = bisect.bisect_right(self._seqs, seq)
+            return list(zip(self._seqs[index:], self._lines[index:]))
+
+    @property
+    def first_seq(self):
+        """Seq number of the oldest line in memory, None if empty."""
+        with self.vessel.cond:
+            return self._seqs[0] if self._seqs else None
+
+    def history(self, before=None, limit=200):
+        """
+        Pages back through output, including lines spilled to disk.
+
+        Args:
+            before (int): Only return lines with seq numbers lower than this.
+                          Defaults to all lines.
+            limit (int): Max number of lines to return.
+
+        Returns:
+            tuple: (lines, seq number of the first line returned or None).
+                   Pass that seq as before to get the previous page.
+        """
+        with self.vessel.cond:
+            if before == None:
+                before = self.vessel.seq + 1
+
+            index = bisect.bisect_left(self._seqs, before)
+            start = max(index - limit, 0)
+            lines = self._lines[start:index]
+            seqs = self._seqs[start:index]
+            evicted = self.evicted
+
+            needed = limit - len(lines)
+            if needed > 0 and evicted > 0 and self.spill_path:
+                if seqs:
+                    before = seqs[0]
+                spilled = read_spilled(self.spill_path, before, needed)
+                seqs = [seq for seq, line in spilled] + seqs
+                lines = [line for seq, line in spilled] + lines
+
+        if not seqs:
+            return [], None
+        return lines, seqs[0]
+
+    def remove_spill(self):
+        """Deletes the spill file, if there is one."""
+        if self.spill_path and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(list(self._lines))
+
+    def __getitem__(self, index):
+        return self._lines[index]
+
+    def __contains__(self, line):
+        return line in self._lines
+
+    def __eq__(self, other):
+        return list(self._lines) == list(other)
+
+    def __str__(self):
+        return str(self._lines)
+
+    def __repr__(self):
+        return str(self._lines)
@@ -0,0 +1,118 @@
+import json
+import threading
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class UserPermissions:
+    """
+    Immutable, parsed copy of a user's permissions json. Server & control
+    lists are frozensets so access checks are set lookups.
+    """
+
+    admin: bool = False
+    install_servers: bool = False
+    add_servers: bool = False
+    mod_settings: bool = False
+    edit_cfgs: bool = False
+    delete_server: bool = False
+    servers: frozenset = frozenset()
+    controls: frozenset = frozenset()
+
+    def has_server(self, server_name):
+        return self.admin or server_name in self.servers
+
+    def has_control(self, long_cmd):
+        return self.admin or long_cmd in self.controls
+
+
+def compile_permissions(role, permissions):
+    """
+    Builds a UserPermissions from a user's role & permissions json.
+
+    Args:
+        role (str): User's role, "admin" or "user".
+        permissions (str): User's permissions json.
+
+    Returns:
+        UserPermissions: Compiled permissions. Missing flags default to False.
+    """
+    if role == "admin":
+        return UserPermissions(admin=True)
+
+    user_perms = json.loads(permissions or "{}")
+    return UserPermissions(
+        install_servers=bool(user_perms.get("install_servers", False)),
+        add_servers=bool(user_perms.get("add_servers", False)),
+        mod_settings=bool(user_perms.get("mod_settings", False)),
+        edit_cfgs=bool(user_perms.get("edit_cfgs", False)),
+        delete_server=bool(user_perms.get("delete_server", False)),
+        servers=frozenset(user_perms.get("servers", [])),
+        controls=frozenset(user_perms.get("controls", [])),
+    )
+
+
+class PermissionsCache:
+    """
+    Class used to keep compiled permissions per user, so the permissions json
+    isn't parsed again on every request. Entries are keyed by user id & are
+    only reused while the user's role & permissions json (the version) are
+    unchanged, so a stale entry is never served even if another worker edited
+    the user. Routes that change permissions also invalidate the user.
+    """
+
+    def __init__(self):
+        # Counters.
+        self.hits = 0
+        self.misses = 0
+
+        # Holds user id -> (role, permissions json, UserPermissions).
+        self._perms = {}
+        self._lock = threading.Lock()
+
+    def get(self, user):
+        """
+        Args:
+            user (User): User to get permissions for.
+
+        Returns:
+            UserPermissions: User's compiled permissions.
+        """
+        user_id = getattr(user, "id", None)
+        # Users not in the db yet can't be told apart, so don't cache.
+        if user_id == None:
+            return compile_permissions(user.role, user.permissions)
+
+        version = (user.role, user.permissions)
+        with self._lock:
+            cached = self._perms.get(user_id)
+            if cached != None and cached[:2] == version:
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+
+        perms = compile_permissions(user.role, user.permissions)
+        with self._lock:
+            self._perms[user_id] = version + (perms,)
+        return perms
+
+    def invalidate(self, user_id=None):
+        """Drops cached permissions for a user, or everyone if no id given."""
+        with self._lock:
+            if user_id == None:
+                self._perms.clear()
+            else:
+                self._perms.pop(user_id, None)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Dictionary of permissions cache counters.
+        """
+        with self._lock:
+            return {
+                "users": len(self._perms),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
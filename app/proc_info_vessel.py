@@ -1,30 +1,187 @@
 import json
+import time
+import uuid
+import threading
+
+from .output_buffer import OutputBuffer
 
 
 class ProcInfoVessel:
     """
     Class used to create objects that hold information about processes launched
     via the subprocess Popen wrapper.
+
+    Every change (new output line, output cleared, lock or exit status set)
+    bumps the vessel's seq number & wakes anyone in wait_for_change().
     """
 
-    def __init__(self):
+    def __init__(self, max_lines=5000, max_bytes=1048576, spill_path=None):
         """
         Args:
-            stdout (list): Lines of stdout delivered by subprocess.Popen call.
-            stderr (list): Lines of stderr delivered by subprocess.Popen call.
+            max_lines (int): Max lines of stdout & of stderr held in memory.
+            max_bytes (int): Max bytes of stdout & of stderr held in memory.
+            spill_path (str): Optional base path to spill output evicted from
+                              memory to, as <spill_path>-stdout.log &
+                              <spill_path>-stderr.log.
+
+        Attributes:
+            stdout (OutputBuffer): Lines of stdout delivered by subprocess.Popen call.
+            stderr (OutputBuffer): Lines of stderr delivered by subprocess.Popen call.
             process_lock (bool): Acts as lock to tell if process is still
                                  running and output is being appended.
+            queued (int): Number of jobs waiting in the JobExecutor to run
+                          with this vessel.
             pid (int): Process id.
             exit_status (int): Exit status of cmd in Popen call.
+            seq (int): Sequence number of the latest change.
+            changed_at (float): Time of the latest change.
+            reset_seq (int): Sequence number output was last cleared at.
+            token (str): Unique id of this vessel, used in ETags so seq
+                         numbers from different vessels never match.
+            last_output_at (float): Time the last chunk of output was read.
+            channel (paramiko.Channel): Channel of running remote cmd, if any.
         """
-        self.stdout = []
-        self.stderr = []
-        self.process_lock = None
+        self.cond = threading.Condition()
+        self.token = uuid.uuid4().hex
+        self.seq = 0
+        self.changed_at = 0
+        self.reset_seq = 0
+        self.stdout = OutputBuffer(
+            self, max_lines, max_bytes, spill_path and f"{spill_path}-stdout.log"
+        )
+        self.stderr = OutputBuffer(
+            self, max_lines, max_bytes, spill_path and f"{spill_path}-stderr.log"
+        )
+        self._process_lock = None
+        self._queued = 0
         self.pid = None
-        self.exit_status = None
+        self._exit_status = None
+        self.last_output_at = None
+        self.channel = None
+
+    def bump(self):
+        """Bumps seq number & wakes waiters. Returns new seq number."""
+        with self.cond:
+            self.seq += 1
+            self.changed_at = time.time()
+            self.cond.notify_all()
+            return self.seq
+
+    @property
+    def process_lock(self):
+        return self._process_lock
+
+    @process_lock.setter
+    def process_lock(self, value):
+        with self.cond:
+            self._process_lock = value
+            self.bump()
+
+    @property
+    def queued(self):
+        return self._queued
+
+    @queued.setter
+    def queued(self, value):
+        with self.cond:
+            self._queued = value
+            self.bump()
+
+    @property
+    def exit_status(self):
+        return self._exit_status
+
+    @exit_status.setter
+    def exit_status(self, value):
+        with self.cond:
+            self._exit_status = value
+            self.bump()
+
+    def wait_for_change(self, seq, timeout=None):
+        """
+        Blocks until the vessel changes past seq number seq.
+
+        Args:
+            seq (int): Last seq number the caller has seen.
+            timeout (float): Max seconds to wait.
+
+        Returns:
+            bool: True if there are changes past seq, False on timeout.
+        """
+        with self.cond:
+            return self.cond.wait_for(lambda: self.seq != seq, timeout)
+
+    def changes_since(self, seq):
+        """
+        Get's everything that changed after seq number seq. If the output was
+        cleared since then (or seq is from some other vessel) reset is True
+        and all current output is returned. If lines newer than seq were
+        evicted from memory before the caller saw them, truncated is True &
+        the missed lines can be paged through with /api/cmd-output-history.
+
+        Args:
+            seq (int): Last seq number the caller has seen.
+
+        Returns:
+            dict: New seq, reset & truncated flags, new stdout & stderr
+                  lines, and current process_lock, queued, exit_status, &
+                  last_output_at.
+        """
+        with self.cond:
+            reset = seq < self.reset_seq or seq > self.seq
+            if seq > self.seq:
+                seq = 0
+
+            # Lines seen by the caller, evicted ones past that were missed.
+            seen = self.reset_seq if reset else seq
+            evicted_seq = max(self.stdout.evicted_seq, self.stderr.evicted_seq)
+
+            return {
+                "seq": self.seq,
+                "reset": reset,
+                "truncated": seen < evicted_seq,
+                "evicted_seq": evicted_seq,
+                "stdout": self.stdout.since(seq),
+                "stderr": self.stderr.since(seq),
+                "process_lock": self._process_lock,
+                "queued": self._queued,
+                "exit_status": self._exit_status,
+                "last_output_at": self.last_output_at,
+            }
+
+    def history(self, stream, before=None, limit=200):
+        """
+        Pages back through stream's output, see OutputBuffer.history().
+
+        Args:
+            stream (str): "stdout" or "stderr".
+            before (int): Only return lines with seq numbers lower than this.
+            limit (int): Max number of lines to return.
+
+        Returns:
+            tuple: (lines, seq number of the first line returned or None).
+        """
+        return getattr(self, stream).history(before, limit)
+
+    def remove_spill(self):
+        """Deletes spilled output files, if any."""
+        self.stdout.remove_spill()
+        self.stderr.remove_spill()
+
+    def etag(self):
+        """Returns ETag value that changes whenever the vessel does."""
+        return f"{self.token}-{self.seq}"
 
     def toJSON(self):
-        return json.dumps(self, default=lambda o: o.__dict__, sort_keys=True, indent=4)
+        with self.cond:
+            resp_dict = {
+                "stdout": list(self.stdout),
+                "stderr": list(self.stderr),
+                "process_lock": self._process_lock,
+                "pid": self.pid,
+                "exit_status": self._exit_status,
+            }
+        return json.dumps(resp_dict, sort_keys=True, indent=4)
 
     def __str__(self):
         return f"ProcInfoVessel(stdout='{self.stdout}', stderr='{self.stderr}', process_lock='{self.process_lock}', pid='{self.pid}', exit_status='{self.exit_status}')"
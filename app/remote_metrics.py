@@ -0,0 +1,442 @@
+import time
+import shlex
+import sqlite3
+import threading
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .models import GameServer
+from .proc_info_vessel import ProcInfoVessel
+from .utils import get_ssh_key_file, run_cmd_ssh, shared_state, log_wrap
+
+# Seconds between samples of each remote host.
+REMOTE_INTERVAL = 15
+# Number of samples kept per host, an hour's worth.
+REMOTE_HISTORY = 240
+# Max seconds between retries of a host that couldn't be sampled.
+MAX_BACKOFF = 600
+# Max seconds to wait on a host's output.
+SSH_TIMEOUT = 10
+
+
+def build_script(paths):
+    """
+    Builds the shell script run on a remote host to sample it. Prints each
+    /proc file under an "@section" marker, then one "%path" marker & df line
+    per install path.
+
+    Args:
+        paths (list): Install paths on host to get disk usage of.
+
+    Returns:
+        str: Shell script.
+    """
+    script = (
+        "echo @stat; grep '^cpu' /proc/stat; "
+        "echo @meminfo; cat /proc/meminfo; "
+        "echo @loadavg; cat /proc/loadavg; "
+        "echo @netdev; cat /proc/net/dev; "
+        "echo @df; "
+    )
+    for path in sorted(set(paths)):
+        script += (
+            f"echo {shlex.quote('%' + path)}; "
+            f"df -Pk {shlex.quote(path)} 2>/dev/null | tail -n 1; "
+        )
+    return script + "true"
+
+
+def split_sections(lines):
+    """Returns dict of section name -> list of its output lines."""
+    sections = {}
+    current = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith("@"):
+            current = line[1:]
+            sections[current] = []
+        elif current != None and line:
+            sections[current].append(line)
+    return sections
+
+
+def parse_stat(lines):
+    """Returns (total jiffies, idle jiffies, cpu count) from /proc/stat."""
+    total = idle = 0
+    cpus = 0
+    for line in lines:
+        fields = line.split()
+        if fields[0] == "cpu":
+            values = [int(value) for value in fields[1:]]
+            total = sum(values[:8])
+            # Idle + iowait.
+            idle = values[3] + (values[4] if len(values) > 4 else 0)
+        else:
+            cpus += 1
+    return total, idle, max(cpus, 1)
+
+
+def parse_meminfo(lines):
+    """Returns dict of /proc/meminfo keys -> bytes."""
+    meminfo = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        fields = value.split()
+        if fields:
+            meminfo[key] = int(fields[0]) * 1024
+    return meminfo
+
+
+def parse_netdev(lines):
+    """Returns (bytes received, bytes sent) summed over non loopback nics."""
+    recv = sent = 0
+    for line in lines:
+        if ":" not in line:
+            continue
+        iface, _, counters = line.partition(":")
+        if iface.strip() == "lo":
+            continue
+        fields = counters.split()
+        recv += int(fields[0])
+        sent += int(fields[8])
+    return recv, sent
+
+
+def parse_df(lines):
+    """
+    Returns list of disk usage dicts, one per "%path" marker that was
+    followed by a df line.
+    """
+    disks = []
+    path = None
+    for line in lines:
+        if line.startswith("%"):
+            path = line[1:]
+            continue
+        if path == None:
+            continue
+
+        # Filesystem 1024-blocks Used Available Capacity Mounted-on. Read
+        # from the right, filesystem names can have spaces.
+        fields = line.split()
+        try:
+            total, used, free = (int(field) * 1024 for field in fields[-5:-2])
+        except ValueError:
+            continue
+        disks.append(
+            {
+                "path": path,
+                "mount": fields[-1],
+                "total": total,
+                "used": used,
+                "free": free,
+                "percent_used": (used / total) * 100 if total else 0.0,
+            }
+        )
+        path = None
+    return disks
+
+
+def parse_sample(lines, prev=None, now=None):
+    """
+    Turns a remote host's script output into a sample shaped like
+    get_server_stats()' output. CPU usage & network rates need the previous
+    sample's counters, without them CPU usage falls back to load1 per cpu &
+    network rates are 0.
+
+    Args:
+        lines (list): Output lines of build_script()'s script.
+        prev (dict): Counters returned with the previous sample.
+        now (float): Time of sample, defaults to now.
+
+    Returns:
+        tuple: (sample dict, counters dict for the next call).
+    """
+    now = now or time.time()
+    sections = split_sections(lines)
+
+    total, idle, cpus = parse_stat(sections.get("stat", []))
+    meminfo = parse_meminfo(sections.get("meminfo", []))
+    loadavg = sections.get("loadavg", ["0 0 0"])[0].split()
+    recv, sent = parse_netdev(sections.get("netdev", []))
+    disks = parse_df(sections.get("df", []))
+
+    load1, load5, load15 = (float(value) for value in loadavg[:3])
+    cpu_usage = (load1 / cpus) * 100
+    sent_rate = recv_rate = 0.0
+    if prev != None and now > prev["time"]:
+        elapsed = now - prev["time"]
+        if total > prev["total"]:
+            busy = (total - prev["total"]) - (idle - prev["idle"])
+            cpu_usage = (busy / (total - prev["total"])) * 100
+        # Counters reset on reboot, never report negative rates.
+        sent_rate = max(sent - prev["sent"], 0) / elapsed
+        recv_rate = max(recv - prev["recv"], 0) / elapsed
+
+    mem_total = meminfo.get("MemTotal", 0)
+    mem_free = meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+
+    # Disks the install paths live on, each filesystem counted once.
+    mounts = {disk["mount"]: disk for disk in disks}
+    disk_total = sum(disk["total"] for disk in mounts.values())
+    disk_used = sum(disk["used"] for disk in mounts.values())
+
+    sample = {
+        "disk": {
+            "total": disk_total,
+            "used": disk_used,
+            "free": sum(disk["free"] for disk in mounts.values()),
+            "percent_used": (disk_used / disk_total) * 100 if disk_total else 0.0,
+        },
+        "disks": disks,
+        "cpu": {
+            "load1": load1,
+            "load5": load5,
+            "load15": load15,
+            "cpu_usage": cpu_usage,
+            "cpus": cpus,
+        },
+        "mem": {
+            "total": mem_total,
+            "used": mem_total - mem_free,
+            "free": mem_free,
+            "percent_used": (
+                ((mem_total - mem_free) / mem_total) * 100 if mem_total else 0.0
+            ),
+        },
+        "network": {"bytes_sent_rate": sent_rate, "bytes_recv_rate": recv_rate},
+        "time": now,
+    }
+    counters = {"total": total, "idle": idle, "sent": sent, "recv": recv, "time": now}
+    return sample, counters
+
+
+class RemoteMetrics:
+    """
+    Class used to sample the host of every remote install, without installing
+    anything on it. One small script is run per host over the pooled ssh
+    connection, so a host costs one ssh exec per interval no matter how many
+    game servers are on it. Its output is parsed here into samples shaped like
+    the local /api/system-usage ones & kept in a per host ring buffer.
+
+    Hosts that can't be reached are retried with exponential backoff. Only
+    one worker samples at a time, it publishes each host's history to the
+    shared state for the rest.
+
+    Args:
+        interval (float): Seconds between samples of each host.
+        size (int): Max number of samples kept per host.
+        shared (SharedState): Optional state shared with other workers.
+    """
+
+    # Seconds the sampling lease lasts without being renewed.
+    LEASE_TTL = 60
+
+    def __init__(self, interval=REMOTE_INTERVAL, size=REMOTE_HISTORY, shared=None):
+        self.interval = interval
+        self.size = size
+        self.shared = shared
+        self.app = None
+        self.thread = None
+        self.leader = False
+
+        # Counters.
+        self.samples = 0
+        self.failures = 0
+
+        # Holds host -> {"history", "counters", "failures", "next_check"}.
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = {
+                "history": deque(maxlen=self.size),
+                "counters": None,
+                "failures": 0,
+                "next_check": 0,
+            }
+        return self._hosts[host]
+
+    def record(self, host, lines, now=None):
+        """
+        Parses a host's script output & stores the sample.
+
+        Returns:
+            dict: The sample.
+        """
+        with self._lock:
+            state = self._host(host)
+            sample, state["counters"] = parse_sample(lines, state["counters"], now)
+            sample["host"] = host
+            state["history"].append(sample)
+            state["failures"] = 0
+            self.samples += 1
+            history = list(state["history"])
+
+        if self.shared != None:
+            try:
+                self.shared.put("remote_metrics", host, history)
+            except sqlite3.Error:
+                pass
+        return sample
+
+    def fail(self, host, now):
+        """Backs off a host that couldn't be sampled."""
+        with self._lock:
+            state = self._host(host)
+            state["failures"] += 1
+            self.failures += 1
+            backoff = min(self.interval * (2 ** state["failures"]), MAX_BACKOFF)
+            state["next_check"] = now + backoff
+
+    def sample_host(self, host, servers):
+        """
+        Samples one host over ssh. Needs an app context.
+
+        Args:
+            host (str): Hostname of remote host.
+            servers (list): Remote GameServers installed on host.
+        """
+        now = time.time()
+        username = servers[0].username
+        keyfile = get_ssh_key_file(username, host)
+        script = build_script([server.install_path for server in servers])
+
+        proc_info = ProcInfoVessel()
+        success = run_cmd_ssh(
+            ["/bin/sh", "-c", script],
+            host,
+            username,
+            keyfile,
+            proc_info,
+            timeout=SSH_TIMEOUT,
+        )
+        if not success or not proc_info.stdout:
+            self.fail(host, now)
+            return
+
+        try:
+            self.record(host, list(proc_info.stdout), now)
+        except (ValueError, IndexError) as e:
+            current_output = log_wrap("remote metrics parse error", e)
+            self.app.logger.info(current_output)
+            self.fail(host, now)
+
+    def collect(self, max_workers=8):
+        """Samples every due remote host concurrently. Needs an app context."""
+        hosts = {}
+        for server in GameServer.query.filter_by(
+            install_type="remote", install_finished=True
+        ).all():
+            hosts.setdefault(server.install_host, []).append(server)
+
+        now = time.time()
+        with self._lock:
+            # Forget hosts with no remote installs left.
+            for host in set(self._hosts) - set(hosts):
+                del self._hosts[host]
+            due = {
+                host: servers
+                for host, servers in hosts.items()
+                if self._host(host)["next_check"] <= now
+            }
+            for host in due:
+                self._hosts[host]["next_check"] = now + self.interval
+
+        if not due:
+            return
+
+        app = self.app
+
+        def sample(host, servers):
+            with app.app_context():
+                self.sample_host(host, servers)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(due))) as pool:
+            for host, servers in due.items():
+                pool.submit(sample, host, servers)
+
+    def history(self, host, count=1):
+        """
+        Args:
+            host (str): Hostname of remote host.
+            count (int): Max number of samples to return.
+
+        Returns:
+            list: Up to count most recent samples of host, oldest first.
+        """
+        history = None
+        if self.shared != None:
+            try:
+                history = self.shared.get("remote_metrics", host)
+            except sqlite3.Error:
+                pass
+
+        if history == None:
+            with self._lock:
+                state = self._hosts.get(host)
+                history = list(state["history"]) if state else []
+
+        count = min(max(count, 0), len(history))
+        return history[len(history) - count :]
+
+    def latest(self, host):
+        """Returns most recent sample of host, None if there isn't one."""
+        history = self.history(host, 1)
+        return history[0] if history else None
+
+    def is_leader(self):
+        """Takes or renews the sampling lease, True if this worker has it."""
+        if self.shared == None:
+            return True
+
+        try:
+            self.leader = self.shared.acquire_lease("remote_metrics", self.LEASE_TTL)
+        except sqlite3.Error:
+            self.leader = False
+        return self.leader
+
+    def run(self):
+        while True:
+            if self.is_leader():
+                try:
+                    with self.app.app_context():
+                        self.collect()
+                except Exception as e:
+                    self.app.logger.info(log_wrap("remote metrics error", e))
+            time.sleep(min(self.interval, self.LEASE_TTL / 3))
+
+    def start(self, app):
+        """Starts the sampling thread once per process."""
+        if self.thread and self.thread.is_alive():
+            return
+
+        self.app = app
+        self.thread = threading.Thread(
+            target=self.run, daemon=True, name="RemoteMetrics"
+        )
+        self.thread.start()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Dictionary of sampling counters & per host failure counts.
+        """
+        with self._lock:
+            return {
+                "samples": self.samples,
+                "failures": self.failures,
+                "leader": self.leader,
+                "hosts": {
+                    host: {
+                        "buffered": len(state["history"]),
+                        "failures": state["failures"],
+                    }
+                    for host, state in self._hosts.items()
+                },
+            }
+
+
+remote_metrics = RemoteMetrics(shared=shared_state)
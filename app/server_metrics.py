@@ -0,0 +1,363 @@
+import os
+import re
+import time
+import socket
+import sqlite3
+import psutil
+import threading
+
+from .models import GameServer
+from .utils import get_tmux_socket_name, shared_state, log_wrap
+
+# Seconds between process sweeps.
+METRICS_INTERVAL = 5
+
+# Install types whose processes run on this machine. Remote installs' don't.
+LOCAL_INSTALL_TYPES = ("local", "docker")
+
+
+def tmux_socket_name(cmdline):
+    """
+    Gets the tmux socket name out of a tmux process' cmdline. Newer tmux
+    servers retitle themselves "tmux: server (/tmp/tmux-UID/SOCKET)", older
+    ones keep the cmdline of the client that started them, ex: "tmux -L
+    SOCKET new-session ...".
+
+    Args:
+        cmdline (list): Process' argv.
+
+    Returns:
+        str: Socket name, None if there isn't one.
+    """
+    match = re.search(r"server \((.+)\)", " ".join(cmdline))
+    if match:
+        return os.path.basename(match.group(1))
+
+    for i, arg in enumerate(cmdline):
+        if arg == "-L" and i + 1 < len(cmdline):
+            return cmdline[i + 1]
+        if arg.startswith("-L") and len(arg) > 2:
+            return arg[2:]
+    return None
+
+
+def read_attr(proc, attr):
+    """Returns proc.attr(), None if we're not allowed to read it."""
+    try:
+        return getattr(proc, attr)()
+    except (psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+
+
+class ServerMetrics:
+    """
+    Class used to collect per game server resource usage. Each game server
+    runs in its own tmux server (one socket per install), so a game server's
+    processes are that tmux server's process tree, down to the game binary.
+
+    Every interval all processes are listed once, tmux servers are matched to
+    game servers by socket name, & each tree's processes are read with
+    psutil's oneshot() for CPU %, RSS, IO counters, threads, & open files.
+    Listening TCP & UDP ports come from one system wide connection listing.
+    Reading other users' IO counters, fds, & sockets needs root, those are
+    None when denied.
+
+    Only one worker sweeps at a time, it publishes results to the shared
+    state for the rest.
+
+    Args:
+        interval (float): Seconds between sweeps.
+        shared (SharedState): Optional state shared with other workers.
+    """
+
+    # Seconds the sweep lease lasts without being renewed.
+    LEASE_TTL = 30
+
+    def __init__(self, interval=METRICS_INTERVAL, shared=None):
+        self.interval = interval
+        self.shared = shared
+        self.app = None
+        self.thread = None
+        self.leader = False
+
+        # Counters.
+        self.sweeps = 0
+        self.errors = 0
+        self.last_sweep_ms = 0
+
+        # Holds pid -> (cpu seconds, sampled at), for CPU % between sweeps.
+        self._cpu = {}
+        # Holds server id -> metrics dict.
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def find_roots(self, tmux_procs, children, sockets):
+        """
+        Matches tmux server processes to socket names.
+
+        Args:
+            tmux_procs (list): psutil.Processes named tmux*.
+            children (dict): Pid -> list of child pids.
+            sockets (set): Socket names wanted.
+
+        Returns:
+            dict: Socket name -> pid of its tmux server.
+        """
+        roots = {}
+        for proc in tmux_procs:
+            try:
+                socket_name = tmux_socket_name(proc.cmdline())
+            except (psutil.AccessDenied, psutil.NoSuchProcess):
+                continue
+
+            if socket_name not in sockets:
+                continue
+
+            # Short lived tmux clients use the same -L, the server is the one
+            # with the game server's shell under it.
+            if socket_name not in roots or children.get(proc.pid):
+                roots[socket_name] = proc.pid
+        return roots
+
+    def tree(self, root, children):
+        """Returns list of root & all its descendants' pids."""
+        pids = []
+        stack = [root]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            stack.extend(children.get(pid, ()))
+        return pids
+
+    def listening_ports(self):
+        """
+        Returns:
+            dict: Pid -> {"tcp": set, "udp": set} of its listening ports,
+                  None if connections can't be listed.
+        """
+        try:
+            conns = psutil.net_connections(kind="inet")
+        except psutil.AccessDenied:
+            return None
+
+        ports = {}
+        for conn in conns:
+            if conn.pid == None or not conn.laddr:
+                continue
+            if conn.type == socket.SOCK_STREAM and conn.status == psutil.CONN_LISTEN:
+                kind = "tcp"
+            elif conn.type == socket.SOCK_DGRAM and not conn.raddr:
+                kind = "udp"
+            else:
+                continue
+            ports.setdefault(conn.pid, {"tcp": set(), "udp": set()})
+            ports[conn.pid][kind].add(conn.laddr.port)
+        return ports
+
+    def sweep(self, servers):
+        """
+        Collects metrics for game servers in one pass over all processes.
+
+        Args:
+            servers (list): List of (server id, install name, socket name).
+
+        Returns:
+            dict: Server id -> metrics dict.
+        """
+        now = time.time()
+        procs = {}
+        children = {}
+        tmux_procs = []
+        for proc in psutil.process_iter(["ppid", "name"]):
+            procs[proc.pid] = proc
+            children.setdefault(proc.info["ppid"], []).append(proc.pid)
+            if (proc.info["name"] or "").startswith("tmux"):
+                tmux_procs.append(proc)
+
+        sockets = {socket_name for _, _, socket_name in servers if socket_name}
+        roots = self.find_roots(tmux_procs, children, sockets)
+        ports = self.listening_ports() if roots else {}
+
+        cpu = {}
+        metrics = {}
+        for server_id, server_name, socket_name in servers:
+            root = roots.get(socket_name)
+            entry = {
+                "server_id": server_id,
+                "server": server_name,
+                "running": root != None,
+                "pid": root,
+                "processes": 0,
+                "cpu_percent": None,
+                "rss": 0,
+                "threads": 0,
+                "read_bytes": 0,
+                "write_bytes": 0,
+                "open_files": 0,
+                "tcp_ports": [],
+                "udp_ports": [],
+                "binary": None,
+                "checked_at": now,
+            }
+            metrics[server_id] = entry
+            if root == None:
+                continue
+
+            cpu_percent = None
+            biggest = None
+            tcp_ports = set()
+            udp_ports = set()
+            for pid in self.tree(root, children):
+                proc = procs.get(pid)
+                if proc == None:
+                    continue
+
+                try:
+                    with proc.oneshot():
+                        cpu_times = proc.cpu_times()
+                        rss = proc.memory_info().rss
+                        threads = proc.num_threads()
+                        io = read_attr(proc, "io_counters")
+                        fds = read_attr(proc, "num_fds")
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+
+                entry["processes"] += 1
+                entry["rss"] += rss
+                entry["threads"] += threads
+                if io == None or entry["read_bytes"] == None:
+                    entry["read_bytes"] = entry["write_bytes"] = None
+                else:
+                    entry["read_bytes"] += io.read_bytes
+                    entry["write_bytes"] += io.write_bytes
+                if fds == None or entry["open_files"] == None:
+                    entry["open_files"] = None
+                else:
+                    entry["open_files"] += fds
+
+                # CPU % since last sweep, new processes count from next one.
+                cpu_seconds = cpu_times.user + cpu_times.system
+                cpu[pid] = (cpu_seconds, now)
+                prev = self._cpu.get(pid)
+                if prev != None and now > prev[1]:
+                    used = max(cpu_seconds - prev[0], 0) / (now - prev[1]) * 100
+                    cpu_percent = (cpu_percent or 0) + used
+
+                if biggest == None or rss > biggest[1]:
+                    biggest = (pid, rss, proc.info["name"])
+
+                if ports != None and pid in ports:
+                    tcp_ports |= ports[pid]["tcp"]
+                    udp_ports |= ports[pid]["udp"]
+
+            if cpu_percent != None:
+                entry["cpu_percent"] = round(cpu_percent, 2)
+            if biggest != None:
+                entry["binary"] = {"pid": biggest[0], "name": biggest[2]}
+            if ports == None:
+                entry["tcp_ports"] = entry["udp_ports"] = None
+            else:
+                entry["tcp_ports"] = sorted(tcp_ports)
+                entry["udp_ports"] = sorted(udp_ports)
+
+        self._cpu = cpu
+        return metrics
+
+    def collect(self):
+        """Sweeps all local & docker game servers. Needs an app context."""
+        start = time.perf_counter()
+        servers = []
+        for server in GameServer.query.filter_by(install_finished=True).all():
+            if server.install_type not in LOCAL_INSTALL_TYPES:
+                continue
+            socket_name = get_tmux_socket_name(server)
+            servers.append((server.id, server.install_name, socket_name))
+
+        metrics = self.sweep(servers)
+        with self._lock:
+            self._metrics = metrics
+            self.sweeps += 1
+            self.last_sweep_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        if self.shared != None:
+            try:
+                for server_id, entry in metrics.items():
+                    self.shared.put("server_metrics", server_id, entry)
+                self.shared.prune("server_metrics", self.interval * 3)
+            except sqlite3.Error:
+                pass
+
+    def get(self, server_id):
+        """
+        Returns:
+            dict: Latest metrics for game server, None if there aren't any.
+        """
+        if self.shared != None:
+            try:
+                return self.shared.get("server_metrics", server_id)
+            except sqlite3.Error:
+                pass
+
+        with self._lock:
+            return self._metrics.get(server_id)
+
+    def remove(self, server_id):
+        """Forgets metrics for a deleted game server."""
+        with self._lock:
+            self._metrics.pop(server_id, None)
+
+        if self.shared != None:
+            try:
+                self.shared.delete("server_metrics", server_id)
+            except sqlite3.Error:
+                pass
+
+    def is_leader(self):
+        """Takes or renews the sweep lease, True if this worker has it."""
+        if self.shared == None:
+            return True
+
+        try:
+            self.leader = self.shared.acquire_lease("server_metrics", self.LEASE_TTL)
+        except sqlite3.Error:
+            self.leader = False
+        return self.leader
+
+    def run(self):
+        while True:
+            if self.is_leader():
+                try:
+                    with self.app.app_context():
+                        self.collect()
+                except Exception as e:
+                    self.errors += 1
+                    self.app.logger.info(log_wrap("server metrics error", e))
+            time.sleep(self.interval)
+
+    def start(self, app):
+        """Starts the sweep thread once per process."""
+        if self.thread and self.thread.is_alive():
+            return
+
+        self.app = app
+        self.thread = threading.Thread(
+            target=self.run, daemon=True, name="ServerMetrics"
+        )
+        self.thread.start()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Dictionary of sweep counters.
+        """
+        with self._lock:
+            return {
+                "sweeps": self.sweeps,
+                "errors": self.errors,
+                "leader": self.leader,
+                "servers": len(self._metrics),
+                "last_sweep_ms": self.last_sweep_ms,
+            }
+
+
+server_metrics = ServerMetrics(shared=shared_state)
@@ -0,0 +1,209 @@
+import os
+import stat
+import tempfile
+import dataclasses
+import threading
+import configparser
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class AestheticSettings:
+    text_color: str = "#09ff00"
+    terminal_height: int = 10
+    graphs_primary: str = "#e01b24"
+    graphs_secondary: str = "#0d6efd"
+    show_stats: bool = True
+    show_barrel_roll: bool = False
+
+
+@dataclass(frozen=True)
+class GeneralSettings:
+    remove_files: bool = False
+    delete_user: bool = False
+    show_stderr: bool = True
+    clear_output_on_reload: bool = True
+    cfg_editor: bool = False
+    send_cmd: bool = False
+    install_create_new_user: bool = True
+    end_in_newlines: bool = True
+    status_interval: int = 60
+    status_unreachable_interval: int = 120
+    output_max_lines: int = 5000
+    output_max_bytes: int = 1048576
+    interactive_workers: int = 4
+    heavy_workers: int = 2
+    host_job_limit: int = 2
+
+
+@dataclass(frozen=True)
+class DebugSettings:
+    debug: bool = False
+    log_level: str = "info"
+
+
+@dataclass(frozen=True)
+class ServerSettings:
+    host: str = "127.0.0.1"
+    port: int = 12357
+    workers: int = 1
+    threads: int = 16
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Immutable, typed snapshot of main.conf. Each attribute holds one section
+    of the file. Options that are missing or don't parse as their type get
+    their default value.
+    """
+
+    aesthetic: AestheticSettings = AestheticSettings()
+    settings: GeneralSettings = GeneralSettings()
+    debug: DebugSettings = DebugSettings()
+    server: ServerSettings = ServerSettings()
+
+
+# Sections of main.conf -> snapshot class for that section.
+SECTIONS = {
+    "aesthetic": AestheticSettings,
+    "settings": GeneralSettings,
+    "debug": DebugSettings,
+    "server": ServerSettings,
+}
+
+
+def parse_section(config, section, section_class):
+    """
+    Builds a section snapshot from a ConfigParser, typing each option per
+    the snapshot class' annotations.
+
+    Args:
+        config (ConfigParser): Parsed main.conf.
+        section (str): Name of section to read.
+        section_class (class): Dataclass for section.
+
+    Returns:
+        object: Instance of section_class.
+    """
+    values = dict()
+    if not config.has_section(section):
+        return section_class()
+
+    for field in dataclasses.fields(section_class):
+        if not config.has_option(section, field.name):
+            continue
+
+        try:
+            if field.type in (bool, "bool"):
+                values[field.name] = config.getboolean(section, field.name)
+            elif field.type in (int, "int"):
+                values[field.name] = config.getint(section, field.name)
+            else:
+                values[field.name] = config.get(section, field.name)
+        except ValueError:
+            # Unparseable value, keep default.
+            continue
+
+    return section_class(**values)
+
+
+def parse_settings(config):
+    """Builds a Settings snapshot from a ConfigParser."""
+    return Settings(
+        **{
+            section: parse_section(config, section, section_class)
+            for section, section_class in SECTIONS.items()
+        }
+    )
+
+
+class SettingsCache:
+    """
+    Class used to keep main.conf parsed in memory. The file is only re-read
+    when its mtime, ctime, inode, or size changes, so hot paths can call
+    get() as often as they like for the price of one stat().
+
+    Args:
+        path (str): Path to main.conf.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.loads = 0
+        self._key = None
+        self._valid = False
+        self._snapshot = Settings()
+        self._lock = threading.Lock()
+
+    def _stat_key(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino, stat.st_size)
+
+    def get(self):
+        """
+        Returns:
+            Settings: Snapshot of main.conf as of its last change.
+        """
+        key = self._stat_key()
+        with self._lock:
+            if not self._valid or key != self._key:
+                config = configparser.ConfigParser()
+                config.read(self.path)
+                self._snapshot = parse_settings(config)
+                self._key = key
+                self._valid = True
+                self.loads += 1
+            return self._snapshot
+
+    def parser(self):
+        """
+        Returns:
+            ConfigParser: Freshly parsed, editable copy of main.conf for
+                          writing changes back with write().
+        """
+        config = configparser.ConfigParser()
+        config.read(self.path)
+        return config
+
+    def write(self, config):
+        """
+        Atomically replaces main.conf with config's contents & drops the
+        cached snapshot.
+
+        Args:
+            config (ConfigParser): Config to write.
+        """
+        # Uniquely named, so workers writing at the same time can't collide.
+        configfile = tempfile.NamedTemporaryFile(
+            "w",
+            dir=os.path.dirname(os.path.abspath(self.path)),
+            prefix=f"{os.path.basename(self.path)}.",
+            suffix=".tmp",
+            delete=False,
+        )
+        try:
+            with configfile:
+                config.write(configfile)
+                configfile.flush()
+                os.fsync(configfile.fileno())
+
+            # Temp files are created 0600, keep main.conf's own mode.
+            try:
+                mode = stat.S_IMODE(os.stat(self.path).st_mode)
+            except FileNotFoundError:
+                mode = 0o644
+            os.chmod(configfile.name, mode)
+            os.replace(configfile.name, self.path)
+        except BaseException:
+            os.remove(configfile.name)
+            raise
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._valid = False
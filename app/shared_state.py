@@ -0,0 +1,530 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+from .output_buffer import read_spilled
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS output (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    server TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    stream TEXT NOT NULL,
+    line TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS output_server_seq ON output (server, seq);
+"""
+
+
+class SharedState:
+    """
+    Class used to share state between gunicorn worker processes. Backed by a
+    small SQLite db in WAL mode, so readers never block the writer & any
+    worker can see job state, game server statuses, command output, & net
+    rate samples no matter which worker produced them.
+
+    Holds three kinds of things:
+        * Namespaced JSON values (put / get / items / delete).
+        * Leases, so only one worker at a time runs singleton background
+          work like the status monitor.
+        * Published command output, see OutputPublisher & SharedVessel.
+
+    Args:
+        path (str): Path to SQLite db file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # Unique per instance too, so two SharedStates in one process (ex: in
+        # tests) don't share leases.
+        self._instance = uuid.uuid4().hex[:8]
+
+    @property
+    def owner(self):
+        return f"{os.getpid()}-{self._instance}"
+
+    def _conn(self):
+        """Returns this thread's connection, creating the db if needed."""
+        conn = getattr(self._local, "conn", None)
+        if conn != None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def reset(self, boot_id):
+        """
+        Wipes state left over from a previous run of the app. All workers of
+        one gunicorn master share a boot_id, so only the first to start wipes.
+
+        Args:
+            boot_id (str): Id shared by all workers of this run.
+
+        Returns:
+            bool: True if this call wiped the state.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT value FROM kv WHERE ns = 'meta' AND key = 'boot_id'"
+            ).fetchone()
+            if row != None and json.loads(row[0]) == boot_id:
+                return False
+
+            conn.execute("DELETE FROM kv")
+            conn.execute("DELETE FROM leases")
+            conn.execute("DELETE FROM output")
+            conn.execute(
+                "INSERT INTO kv VALUES ('meta', 'boot_id', ?, ?)",
+                (json.dumps(boot_id), time.time()),
+            )
+        return True
+
+    def put(self, ns, key, value):
+        """Stores JSON serializable value under ns/key."""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)",
+            (ns, str(key), json.dumps(value), time.time()),
+        )
+
+    def get(self, ns, key, default=None):
+        row = (
+            self._conn()
+            .execute("SELECT value FROM kv WHERE ns = ? AND key = ?", (ns, str(key)))
+            .fetchone()
+        )
+        if row == None:
+            return default
+        return json.loads(row[0])
+
+    def items(self, ns):
+        """Returns dict of all keys -> values in ns."""
+        rows = self._conn().execute("SELECT key, value FROM kv WHERE ns = ?", (ns,))
+        return {key: json.loads(value) for key, value in rows}
+
+    def delete(self, ns, key=None):
+        """Deletes ns/key, or everything in ns if key is None."""
+        if key == None:
+            self._conn().execute("DELETE FROM kv WHERE ns = ?", (ns,))
+        else:
+            self._conn().execute(
+                "DELETE FROM kv WHERE ns = ? AND key = ?", (ns, str(key))
+            )
+
+    def prune(self, ns, max_age):
+        """Deletes values in ns not updated for max_age seconds."""
+        self._conn().execute(
+            "DELETE FROM kv WHERE ns = ? AND updated_at < ?",
+            (ns, time.time() - max_age),
+        )
+
+    def acquire_lease(self, name, ttl):
+        """
+        Takes or renews lease name. Succeeds if nobody holds it, this process
+        already does, or the holder let it expire.
+
+        Args:
+            name (str): Name of lease.
+            ttl (float): Seconds lease lasts unless renewed.
+
+        Returns:
+            bool: True if this process holds the lease.
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT(name) DO UPDATE "
+                "SET owner = excluded.owner, expires = excluded.expires "
+                "WHERE leases.owner = excluded.owner OR leases.expires < ?",
+                (name, self.owner, now + ttl, now),
+            )
+            row = conn.execute(
+                "SELECT owner FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+        return row != None and row[0] == self.owner
+
+    def release_lease(self, name):
+        self._conn().execute(
+            "DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner)
+        )
+
+    def publish_output(self, server, state, changes, max_lines):
+        """
+        Stores a batch of a vessel's output changes & its current state.
+
+        Args:
+            server (str): Name of vessel's game server.
+            state (dict): Vessel's token, seq, reset_seq, etc.
+            changes (dict): Return of vessel's changes_since(), with stdout &
+                            stderr as lists of (seq, line).
+            max_lines (int): Max lines per stream to keep for server.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Seq number of the newest batch with lines no longer kept here.
+            pruned_seq = 0
+            if changes["reset"]:
+                conn.execute("DELETE FROM output WHERE server = ?", (server,))
+            else:
+                row = conn.execute(
+                    "SELECT value FROM kv WHERE ns = 'output' AND key = ?", (server,)
+                ).fetchone()
+                if row != None:
+                    pruned_seq = json.loads(row[0]).get("pruned_seq", 0)
+
+            # Lines the vessel evicted before they were published are lost.
+            if changes.get("truncated"):
+                pruned_seq = max(pruned_seq, changes["evicted_seq"])
+
+            for stream in ("stdout", "stderr"):
+                rows = [(server, seq, stream, line) for seq, line in changes[stream]]
+                conn.executemany(
+                    "INSERT INTO output (server, seq, stream, line) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                if not changes[stream]:
+                    continue
+
+                # Newest line past max_lines, it & everything older goes.
+                row = conn.execute(
+                    "SELECT id, seq FROM output WHERE server = ? AND stream = ? "
+                    "ORDER BY id DESC LIMIT 1 OFFSET ?",
+                    (server, stream, max_lines),
+                ).fetchone()
+                if row != None:
+                    conn.execute(
+                        "DELETE FROM output WHERE server = ? AND stream = ? "
+                        "AND id <= ?",
+                        (server, stream, row[0]),
+                    )
+                    pruned_seq = max(pruned_seq, row[1])
+
+            state = dict(state, pruned_seq=pruned_seq)
+            conn.execute(
+                "INSERT OR REPLACE INTO kv VALUES ('output', ?, ?, ?)",
+                (server, json.dumps(state), time.time()),
+            )
+
+    def read_output(self, server, since):
+        """
+        Returns dict of stdout & stderr lists of server's published output
+        lines newer than seq number since.
+        """
+        lines = {"stdout": [], "stderr": []}
+        rows = self._conn().execute(
+            "SELECT stream, line FROM output WHERE server = ? AND seq > ? ORDER BY id",
+            (server, since),
+        )
+        for stream, line in rows:
+            lines[stream].append(line)
+        return lines
+
+    def read_history(self, server, stream, before, limit):
+        """
+        Returns list of (seq, line) of up to limit of server's newest
+        published stream lines with seq numbers lower than before, oldest
+        first.
+        """
+        rows = self._conn().execute(
+            "SELECT seq, line FROM output WHERE server = ? AND stream = ? "
+            "AND seq < ? ORDER BY id DESC LIMIT ?",
+            (server, stream, before, limit),
+        )
+        return list(reversed(rows.fetchall()))
+
+    def remove_output(self, server):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM output WHERE server = ?", (server,))
+            conn.execute(
+                "DELETE FROM kv WHERE ns = 'output' AND key = ?", (server,)
+            )
+
+
+class SharedVessel:
+    """
+    Class used to read command output another worker published to the
+    SharedState. Supports the read side of ProcInfoVessel, so the output api
+    routes can serve it the same way as a local vessel.
+
+    Args:
+        shared (SharedState): Shared state to read from.
+        server_name (str): Name of game server output is for.
+        state (dict): Published vessel state.
+    """
+
+    # Seconds between checks for new output in wait_for_change().
+    POLL_INTERVAL = 0.25
+
+    def __init__(self, shared, server_name, state):
+        self.shared = shared
+        self.server_name = server_name
+        self.token = None
+        self._load(state)
+
+    def _load(self, state):
+        # Some other vessel published since, its seq numbers start over.
+        self.token_changed = self.token != None and self.token != state["token"]
+        self.state = state
+        self.token = state["token"]
+        self.seq = state["seq"]
+        self.reset_seq = state["reset_seq"]
+        self.pruned_seq = state.get("pruned_seq", 0)
+        self.pid = state["pid"]
+        self.process_lock = state["process_lock"]
+        self.queued = state.get("queued", 0)
+        self.exit_status = state["exit_status"]
+        self.last_output_at = state["last_output_at"]
+        self.changed_at = state["changed_at"]
+
+    def refresh(self):
+        state = self.shared.get("output", self.server_name)
+        if state != None:
+            self._load(state)
+
+    @property
+    def stdout(self):
+        return self.shared.read_output(self.server_name, 0)["stdout"]
+
+    @property
+    def stderr(self):
+        return self.shared.read_output(self.server_name, 0)["stderr"]
+
+    def wait_for_change(self, seq, timeout=None):
+        deadline = None if timeout == None else time.time() + timeout
+        while True:
+            self.refresh()
+            if self.seq != seq:
+                return True
+            if deadline != None and time.time() >= deadline:
+                return False
+            time.sleep(self.POLL_INTERVAL)
+
+    def changes_since(self, seq):
+        self.refresh()
+        reset = self.token_changed or seq < self.reset_seq or seq > self.seq
+        seen = self.reset_seq if reset else seq
+        if reset:
+            seq = 0
+
+        lines = self.shared.read_output(self.server_name, seq)
+        return {
+            "seq": self.seq,
+            "reset": reset,
+            "truncated": seen < self.pruned_seq,
+            "evicted_seq": self.pruned_seq,
+            "stdout": lines["stdout"],
+            "stderr": lines["stderr"],
+            "process_lock": self.process_lock,
+            "queued": self.queued,
+            "exit_status": self.exit_status,
+            "last_output_at": self.last_output_at,
+        }
+
+    def history(self, stream, before=None, limit=200):
+        """
+        Pages back through stream's published output, then through what the
+        worker that owns the vessel spilled to disk before that.
+
+        Args:
+            stream (str): "stdout" or "stderr".
+            before (int): Only return lines with seq numbers lower than this.
+            limit (int): Max number of lines to return.
+
+        Returns:
+            tuple: (lines, seq number of the first line returned or None).
+        """
+        self.refresh()
+        if before == None:
+            before = self.seq + 1
+
+        records = self.shared.read_history(self.server_name, stream, before, limit)
+        spill_path = self.state.get("spill", {}).get(stream)
+        needed = limit - len(records)
+        if needed > 0 and spill_path:
+            if records:
+                before = records[0][0]
+            spilled = read_spilled(spill_path, before, needed)
+            # Spill file can still hold a previous run's output.
+            spilled = [record for record in spilled if record[0] > self.reset_seq]
+            records = spilled + records
+
+        if not records:
+            return [], None
+        return [line for seq, line in records], records[0][0]
+
+    def etag(self):
+        return f"{self.token}-{self.seq}"
+
+    def toJSON(self):
+        lines = self.shared.read_output(self.server_name, 0)
+        resp_dict = {
+            "stdout": lines["stdout"],
+            "stderr": lines["stderr"],
+            "process_lock": self.process_lock,
+            "pid": self.pid,
+            "exit_status": self.exit_status,
+        }
+        return json.dumps(resp_dict, sort_keys=True, indent=4)
+
+    def __str__(self):
+        return f"SharedVessel(server='{self.server_name}', seq='{self.seq}')"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class OutputPublisher:
+    """
+    Class used to run a per worker thread that copies new output from this
+    worker's ProcInfoVessels into the SharedState, in batches, so the other
+    workers can serve it.
+
+    Args:
+        shared (SharedState): Shared state to publish to.
+        interval (float): Seconds between publish passes.
+    """
+
+    def __init__(self, shared, interval=0.25):
+        self.shared = shared
+        self.interval = interval
+        self.thread = None
+        self.batches = 0
+        # Holds server_name -> [vessel, last published seq, token].
+        self._vessels = {}
+        self._lock = threading.Lock()
+
+    def register(self, server_name, vessel):
+        """Starts publishing vessel's output as server_name's output."""
+        with self._lock:
+            self._vessels[server_name] = [vessel, None, None]
+
+    def unregister(self, server_name):
+        with self._lock:
+            self._vessels.pop(server_name, None)
+        self.shared.remove_output(server_name)
+
+    def start(self):
+        """Starts publisher thread once per process."""
+        if self.thread and self.thread.is_alive():
+            return
+
+        self.thread = threading.Thread(
+            target=self.run, daemon=True, name="OutputPublisher"
+        )
+        self.thread.start()
+
+    def publish(self):
+        """Publishes any vessels with unpublished changes."""
+        with self._lock:
+            entries = list(self._vessels.items())
+
+        for server_name, entry in entries:
+            vessel, published_seq, token = entry
+            if published_seq == vessel.seq and token == vessel.token:
+                continue
+            # Vessel never changed, nothing worth sharing yet.
+            if vessel.seq == 0:
+                continue
+
+            # New vessel, publish everything.
+            if token != vessel.token:
+                published_seq = -1
+
+            with vessel.cond:
+                changes = vessel.changes_since(max(published_seq, 0))
+                changes["reset"] = changes["reset"] or published_seq == -1
+                # Published with their seq numbers, so other workers can page
+                # back through them & on into the spill files.
+                since = 0 if changes["reset"] else published_seq
+                spill = {}
+                for stream in ("stdout", "stderr"):
+                    output = getattr(vessel, stream)
+                    changes[stream] = output.records_since(since)
+                    spill[stream] = output.spill_path if output.evicted else None
+
+            state = {
+                "token": vessel.token,
+                "seq": changes["seq"],
+                "reset_seq": vessel.reset_seq,
+                "pid": vessel.pid,
+                "process_lock": changes["process_lock"],
+                "queued": changes["queued"],
+                "exit_status": changes["exit_status"],
+                "last_output_at": changes["last_output_at"],
+                "changed_at": vessel.changed_at,
+                "owner": self.shared.owner,
+                "spill": spill,
+            }
+            self.shared.publish_output(
+                server_name, state, changes, vessel.stdout.max_lines
+            )
+            entry[1] = changes["seq"]
+            entry[2] = vessel.token
+            self.batches += 1
+
+    def run(self):
+        while True:
+            try:
+                self.publish()
+            except sqlite3.Error:
+                # Db busy or locked by another worker, try again next pass.
+                pass
+            time.sleep(self.interval)
+
+    def find(self, server_name, local=None):
+        """
+        Picks which vessel to serve server_name's output from. The local one
+        unless another worker ran a cmd for the server more recently.
+
+        Args:
+            server_name (str): Name of game server.
+            local (ProcInfoVessel): This worker's vessel for the server, if any.
+
+        Returns:
+            ProcInfoVessel|SharedVessel: Vessel to serve, None if neither.
+        """
+        try:
+            state = self.shared.get("output", server_name)
+        except sqlite3.Error:
+            state = None
+
+        if state == None or (local != None and state["token"] == local.token):
+            return local
+
+        if local == None or state["changed_at"] > local.changed_at:
+            return SharedVessel(self.shared, server_name, state)
+
+        return local
+
+    def stats(self):
+        with self._lock:
+            return {"vessels": len(self._vessels), "batches": self.batches}
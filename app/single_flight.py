@@ -0,0 +1,151 @@
+import copy
+import time
+import functools
+import threading
+
+
+class SingleFlight:
+    """
+    Class used to coalesce duplicate in flight calls. Calls are keyed by
+    (operation, server id). While one call for a key is running, any other
+    callers for the same key wait for it & share its result (or exception)
+    instead of spawning their own subprocess or SSH session. Results can
+    optionally be kept around for a short TTL after the call finishes.
+    Waiters get their own copy of a shared exception, so threads never
+    raise (& rewrite the traceback of) the same exception object.
+    """
+
+    def __init__(self):
+        # Counters.
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+        # Holds key -> {"event", "result", "error", "expires"} dicts.
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, ttl=0, **kwargs):
+        """
+        Runs func(*args, **kwargs) unless a call for key is already in flight
+        or has a result younger than ttl, in which case that result is used.
+
+        Args:
+            key (tuple): Key identifying the call, ex: ("status", server.id).
+            func (function): Function to call.
+            ttl (float): Seconds to keep result after the call finishes.
+
+        Returns:
+            object: Result of func.
+        """
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            if flight != None and flight["event"].is_set():
+                if flight["expires"] > time.time():
+                    self.cache_hits += 1
+                    return self._result(flight)
+                flight = None
+
+            if flight != None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = {
+                    "event": threading.Event(),
+                    "result": None,
+                    "error": None,
+                    "expires": 0,
+                }
+                self._flights[key] = flight
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            flight["event"].wait()
+            return self._result(flight, shared=True)
+
+        try:
+            flight["result"] = func(*args, **kwargs)
+        except Exception as e:
+            flight["error"] = e
+        finally:
+            with self._lock:
+                flight["expires"] = time.time() + ttl
+                # Errors are shared with waiters, but never cached.
+                if flight["error"] != None or ttl <= 0:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+                flight["event"].set()
+
+        return self._result(flight)
+
+    def _result(self, flight, shared=False):
+        error = flight["error"]
+        if error == None:
+            return flight["result"]
+
+        if shared:
+            try:
+                copied = copy.copy(error)
+            except Exception:
+                # Exceptions that can't be rebuilt from their args.
+                copied = None
+            if type(copied) is type(error):
+                raise copied.with_traceback(None) from error
+        raise error
+
+    def wrap(self, operation, ttl=0):
+        """
+        Decorator that coalesces calls to a function that takes a game server
+        as its first argument, keyed by (operation, server.id).
+
+        Args:
+            operation (str): Name of the operation.
+            ttl (float): Seconds to keep result after the call finishes.
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(server, *args, **kwargs):
+                server_id = getattr(server, "id", None)
+                # Servers not in the db yet can't be told apart, so don't share.
+                if server_id == None:
+                    return func(server, *args, **kwargs)
+
+                key = (operation, server_id) + args
+                return self.do(key, func, server, *args, ttl=ttl, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def forget(self, server_id):
+        """
+        Drops cached results & detaches in flight calls for a game server, so
+        later callers start a fresh call instead of joining one that started
+        before the server changed, ex: before a start/stop cmd finished.
+        Callers already waiting on a detached call still get its result.
+        """
+        with self._lock:
+            for key in list(self._flights):
+                if key[1] == server_id:
+                    del self._flights[key]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Dictionary of single flight counters.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "cache_hits": self.cache_hits,
+                "in_flight": sum(
+                    1 for flight in self._flights.values()
+                    if not flight["event"].is_set()
+                ),
+            }
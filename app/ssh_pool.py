@@ -0,0 +1,229 @@
+import time
+import threading
+import paramiko
+
+
+class SSHConnectionPool:
+    """
+    Class used to hold persistent, authenticated paramiko SSH transports. One
+    transport is kept per (hostname, username, key_filename) and new exec
+    channels & sftp sessions are opened on top of it, instead of doing a full
+    key exchange & auth for every command.
+
+    Args:
+        idle_timeout (int): Seconds a connection can sit unused before it is
+                            closed by close_idle(), which the status monitor
+                            thread runs on every tick.
+        connect_timeout (int): Timeout in seconds for new connections.
+        keepalive (int): Interval in seconds for transport keepalive packets.
+    """
+
+    def __init__(self, idle_timeout=300, connect_timeout=3, keepalive=30):
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.keepalive = keepalive
+
+        # Counters.
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+        self.idle_closed = 0
+
+        # Holds key -> {"client", "last_used", "channels"} dicts.
+        self._conns = {}
+        self._lock = threading.Lock()
+        # Per connection key locks, so concurrent callers for the same host
+        # wait on one handshake instead of each doing their own.
+        self._key_locks = {}
+
+    def _key_lock(self, key):
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def _close_conn(self, conn):
+        try:
+            conn["client"].close()
+        except Exception:
+            pass
+
+    def _connect(self, hostname, username, key_filename):
+        client = paramiko.SSHClient()
+        # Automatically add the host key.
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            hostname,
+            username=username,
+            key_filename=key_filename,
+            timeout=self.connect_timeout,
+        )
+        client.get_transport().set_keepalive(self.keepalive)
+        return client
+
+    def get_transport(self, hostname, username, key_filename):
+        """
+        Gets an active authenticated transport for hostname, username,
+        key_filename. Reuses pooled transport if there is a live one,
+        otherwise (re)connects.
+
+        Args:
+            hostname (str): The hostname or IP address of the server.
+            username (str): The username to use for the SSH connection.
+            key_filename (str): The path to the private key file.
+
+        Returns:
+            paramiko.Transport: Active transport for the connection key.
+        """
+        key = (hostname, username, key_filename)
+
+        with self._key_lock(key):
+            with self._lock:
+                conn = self._conns.get(key)
+
+            if conn:
+                transport = conn["client"].get_transport()
+                if transport and transport.is_active():
+                    with self._lock:
+                        self.hits += 1
+                        conn["last_used"] = time.time()
+                    return transport
+
+                # Stale connection, drop it and reconnect below. Only place
+                # reconnects are counted.
+                self._close_conn(conn)
+                with self._lock:
+                    self._conns.pop(key, None)
+                    self.reconnects += 1
+
+            client = self._connect(hostname, username, key_filename)
+            with self._lock:
+                self.misses += 1
+                self._conns[key] = {
+                    "client": client,
+                    "last_used": time.time(),
+                    "channels": [],
+                }
+            return client.get_transport()
+
+    def _track(self, key, channel):
+        with self._lock:
+            conn = self._conns.get(key)
+            if conn:
+                conn["channels"].append(channel)
+                conn["last_used"] = time.time()
+
+    def _close_stale(self, key):
+        """
+        Closes key's pooled connection but leaves it pooled, so the next
+        get_transport() finds it dead & reconnects.
+        """
+        with self._lock:
+            conn = self._conns.get(key)
+        if conn:
+            self._close_conn(conn)
+
+    def invalidate(self, hostname, username, key_filename):
+        """Closes and forgets pooled connection for given connection key."""
+        key = (hostname, username, key_filename)
+        with self._lock:
+            conn = self._conns.pop(key, None)
+        if conn:
+            self._close_conn(conn)
+
+    def open_session(self, hostname, username, key_filename):
+        """
+        Opens a new session channel on the shared transport. If the pooled
+        transport turns out to be dead, reconnects once and tries again.
+
+        Returns:
+            paramiko.Channel: New session channel.
+        """
+        key = (hostname, username, key_filename)
+        transport = self.get_transport(hostname, username, key_filename)
+        try:
+            channel = transport.open_session()
+        except (paramiko.SSHException, EOFError, OSError):
+            self._close_stale(key)
+            transport = self.get_transport(hostname, username, key_filename)
+            channel = transport.open_session()
+
+        self._track(key, channel)
+        return channel
+
+    def open_sftp(self, hostname, username, key_filename):
+        """
+        Opens a new sftp session on the shared transport. Same reconnect
+        behavior as open_session().
+
+        Returns:
+            paramiko.SFTPClient: New sftp client. Closing it only closes its
+                                 channel, not the pooled transport.
+        """
+        key = (hostname, username, key_filename)
+        transport = self.get_transport(hostname, username, key_filename)
+        try:
+            sftp = paramiko.SFTPClient.from_transport(transport)
+        except (paramiko.SSHException, EOFError, OSError):
+            self._close_stale(key)
+            transport = self.get_transport(hostname, username, key_filename)
+            sftp = paramiko.SFTPClient.from_transport(transport)
+
+        self._track(key, sftp.get_channel())
+        return sftp
+
+    def close_idle(self, idle_timeout=None):
+        """
+        Closes pooled connections that have no open channels and haven't been
+        used for longer than idle_timeout seconds.
+
+        Returns:
+            int: Number of connections closed.
+        """
+        if idle_timeout is None:
+            idle_timeout = self.idle_timeout
+
+        now = time.time()
+        idle = []
+        with self._lock:
+            for key, conn in list(self._conns.items()):
+                conn["channels"] = [c for c in conn["channels"] if not c.closed]
+                if conn["channels"]:
+                    continue
+                if now - conn["last_used"] > idle_timeout:
+                    idle.append(self._conns.pop(key))
+            self.idle_closed += len(idle)
+
+        for conn in idle:
+            self._close_conn(conn)
+
+        return len(idle)
+
+    def close_all(self):
+        """Closes all pooled connections."""
+        with self._lock:
+            conns = list(self._conns.values())
+            self._conns.clear()
+
+        for conn in conns:
+            self._close_conn(conn)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Pool hit/miss counters and number of open connections.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reconnects": self.reconnects,
+                "idle_closed": self.idle_closed,
+                "open_connections": len(self._conns),
+            }
+
+    def __str__(self):
+        return f"SSHConnectionPool({self.stats()})"
+
+    def __repr__(self):
+        return f"SSHConnectionPool({self.stats()})"
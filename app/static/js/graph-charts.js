@@ -8,6 +8,9 @@ $(document).ready(function() {
     let load5 = 0;
     let load15 = 0;
 
+    // Number of past samples to pre-fill the charts with on page load.
+    const HISTORY_SAMPLES = 30;
+
     function createLineChart(ctx, label, color, dataKey) {
         return new Chart(ctx, {
             type: 'line',
@@ -206,11 +209,32 @@ $(document).ready(function() {
         diskChart.update();
     }
 
-    function fetchData() {
+    // Backfills line charts with samples the server took before page load.
+    function prefillCharts(history) {
+        history.forEach(function(sample) {
+            const x = sample.time * 1000;
+            networkChart.data.datasets[0].data.push({x: x, y: sample.network.bytes_sent_rate});
+            networkChart.data.datasets[1].data.push({x: x, y: sample.network.bytes_recv_rate});
+            cpuChart.data.datasets[0].data.push({x: x, y: sample.cpu.cpu_usage});
+            memChart.data.datasets[0].data.push({x: x, y: sample.mem.percent_used});
+            loadChart.data.datasets[0].data.push({x: x, y: sample.cpu.load1});
+            loadChart.data.datasets[1].data.push({x: x, y: sample.cpu.load5});
+            loadChart.data.datasets[2].data.push({x: x, y: sample.cpu.load15});
+        });
+
+        [networkChart, cpuChart, memChart, loadChart].forEach(function(chart) {
+            chart.update('quiet');
+        });
+    }
+
+    function fetchData(withHistory) {
         $.ajax({
-            url: '/api/system-usage',
+            url: '/api/system-usage' + (withHistory ? '?history=' + HISTORY_SAMPLES : ''),
             method: 'GET',
             success: function(data) {
+                if (data.history) {
+                    prefillCharts(data.history);
+                }
                 updateCharts(data);
             },
             error: function() {
@@ -225,7 +249,7 @@ $(document).ready(function() {
         });
     }
 
-    fetchData();
+    fetchData(true);
     setInterval(fetchData, 1000);
 
     function bytesToGB(bytes) {
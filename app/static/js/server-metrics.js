@@ -0,0 +1,54 @@
+// Fills in the controls page's resource usage row from the game server's
+// latest process sweep. Uses serverName set by the controls template.
+function formatBytes(bytes) {
+  if (bytes >= 1024 ** 3) {
+    return (bytes / (1024 ** 3)).toFixed(2) + ' GB';
+  }
+  return (bytes / (1024 ** 2)).toFixed(1) + ' MB';
+}
+
+function showMetrics(entry) {
+  if (!entry.supported) {
+    $('#server-metrics').text('Not available for remote installs.');
+    return;
+  }
+
+  if (!entry.running) {
+    $('#metrics-cpu, #metrics-rss, #metrics-threads, #metrics-files, #metrics-ports').text('-');
+    return;
+  }
+
+  const cpu = entry.cpu_percent === null ? '-' : entry.cpu_percent.toFixed(1) + '%';
+  const files = entry.open_files === null ? 'n/a' : entry.open_files;
+
+  let ports = 'n/a';
+  if (entry.tcp_ports !== null) {
+    ports = entry.tcp_ports.map(port => port + '/tcp')
+      .concat(entry.udp_ports.map(port => port + '/udp'))
+      .join(', ') || '-';
+  }
+
+  $('#metrics-cpu').text(cpu);
+  $('#metrics-rss').text(formatBytes(entry.rss));
+  $('#metrics-threads').text(entry.threads);
+  $('#metrics-files').text(files);
+  $('#metrics-ports').text(ports);
+}
+
+function getServerMetrics() {
+  $.ajax({
+    url: '/api/server-metrics?server=' + encodeURIComponent(serverName),
+    type: 'GET',
+    success: function(data) {
+      if (data.servers.length > 0) {
+        showMetrics(data.servers[0]);
+      }
+      setTimeout(getServerMetrics, data.interval * 1000);
+    },
+    error: function() {
+      setTimeout(getServerMetrics, 10000);
+    }
+  });
+}
+
+$(document).ready(getServerMetrics);
@@ -4,10 +4,10 @@ function updateStatusIndicator(serverId, status) {
   let statusColor = '#00FF11';
   if (status === false) {
      statusColor = 'red';
-  } else if (status === null) { 
+  } else if (status === null) {
     // If explicitly null, stay grey. Aka problem with ssh conn.
     return;
-  } 
+  }
 
   const indicator = $(`#${serverId}`);
 
@@ -21,16 +21,27 @@ function updateStatusIndicator(serverId, status) {
   });
 }
 
-// Function to get the server status via the API and update the indicator.
+// Function to get all the server statuses via the API in one request and
+// update the indicators.
 function getServerStatus() {
+  // Get the server ids from the span elements.
+  const serverIds = [];
   $('.status-indicator').each(function() {
-    // Get the server id from the span element.
     const serverId = $(this).attr('id');
+    if (serverId) {
+      serverIds.push(serverId);
+    }
+  });
+
+  if (serverIds.length === 0) {
+    return;
+  }
 
-    // Make an API request to get the server status.
-    $.getJSON(`/api/server-status?id=${serverId}`, function(data) {
-      // Update the indicator based on the status.
-      updateStatusIndicator(serverId, data.status);
+  // Make one API request for all the server statuses.
+  $.getJSON('/api/server-statuses', { 'ids': serverIds.join(',') }, function(data) {
+    // Update the indicators based on the statuses.
+    data.servers.forEach(server => {
+      updateStatusIndicator(server.id, server.status);
     });
   });
 }
@@ -38,6 +49,6 @@ function getServerStatus() {
 // Initial call to update the indicators when the page loads.
 getServerStatus();
 
-// Refresh every 300000 milliseconds (aka 5 minutes).
-setInterval(getServerStatus, 300000);
-
+// Refresh every 10000 milliseconds (aka 10 seconds). Statuses are served from
+// the backend's status cache, so polling is cheap.
+setInterval(getServerStatus, 10000);
@@ -1,9 +1,3 @@
-// Track the last line processed.
-//let lastProcessedIndex = 0;
-// Keep track of last pulled output as source of truth.
-let previousStdOutput = [];
-let previousStdErrput = [];
-
 var spinners = document.getElementById("spinners");
 
 var term = new Terminal({
@@ -31,11 +25,15 @@ window.addEventListener('resize', function() {
     fitAddon.fit();
 });
 
+// Identifies this page to the backend, which keeps the console followed while
+// at least one viewer is still refreshing it.
+const viewerId = Math.random().toString(36).slice(2);
+
 function refreshOutput(sName) {
   return $.ajax({
     url: '/api/update-console',
     type: 'POST',
-    data: { 'server': serverName },
+    data: { 'server': serverName, 'viewer': viewerId },
     error: function(reqObj, textStatus, errorThrown) {
       // Send errors to the console.
       term.write(textStatus + '\n' + errorThrown);
@@ -44,68 +42,116 @@ function refreshOutput(sName) {
   });
 }
 
+// Seq number of the last change pulled from the backend.
+let outputSeq = 0;
+
+// Number of lines received since the output was last reset & number of them
+// already written to the terminal.
+let outLen = 0;
+let errLen = 0;
+let outShown = 0;
+let errShown = 0;
+
+// Write changes from /api/cmd-output?since= or the output stream to the
+// terminal. Returns false once the process has finished & no other cmd is
+// queued to run after it (non console mode).
+function writeChanges(changes) {
+  outputSeq = changes.seq;
+
+  // Output was cleared. For commands that's a new run, so show all of it.
+  // For console mode it's a refreshed pane capture, so only show lines past
+  // what's already been shown.
+  if (changes.reset) {
+    outLen = 0;
+    errLen = 0;
+    if (!sConsole) {
+      outShown = 0;
+      errShown = 0;
+    }
+  }
+
+  // Lines newer than what's been shown were dropped before they got here,
+  // the full output is still in /api/cmd-output-history.
+  if (changes.truncated) {
+    term.write('\r\x1b[33m[... output truncated, some lines skipped ...]\x1b[0m\n');
+  }
+
+  changes.stdout.forEach(line => {
+    outLen++;
+    if (outLen > outShown) {
+      outShown = outLen;
+      if (line.trim() !== '') {
+        term.write(`\r${line}`);
+      }
+    }
+  });
+
+  changes.stderr.forEach(line => {
+    errLen++;
+    if (errLen > errShown) {
+      errShown = errLen;
+      if (showStderr && line.trim() !== '') {
+        // Print "STDERR" red bold, before stderr text.
+        term.write(`\r\x1b[1m\x1b[31mSTDERR:\x1b[0m ${line}`);
+      }
+    }
+  });
+
+  // If not in console mode, display none spinners after proc finishes.
+  if (!sConsole) {
+    if (changes.process_lock === true || changes.queued > 0){
+      spinners.style.display = "block";
+    } else {
+      spinners.style.display = "none";
+      return false;
+    }
+  }
+  return true;
+}
+
+// Poll for output changes, only pulls what's new since the last poll.
 function updateTerminal(sName){
   return $.ajax({
     dataType: 'json',
     url: '/api/cmd-output',
     type: 'GET',
     data: {
-      'server': sName
+      'server': sName,
+      'since': outputSeq
     },
     error: function(reqObj, textStatus, errorThrown) {
       // Send errors to the console.
       term.write(textStatus + '\n' + errorThrown);
     },
     success: function(respJSON, textStatus, reqObj) {
-
-      // Extract stdout array from the JSON response.
-      const currentStdOutput = respJSON.stdout || [];
-
-      // Find new lines by comparing with previousStdOutput.
-      const newOutLines = currentStdOutput.slice(previousStdOutput.length);
-
-      if (newOutLines.length > 0) {
-        newOutLines.forEach(line => {
-          if (line.trim() !== '') {
-            term.write(`\r${line}`);
-          }
-        });
-
-        // Update the previously processed output to the current output.
-        previousStdOutput = currentStdOutput;
+      // Nothing changed (304).
+      if (!respJSON) {
+        return;
       }
 
-      if ( showStderr ) {
-        // Extract stderr array from the JSON response.
-        const currentStdErrput = respJSON.stderr || [];
-
-        // Find new lines by comparing with previousStdErrput.
-        const newErrLines = currentStdErrput.slice(previousStdErrput.length);
-
-        if (newErrLines.length > 0) {
-          newErrLines.forEach(line => {
-            if (line.trim() !== '') {
-              // Print "STDERR" red bold, before stderr text.
-              term.write(`\r\x1b[1m\x1b[31mSTDERR:\x1b[0m ${line}`);
-            }
-          });
-
-          // Update the previously processed err output to the current output.
-          previousStdErrput = currentStdErrput;
-        }
+      if (!writeChanges(respJSON)) {
+        clearInterval(interval);
       }
+    }
+  });
+}
 
-      // If not in console mode, display none spinners after proc finishes.
-      if (!sConsole) {
-        if (respJSON.process_lock === true){
-          spinners.style.display = "block";
-        } else {
-          spinners.style.display = "none";
-          clearInterval(interval);
-        }
-      }
+// Stream output via Server-Sent Events. Backend only pushes what's new. In
+// console mode streams the game server's console instead of cmd output.
+function streamTerminal(sName) {
+  let url = '/api/cmd-output-stream?server=' + encodeURIComponent(sName);
+  if (sConsole) {
+    url += '&console=true';
+  }
+  const source = new EventSource(url);
+
+  source.addEventListener('output', function(event) {
+    if (!writeChanges(JSON.parse(event.data))) {
+      source.close();
     }
   });
+
+  return source;
 }
 
 // If the variable is undefined, empty, or null, report no output.
@@ -114,11 +160,24 @@ if (typeof serverName === 'undefined' || serverName === null || !serverName) {
 } else if (typeof sConsole !== 'undefined' && sConsole) {
   // If live console output mode is enabled, start the loop.
   spinners.style.display = "block";
-  var interval = setInterval(function() {
+  if (typeof EventSource !== 'undefined') {
+    // Console stream has to be started before it can be streamed. Refreshes
+    // after that just make sure it's still running.
     refreshOutput(serverName).then(function() {
-      return updateTerminal(serverName);
+      streamTerminal(serverName);
     });
-  }, 5000);
+    var interval = setInterval(function() {
+      refreshOutput(serverName);
+    }, 5000);
+  } else {
+    var interval = setInterval(function() {
+      refreshOutput(serverName).then(function() {
+        return updateTerminal(serverName);
+      });
+    }, 5000);
+  }
+} else if (typeof EventSource !== 'undefined') {
+  streamTerminal(serverName);
 } else {
   var interval = setInterval(function() {
     updateTerminal(serverName);
@@ -0,0 +1,509 @@
+import os
+import time
+import sqlite3
+import threading
+
+from .models import GameServer
+from .utils import (
+    get_server_status,
+    get_server_statuses,
+    get_tmux_socket_name,
+    get_tmux_socket_dir,
+    should_use_ssh,
+    shared_state,
+    single_flight,
+    settings_cache,
+    ssh_pool,
+    log_wrap,
+)
+from .tmux_watcher import TmuxSocketWatcher
+
+
+class StatusCache:
+    """
+    Class used to hold the most recent game server statuses, as collected by
+    the StatusMonitor. Lets the api routes & controls page answer status
+    requests without running any tmux / ssh / docker probes themselves.
+
+    Entries can be held while a status changing command (start, stop, etc.)
+    is running and are marked dirty once it finishes. Readers of a held or
+    dirty entry can wait for the monitor to re-probe it.
+
+    If given a SharedState, entries & dirty marks are written through to it,
+    so workers that aren't running the monitor see the same statuses & can
+    ask the one that is for re-probes.
+
+    Args:
+        shared (SharedState): Optional state shared with other workers.
+    """
+
+    # Seconds between shared state checks while waiting on a re-probe.
+    SHARED_POLL = 0.25
+
+    def __init__(self, shared=None):
+        self.shared = shared
+        # Holds server_id -> {"status", "checked_at", "elapsed_ms", "host"}.
+        self._entries = {}
+        self._holds = {}
+        # Holds server_id -> time it was marked dirty.
+        self._dirty = {}
+        self._cond = threading.Condition()
+        # Set whenever the monitor should wake up early.
+        self.wake = threading.Event()
+
+    def _share(self, func, *args):
+        """Calls shared state method, if there is a shared state."""
+        if self.shared == None:
+            return None
+        try:
+            return func(*args)
+        except sqlite3.Error:
+            return None
+
+    def _mark_dirty(self, server_id):
+        self._dirty.setdefault(server_id, time.time())
+        if self.shared != None:
+            self._share(self.shared.put, "status_dirty", server_id, time.time())
+
+    def _sync(self, server_id):
+        """Pulls newer entry for server_id from shared state, if there is one."""
+        if self.shared == None:
+            return
+
+        shared_entry = self._share(self.shared.get, "status", server_id)
+        if shared_entry == None:
+            return
+
+        entry = self._entries.get(server_id)
+        if entry == None or shared_entry["checked_at"] > entry["checked_at"]:
+            self._entries[server_id] = shared_entry
+
+        # Re-probed since being marked dirty here.
+        marked_at = self._dirty.get(server_id)
+        if marked_at != None and self._holds.get(server_id, 0) == 0:
+            if shared_entry["checked_at"] >= marked_at:
+                del self._dirty[server_id]
+
+    def _pending(self, server_id):
+        return (
+            server_id not in self._entries
+            or server_id in self._dirty
+            or self._holds.get(server_id, 0) > 0
+        )
+
+    def update(self, results):
+        """
+        Stores fresh probe results.
+
+        Args:
+            results (list): List of dicts from get_server_statuses().
+        """
+        now = time.time()
+        with self._cond:
+            for result in results:
+                server_id = result["id"]
+                self._entries[server_id] = {
+                    "status": result["status"],
+                    "checked_at": now,
+                    "elapsed_ms": result["elapsed_ms"],
+                    "host": result["host"],
+                }
+                if self._holds.get(server_id, 0) == 0:
+                    self._dirty.pop(server_id, None)
+            self._cond.notify_all()
+
+        if self.shared != None:
+            for result in results:
+                server_id = result["id"]
+                self._share(
+                    self.shared.put, "status", server_id, self._entries[server_id]
+                )
+                self._share(self.shared.delete, "status_dirty", server_id)
+
+    def set_status(self, server_id, status):
+        """Pushes a known status transition straight into the cache."""
+        with self._cond:
+            entry = self._entries.get(server_id)
+            if entry == None:
+                entry = {"elapsed_ms": 0, "host": None}
+                self._entries[server_id] = entry
+            entry["status"] = status
+            entry["checked_at"] = time.time()
+            self._cond.notify_all()
+
+        if self.shared != None:
+            self._share(self.shared.put, "status", server_id, entry)
+
+    def get(self, server_id, wait=0, max_age=None):
+        """
+        Get's cached status for a game server. Never probes anything itself,
+        see StatusMonitor.get() for that.
+
+        Args:
+            server_id (int): Id of game server to get status of.
+            wait (float): Seconds to wait for the monitor if the entry is
+                          missing, held, or dirty.
+            max_age (float): Entries older than this are flagged stale.
+
+        Returns:
+            dict: Status entry with id, status, checked_at, age, elapsed_ms,
+                  host, & stale keys. Status is None if never checked.
+        """
+        deadline = time.time() + wait
+        with self._cond:
+            self._sync(server_id)
+            if self._pending(server_id):
+                self._mark_dirty(server_id)
+                self.wake.set()
+
+            while self._pending(server_id):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                # Other workers' monitor results only show up in shared state.
+                if self.shared != None:
+                    remaining = min(remaining, self.SHARED_POLL)
+                self._cond.wait(remaining)
+                self._sync(server_id)
+
+            entry = dict(self._entries.get(server_id, {}))
+            pending = self._pending(server_id)
+
+        now = time.time()
+        checked_at = entry.get("checked_at")
+        age = None
+        if checked_at != None:
+            age = round(now - checked_at, 2)
+
+        stale = pending or age == None or (max_age != None and age > max_age)
+
+        return {
+            "id": server_id,
+            "status": entry.get("status"),
+            "checked_at": checked_at,
+            "age": age,
+            "elapsed_ms": entry.get("elapsed_ms"),
+            "host": entry.get("host"),
+            "stale": stale,
+        }
+
+    def invalidate(self, server_id):
+        """Marks entry dirty & wakes the monitor to re-probe it."""
+        with self._cond:
+            self._mark_dirty(server_id)
+        self.wake.set()
+
+    def hold(self, server_id):
+        """Marks entry as held by a running status changing command."""
+        with self._cond:
+            self._holds[server_id] = self._holds.get(server_id, 0) + 1
+            self._dirty[server_id] = time.time()
+
+    def release(self, server_id):
+        """Drops a hold & marks entry dirty so it gets re-probed."""
+        with self._cond:
+            holds = self._holds.get(server_id, 0) - 1
+            if holds > 0:
+                self._holds[server_id] = holds
+            else:
+                self._holds.pop(server_id, None)
+            # Re-marked, only probes started after the cmd finished count.
+            self._dirty[server_id] = time.time()
+            if self.shared != None:
+                self._share(self.shared.put, "status_dirty", server_id, time.time())
+            self._cond.notify_all()
+        self.wake.set()
+
+    def run_held(self, server_id, func, *args):
+        """
+        Holds server_id's entry while func(*args) runs, then releases it. Used
+        as job target for status changing commands, so the hold starts when
+        the job does, not while it's queued. Status probes started before the
+        cmd finished are forgotten, so nobody joins one for a stale status.
+        """
+        self.hold(server_id)
+        try:
+            func(*args)
+        finally:
+            single_flight.forget(server_id)
+            self.release(server_id)
+
+    def dirty_ids(self):
+        """
+        Returns set of ids that need re-probing & aren't currently held,
+        including ones other workers asked for.
+        """
+        shared_dirty = set()
+        if self.shared != None:
+            shared_dirty = self._share(self.shared.items, "status_dirty") or {}
+            shared_dirty = {int(server_id) for server_id in shared_dirty}
+
+        with self._cond:
+            dirty = set(self._dirty) | shared_dirty
+            return {i for i in dirty if self._holds.get(i, 0) == 0}
+
+    def remove(self, server_id):
+        """Forgets cached status for deleted game server."""
+        with self._cond:
+            self._entries.pop(server_id, None)
+            self._holds.pop(server_id, None)
+            self._dirty.pop(server_id, None)
+
+        if self.shared != None:
+            self._share(self.shared.delete, "status", server_id)
+            self._share(self.shared.delete, "status_dirty", server_id)
+
+
+class StatusMonitor:
+    """
+    Class used to run the background status monitor thread. Polls all
+    GameServer rows on the status_interval from main.conf & stores the results
+    in the StatusCache. Hosts that can't be reached are backed off, starting at
+    status_unreachable_interval & doubling up to max_backoff seconds.
+
+    If given a TmuxSocketWatcher, local same user installs get their status
+    transitions pushed by it between sweeps & sweeps act as reconciliation.
+
+    When the cache has a SharedState, only the worker holding the monitor
+    lease runs sweeps. The rest stand by & take over if it lapses.
+
+    Args:
+        cache (StatusCache): Cache to store status results in.
+        max_backoff (int): Max seconds between checks of unreachable hosts.
+        watcher (TmuxSocketWatcher): Optional tmux socket watcher.
+    """
+
+    # Seconds the monitor lease lasts. Leader renews it at least every third
+    # of that, standbys check for a lapsed lease just as often.
+    LEASE_TTL = 30
+
+    def __init__(self, cache, max_backoff=1800, watcher=None):
+        self.cache = cache
+        self.max_backoff = max_backoff
+        self.watcher = watcher
+        self.app = None
+        self.thread = None
+        self.sweeps = 0
+        self.leader = False
+        # Holds host -> {"next_check", "failures"}.
+        self._hosts = {}
+
+    def start(self, app):
+        """Starts the monitor thread once per process."""
+        if self.thread and self.thread.is_alive():
+            return
+
+        self.app = app
+        if self.watcher:
+            self.watcher.start()
+
+        self.thread = threading.Thread(
+            target=self.run, daemon=True, name="StatusMonitor"
+        )
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread != None and self.thread.is_alive()
+
+    def get(self, server, wait=0, max_age=None):
+        """
+        Get's cached status for a game server, like StatusCache.get(). A
+        process not running the monitor (ex: debug server, CLI cmds, tests)
+        has nobody to re-probe for it, & an entry can still be missing once
+        the wait is up, so those get probed right here. Probes go through
+        single_flight, so concurrent callers share one.
+
+        Args:
+            server (GameServer): Game server to get status of.
+            wait (float): Seconds to wait for the monitor if the entry is
+                          missing, held, or dirty.
+            max_age (float): Entries older than this are flagged stale.
+
+        Returns:
+            dict: Status entry, see StatusCache.get().
+        """
+        running = self.is_running()
+        if not running:
+            wait = 0
+
+        entry = self.cache.get(server.id, wait=wait, max_age=max_age)
+        if running and entry["checked_at"] != None:
+            return entry
+        if not running and not entry["stale"]:
+            return entry
+
+        start = time.perf_counter()
+        status = get_server_status(server)
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.cache.update(
+            [
+                {
+                    "id": server.id,
+                    "status": status,
+                    "elapsed_ms": elapsed_ms,
+                    "host": server.install_host,
+                }
+            ]
+        )
+        return self.cache.get(server.id, max_age=max_age)
+
+    def read_intervals(self):
+        settings = settings_cache.get().settings
+        return (
+            max(settings.status_interval, 1),
+            max(settings.status_unreachable_interval, 1),
+        )
+
+    def host_due(self, host, now):
+        state = self._hosts.get(host)
+        if state == None:
+            return True
+        return now >= state["next_check"]
+
+    def schedule_host(self, host, reachable, now, interval, unreachable_interval):
+        state = self._hosts.setdefault(host, {"next_check": 0, "failures": 0})
+        if reachable:
+            state["failures"] = 0
+            state["next_check"] = now + interval
+            return
+
+        state["failures"] += 1
+        backoff = unreachable_interval * 2 ** (state["failures"] - 1)
+        state["next_check"] = now + min(backoff, self.max_backoff)
+
+    def sweep(self):
+        """
+        Probes every game server that's due or dirty & updates the cache.
+
+        Returns:
+            float: Seconds until the next host is due.
+        """
+        interval, unreachable_interval = self.read_intervals()
+        now = time.time()
+        dirty = self.cache.dirty_ids()
+
+        all_servers = GameServer.query.filter_by(install_finished=True).all()
+
+        due_hosts = set()
+        to_probe = []
+        for server in all_servers:
+            if self.host_due(server.install_host, now):
+                due_hosts.add(server.install_host)
+                to_probe.append(server)
+            elif server.id in dirty:
+                to_probe.append(server)
+
+        if to_probe:
+            results = get_server_statuses(to_probe)
+            self.cache.update(results)
+
+            # Hosts reached over ssh that came back all indeterminate are
+            # considered unreachable.
+            statuses = {result["id"]: result["status"] for result in results}
+            host_reachable = {host: False for host in due_hosts}
+            for server in to_probe:
+                if server.install_host not in host_reachable:
+                    continue
+                if statuses.get(server.id) != None or not should_use_ssh(server):
+                    host_reachable[server.install_host] = True
+
+            for host in due_hosts:
+                self.schedule_host(
+                    host, host_reachable[host], now, interval, unreachable_interval
+                )
+
+        if self.watcher:
+            self.watch_sockets(all_servers)
+
+        # Dirty ids for deleted servers are never probed, drop them.
+        server_ids = {server.id for server in all_servers}
+        for server_id in dirty - server_ids:
+            self.cache.remove(server_id)
+
+        self.sweeps += 1
+
+        now = time.time()
+        next_due = [state["next_check"] - now for state in self._hosts.values()]
+        return min(next_due + [interval])
+
+    def watch_sockets(self, all_servers):
+        """Points the watcher at the sockets of local same user installs."""
+        socket_dir = get_tmux_socket_dir()
+        sockets = dict()
+        for server in all_servers:
+            if server.install_type != "local" or should_use_ssh(server):
+                continue
+            socket = get_tmux_socket_name(server)
+            if socket != None:
+                sockets[os.path.join(socket_dir, socket)] = server.id
+
+        self.watcher.watch(sockets)
+
+    def is_leader(self):
+        """Takes or renews the monitor lease, True if this worker has it."""
+        shared = self.cache.shared
+        if shared == None:
+            return True
+
+        try:
+            self.leader = shared.acquire_lease("status_monitor", self.LEASE_TTL)
+        except sqlite3.Error:
+            self.leader = False
+        return self.leader
+
+    def wait(self, timeout):
+        """
+        Sleeps until timeout or woken. With a shared state, also wakes when
+        another worker asks for a re-probe.
+        """
+        if self.cache.shared == None:
+            self.cache.wake.wait(timeout)
+            return
+
+        deadline = time.time() + min(timeout, self.LEASE_TTL / 3)
+        while time.time() < deadline:
+            if self.cache.wake.wait(min(1, deadline - time.time())):
+                return
+            if self.leader and self.cache.dirty_ids():
+                return
+
+    def run(self):
+        while True:
+            self.cache.wake.clear()
+            # Every worker has its own ssh pool, leader or not. Swept here so
+            # idle transports get closed even while there's no ssh traffic.
+            ssh_pool.close_idle()
+
+            if not self.is_leader():
+                self.wait(self.LEASE_TTL / 3)
+                continue
+
+            try:
+                with self.app.app_context():
+                    sleep_for = self.sweep()
+            except Exception as e:
+                self.app.logger.info(log_wrap("status monitor error", e))
+                sleep_for = 5
+
+            self.wait(max(sleep_for, 0.5))
+
+    def stats(self):
+        """
+        Returns:
+            dict: Number of sweeps run, hosts currently backed off, & watcher
+                  stats if there is one.
+        """
+        backed_off = [h for h, s in self._hosts.items() if s["failures"] > 0]
+        stats = {
+            "sweeps": self.sweeps,
+            "leader": self.leader,
+            "unreachable_hosts": backed_off,
+        }
+        if self.watcher:
+            stats["watcher"] = self.watcher.stats()
+        return stats
+
+
+# Per process status cache, shared with other workers, & its monitor.
+status_cache = StatusCache(shared_state)
+status_monitor = StatusMonitor(status_cache, watcher=TmuxSocketWatcher(status_cache))
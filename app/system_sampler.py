@@ -0,0 +1,121 @@
+import time
+import itertools
+import threading
+
+from collections import deque
+
+from .utils import get_server_stats
+
+# Seconds between system usage samples.
+SAMPLE_INTERVAL = 1
+# Number of samples kept, 10 minutes worth.
+HISTORY_SIZE = 600
+
+
+class SystemSampler:
+    """
+    Class used to sample system usage (disk, cpu, mem, & network) from a
+    background thread at a fixed cadence, instead of on every /api/system-usage
+    request. Samples go into a fixed size ring buffer, so the latest sample &
+    recent history can be served without touching psutil. Since samples are
+    always SAMPLE_INTERVAL apart, network rates are never computed from the
+    tiny intervals between two tabs polling at once.
+
+    Args:
+        sample_func (function): Returns a dict of system usage stats.
+        interval (float): Seconds between samples.
+        size (int): Max number of samples kept.
+    """
+
+    def __init__(self, sample_func, interval=SAMPLE_INTERVAL, size=HISTORY_SIZE):
+        self.sample_func = sample_func
+        self.interval = interval
+        self.size = size
+        self.thread = None
+
+        # Counters.
+        self.samples = 0
+        self.errors = 0
+
+        self._history = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def sample(self):
+        """Takes a sample, stamped with its unix time, & stores it."""
+        stats = self.sample_func()
+        stats["time"] = time.time()
+        with self._lock:
+            self._history.append(stats)
+            self.samples += 1
+        return stats
+
+    def run(self):
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception:
+                self.errors += 1
+
+            # Keep to the cadence, skipping ticks if a sample ran long.
+            next_at += self.interval
+            now = time.monotonic()
+            if next_at < now:
+                next_at = now + self.interval
+            self._stop.wait(next_at - now)
+
+    def start(self):
+        """Starts sampling in a daemon thread, once per process."""
+        with self._lock:
+            if self.thread != None and self.thread.is_alive():
+                return
+            self._stop.clear()
+            self.thread = threading.Thread(
+                target=self.run, daemon=True, name="SystemSampler"
+            )
+            self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def latest(self):
+        """
+        Returns:
+            dict: Most recent sample. Taken on the spot if there isn't one
+                  yet, ex: sampler not started.
+        """
+        with self._lock:
+            if self._history:
+                return self._history[-1]
+        return self.sample()
+
+    def history(self, count):
+        """
+        Args:
+            count (int): Max number of samples to return.
+
+        Returns:
+            list: Up to count most recent samples, oldest first.
+        """
+        with self._lock:
+            start = len(self._history) - min(max(count, 0), len(self._history))
+            return list(itertools.islice(self._history, start, None))
+
+    def stats(self):
+        """
+        Returns:
+            dict: Dictionary of sampler counters.
+        """
+        with self._lock:
+            return {
+                "running": self.thread != None and self.thread.is_alive(),
+                "interval": self.interval,
+                "buffered": len(self._history),
+                "size": self.size,
+                "samples": self.samples,
+                "errors": self.errors,
+            }
+
+
+system_sampler = SystemSampler(get_server_stats)
@@ -0,0 +1,163 @@
+import os
+import struct
+import ctypes
+import select
+import threading
+
+# Inotify constants, see inotify(7).
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class TmuxSocketWatcher:
+    """
+    Class used to watch tmux socket directories (ex: /tmp/tmux-1000) with
+    Linux inotify. tmux creates a game server's socket file when its server
+    starts & unlinks it on shutdown, so socket create / delete events are
+    pushed straight into the StatusCache as on / off transitions.
+
+    The StatusMonitor's periodic sweep stays the source of truth & catches
+    anything the watcher can't see (ex: crashed tmux servers leaving stale
+    sockets behind). Only works for dirs the app user can read, aka local
+    same user installs.
+
+    Args:
+        cache (StatusCache): Cache to push status transitions into.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.events = 0
+        self.fd = None
+        self.thread = None
+        # Holds socket_path -> server_id for watched game servers.
+        self._sockets = {}
+        # Holds dir -> watch descriptor & the reverse.
+        self._dirs = {}
+        self._wds = {}
+        self._lock = threading.Lock()
+        self._libc = None
+
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            libc.inotify_init1
+            libc.inotify_add_watch.argtypes = [
+                ctypes.c_int,
+                ctypes.c_char_p,
+                ctypes.c_uint32,
+            ]
+            self._libc = libc
+        except (OSError, AttributeError):
+            # Not on Linux, nothing to watch with.
+            pass
+
+    @property
+    def available(self):
+        return self._libc != None
+
+    def start(self):
+        """Opens inotify instance & starts watcher thread once per process."""
+        if not self.available or (self.thread and self.thread.is_alive()):
+            return False
+
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+
+        self.fd = fd
+        self.thread = threading.Thread(
+            target=self.run, daemon=True, name="TmuxSocketWatcher"
+        )
+        self.thread.start()
+        return True
+
+    def watch(self, sockets):
+        """
+        Sets which tmux sockets to watch. Called by the StatusMonitor every
+        sweep, so new game servers & socket dirs that didn't exist yet get
+        picked up.
+
+        Args:
+            sockets (dict): Dictionary of socket paths to game server ids.
+        """
+        if self.fd == None:
+            return
+
+        dirs = {os.path.dirname(path) for path in sockets}
+        with self._lock:
+            self._sockets = dict(sockets)
+
+            for path in dirs - set(self._dirs):
+                wd = self._libc.inotify_add_watch(
+                    self.fd, os.fsencode(path), WATCH_MASK
+                )
+                # Dir doesn't exist yet or isn't readable, retried next sweep.
+                if wd < 0:
+                    continue
+                self._dirs[path] = wd
+                self._wds[wd] = path
+
+    def handle_events(self, data):
+        """
+        Parses raw inotify events & pushes matching socket transitions into
+        the status cache.
+
+        Args:
+            data (bytes): Raw bytes read from the inotify fd.
+        """
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            with self._lock:
+                path = self._wds.get(wd)
+                if path == None:
+                    continue
+
+                # Dir removed, forget it so the next sweep re-adds it.
+                if mask & (IN_DELETE_SELF | IN_IGNORED):
+                    self._wds.pop(wd, None)
+                    self._dirs.pop(path, None)
+                    continue
+
+                socket_path = os.path.join(path, os.fsdecode(name))
+                server_id = self._sockets.get(socket_path)
+
+            if server_id == None:
+                continue
+
+            self.events += 1
+            self.cache.set_status(server_id, bool(mask & (IN_CREATE | IN_MOVED_TO)))
+
+    def run(self):
+        while True:
+            select.select([self.fd], [], [])
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                continue
+            self.handle_events(data)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Whether watcher is running, watched dirs, & events handled.
+        """
+        with self._lock:
+            return {
+                "running": self.fd != None,
+                "watched_dirs": sorted(self._dirs),
+                "events": self.events,
+            }
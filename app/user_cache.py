@@ -0,0 +1,170 @@
+import time
+import uuid
+import threading
+
+from collections import OrderedDict
+from flask_login import UserMixin
+
+
+class CachedUser(UserMixin):
+    """
+    Class used to hold a detached, read only copy of a User row. It's what
+    flask_login's current_user is on requests where the user came out of the
+    UserCache, so it has the same columns as the User model.
+
+    Args:
+        user (User): User model instance to copy.
+    """
+
+    FIELDS = ("id", "username", "password", "role", "permissions", "date_created")
+
+    def __init__(self, user):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(user, field))
+
+    def __repr__(self):
+        return (
+            f"<CachedUser(id={self.id}, username='{self.username}', "
+            + f"role='{self.role}', date_created='{self.date_created}')>"
+        )
+
+    def __str__(self):
+        return (
+            f"User {self.username} (ID: {self.id}, Role: {self.role}, "
+            + f"Created: {self.date_created})"
+        )
+
+
+class UserCache:
+    """
+    Class used to keep recently seen users in memory, so flask_login's
+    user_loader doesn't query the db on every authenticated request (ex: each
+    output poll from every open tab). Holds at most max_users users, least
+    recently used are evicted first, & each is reloaded from the db after ttl
+    seconds regardless.
+
+    Changing a user's password, role, or permissions must call invalidate().
+    That drops the user locally & bumps the user's version stamp in the shared
+    state. Other workers (and this one, for changes made by another process
+    like `web-lgsm.py --passwd`) check the shared stamps at most once per
+    SYNC_INTERVAL & drop users whose stamp changed.
+
+    Args:
+        max_users (int): Max number of users to keep.
+        ttl (float): Seconds a cached user is good for.
+        shared (SharedState): Optional state shared with other processes.
+    """
+
+    # Seconds between checks of the shared version stamps.
+    SYNC_INTERVAL = 1
+    # Seconds version stamps are kept in the shared state.
+    SHARED_MAX_AGE = 86400
+
+    def __init__(self, max_users=256, ttl=60, shared=None):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.shared = shared
+
+        # Counters.
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        # Holds user id -> (CachedUser, loaded at), least recently used first.
+        self._users = OrderedDict()
+        # Holds user id -> version stamp, as of the last sync.
+        self._versions = {}
+        self._synced_at = 0
+        self._lock = threading.Lock()
+
+    def _sync(self, now):
+        """Drops users whose shared version stamp changed since last sync."""
+        if self.shared == None or now - self._synced_at < self.SYNC_INTERVAL:
+            return
+        self._synced_at = now
+
+        try:
+            versions = {
+                int(user_id): stamp
+                for user_id, stamp in self.shared.items("user_versions").items()
+            }
+        except Exception:
+            # Fall back to ttl only.
+            return
+
+        for user_id in set(versions) | set(self._versions):
+            if versions.get(user_id) != self._versions.get(user_id):
+                self._users.pop(user_id, None)
+        self._versions = versions
+
+    def get(self, user_id, loader):
+        """
+        Returns cached copy of user, calling loader to fetch it on a miss.
+
+        Args:
+            user_id (int): Id of user.
+            loader (function): Called with user_id, returns User or None.
+
+        Returns:
+            CachedUser: Copy of user, or None if loader didn't find it.
+        """
+        now = time.time()
+        with self._lock:
+            self._sync(now)
+            entry = self._users.get(user_id)
+            if entry != None and now - entry[1] < self.ttl:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            invalidations = self.invalidations
+
+        user = loader(user_id)
+        if user == None:
+            return None
+
+        cached = CachedUser(user)
+        with self._lock:
+            # Don't keep a copy that may predate an invalidate() during load.
+            if self.invalidations != invalidations:
+                return cached
+            self._users[user_id] = (cached, now)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_id):
+        """Drops user here & tells every other process to drop it too."""
+        with self._lock:
+            self._users.pop(user_id, None)
+            self.invalidations += 1
+
+        if self.shared == None:
+            return
+
+        stamp = uuid.uuid4().hex
+        with self._lock:
+            # Already dropped here, no need to drop again on next sync.
+            self._versions[user_id] = stamp
+
+        try:
+            self.shared.put("user_versions", user_id, stamp)
+            self.shared.prune("user_versions", self.SHARED_MAX_AGE)
+        except Exception:
+            pass
+
+    def stats(self):
+        """
+        Returns:
+            dict: Dictionary of user cache counters.
+        """
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "max_users": self.max_users,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
@@ -14,18 +14,31 @@ import socket
 import getpass
 import paramiko
 import requests
+import select
+import selectors
 import subprocess
 import threading
-import configparser
 
 from datetime import datetime, timedelta
 from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
 from flask import flash, current_app
+from werkzeug.utils import secure_filename
 
 from . import db
 from .models import GameServer
 from .proc_info_vessel import ProcInfoVessel
 from .cmd_descriptor import CmdDescriptor
+from .line_assembler import LineAssembler
+from .ssh_pool import SSHConnectionPool
+from .single_flight import SingleFlight
+from .jobs import JobExecutor
+from .shared_state import SharedState, OutputPublisher
+from .settings import SettingsCache
+from .json_registry import JsonRegistry
+from .permissions import PermissionsCache
+from .user_cache import UserCache
+from .metrics_store import MetricsStore
 
 # Constants.
 CWD = os.getcwd()
@@ -36,6 +49,7 @@ PATHS = {
     "sudo": "/usr/bin/sudo",
     "tmux": "/usr/bin/tmux",
     "cat": "/usr/bin/cat",
+    "tail": "/usr/bin/tail",
     "kill": "/usr/bin/kill",
     "find": "/usr/bin/find",
     "ssh-keygen": "/usr/bin/ssh-keygen",
@@ -48,6 +62,42 @@ CONNECTOR_CMD = [
     ANSIBLE_CONNECTOR,
 ]
 
+# Persistent ssh connections, shared by run_cmd_ssh() & sftp helpers.
+ssh_pool = SSHConnectionPool()
+
+# Parsed main.conf, only re-read when the file changes.
+settings_cache = SettingsCache(os.path.join(CWD, "main.conf"))
+
+# Indexed json/ data files, only re-read when they change.
+json_registry = JsonRegistry(os.path.join(CWD, "json"))
+
+# Compiled user permissions, re-parsed only when a user's permissions change.
+permissions_cache = PermissionsCache()
+
+# State shared between gunicorn workers & the thread publishing this worker's
+# command output to it.
+shared_state = SharedState(os.path.join(CWD, "app/shared_state.db"))
+output_publisher = OutputPublisher(shared_state)
+
+# Long term host & game server metrics history, rolled up as it's written.
+metrics_store = MetricsStore(os.path.join(CWD, "app/metrics.db"))
+
+# Recently seen users, so flask_login doesn't query the db on every request.
+user_cache = UserCache(shared=shared_state)
+
+# Bounded worker pool that runs game server commands & installs.
+job_executor = JobExecutor(shared=shared_state)
+
+# Coalesces duplicate concurrent probes for the same game server, from
+# multiple tabs, polling loops, & page loads.
+single_flight = SingleFlight()
+# Seconds to reuse finished cfg file searches for. Status probes aren't reused,
+# so a status fetched right after a start/stop cmd is always fresh.
+CFG_PATHS_FLIGHT_TTL = 10
+
+# Guards tmux socket name cache file read-modify-writes.
+tmux_socket_cache_lock = threading.Lock()
+
 # Network stats globals.
 prev_bytes_sent = psutil.net_io_counters().bytes_sent
 prev_bytes_recv = psutil.net_io_counters().bytes_recv
@@ -156,63 +206,49 @@ def valid_password(password1, password2):
     return True
 
 
-def process_popen_output(proc, proc_info, output_type):
+def process_popen_output(proc, proc_info):
     """
     Reads stdout & stderr from proc subprocess object to parse it and append it
-    to proc_info object.
+    to proc_info object. Both pipes are multiplexed in one select loop, so
+    neither can fill up & stall the process while the other is being read,
+    and both reach the UI as the output happens.
 
     Args:
         proc (subprocess.Popen): Process object to squeeze stdout/stderr out of.
         proc_info (ProcInfoVessel): Object for holding info about process.
-        output_type (str): Output stream we're parsing.
 
     Returns:
         None: Just fills out ProcInfoVessel objects text fields with parsed text.
     """
-    config = configparser.ConfigParser()
-    config.read("main.conf")
-    end_in_newlines = get_config_value(
-        config, "settings", "end_in_newlines", True, True
-    )
+    end_in_newlines = settings_cache.get().settings.end_in_newlines
 
-    while True:
-        if output_type == "stdout":
-            out_line = proc.stdout.read1().decode("utf-8")
-        else:
-            out_line = proc.stderr.read1().decode("utf-8")
-
-        if not out_line:
-            break
-
-        for rline in out_line.split("\r"):
-            if rline == "":
-                continue
-
-            # Add back in carriage returns, ignoring lines terminated with a newline.
-            if not rline.endswith("\r") and not rline.endswith("\n"):
-                rline = rline + "\r"
-
-            for line in rline.split("\n"):
-                if line == "":
-                    continue
-
-                # Add back in newlines, ignoring lines terminated with a carriage return.
-                if not line.endswith("\n") and not line.endswith("\r"):
-                    line = line + "\n"
+    with selectors.DefaultSelector() as selector:
+        selector.register(
+            proc.stdout, selectors.EVENT_READ, ("stdout", LineAssembler(end_in_newlines))
+        )
+        selector.register(
+            proc.stderr, selectors.EVENT_READ, ("stderr", LineAssembler(end_in_newlines))
+        )
 
-                # Add the newlines for optional old-style setting.
-                if end_in_newlines:
-                    if not line.endswith("\n"):
-                        line = line + "\n"
+        while selector.get_map():
+            for key, _ in selector.select():
+                output_type, assembler = key.data
 
-                if output_type == "stdout":
-                    proc_info.stdout.append(line)
-                    log_msg = log_wrap("stdout", line.replace("\n", ""))
-                    current_app.logger.debug(log_msg)
+                # Pipe is readable, so this returns whatever's there now.
+                chunk = os.read(key.fd, 8192)
+                proc_info.last_output_at = time.time()
 
+                if chunk:
+                    lines = assembler.feed(chunk)
                 else:
-                    proc_info.stderr.append(line)
-                    log_msg = log_wrap("stderr", line.replace("\n", ""))
+                    # EOF, pipe closed.
+                    selector.unregister(key.fileobj)
+                    lines = assembler.flush()
+
+                output = getattr(proc_info, output_type)
+                for line in lines:
+                    output.append(line)
+                    log_msg = log_wrap(output_type, line.replace("\n", ""))
                     current_app.logger.debug(log_msg)
 
 
@@ -231,23 +267,19 @@ def run_cmd_popen(cmd, proc_info=ProcInfoVessel(), app_context=False):
     Returns:
         None: Doesn't return anything, just updates ProcInfoVessel object.
     """
-    config = configparser.ConfigParser()
-    config.read("main.conf")
-    clear_output_on_reload = get_config_value(
-        config, "settings", "clear_output_on_reload", True, True
-    )
+    # App context needed for logging in threads. Popped when done, job pool
+    # threads get reused.
+    if app_context:
+        with app_context:
+            return run_cmd_popen(cmd, proc_info)
 
-    if clear_output_on_reload:
+    if settings_cache.get().settings.clear_output_on_reload:
         proc_info.stdout.clear()
         proc_info.stderr.clear()
 
     # Set lock flag to true.
     proc_info.process_lock = True
 
-    # App context needed for logging in threads.
-    if app_context:
-        app_context.push()
-
     current_app.logger.info(log_wrap("cmd", cmd))
 
     # Subprocess call, Bytes mode, not buffered.
@@ -257,8 +289,7 @@ def run_cmd_popen(cmd, proc_info=ProcInfoVessel(), app_context=False):
 
     proc_info.pid = proc.pid
 
-    process_popen_output(proc, proc_info, "stdout")
-    process_popen_output(proc, proc_info, "stderr")
+    process_popen_output(proc, proc_info)
 
     proc_info.exit_status = proc.wait()
 
@@ -290,6 +321,55 @@ def cancel_install(proc_info):
     return True
 
 
+def get_server_proc_info(server_name):
+    """
+    Builds a ProcInfoVessel for holding a game server's command output. The
+    output held in memory is capped per the output_max_lines &
+    output_max_bytes main.conf settings, older output is spilled to
+    logs/output/<server_name>-<pid>-std{out,err}.log. Every worker has its own
+    vessels, so each spills to its own files.
+
+    Args:
+        server_name (str): Name of game server the output is for.
+
+    Returns:
+        ProcInfoVessel: Output capped vessel for game server.
+    """
+    settings = settings_cache.get().settings
+    max_lines = max(settings.output_max_lines, 1)
+    max_bytes = max(settings.output_max_bytes, 1)
+
+    spill_name = f"{secure_filename(server_name)}-{os.getpid()}"
+    spill_path = os.path.join(CWD, "logs/output", spill_name)
+    proc_info = ProcInfoVessel(max_lines, max_bytes, spill_path)
+
+    # Lets the other workers serve this output too.
+    output_publisher.register(server_name, proc_info)
+    return proc_info
+
+
+def remove_output_spills(server_name=None):
+    """
+    Deletes output spill files of every worker, past & present.
+
+    Args:
+        server_name (str): Only delete this game server's. Defaults to all.
+    """
+    name = r".+" if server_name == None else re.escape(secure_filename(server_name))
+    pattern = re.compile(rf"{name}-\d+-std(out|err)\.log")
+
+    spill_dir = os.path.join(CWD, "logs/output")
+    if not os.path.isdir(spill_dir):
+        return
+
+    for file_name in os.listdir(spill_dir):
+        if pattern.fullmatch(file_name):
+            try:
+                os.remove(os.path.join(spill_dir, file_name))
+            except OSError:
+                pass
+
+
 def get_uid(username):
     """
     Translates a username to a uid using pwd module.
@@ -356,6 +436,7 @@ def docker_cmd_build(server):
     ]
 
 
+@single_flight.wrap("socket_name")
 def get_tmux_socket_name_docker(server, gs_id_file_path):
     """
     Gets tmux socket name for docker type installs by running commands through
@@ -386,6 +467,7 @@ def get_tmux_socket_name_docker(server, gs_id_file_path):
     return server.script_name + "-" + gs_id
 
 
+@single_flight.wrap("socket_name")
 def get_tmux_socket_name_over_ssh(server, gs_id_file_path):
     """
     Uses SSH to get tmux socket name for remote and non-same user installs.
@@ -428,14 +510,19 @@ def update_tmux_socket_name_cache(server_id, socket_name):
     cache_file = os.path.join(CWD, "json/tmux_socket_name_cache.json")
     cache_data = dict()
 
-    if os.path.exists(cache_file):
-        with open(cache_file, "r") as file:
-            cache_data = json.load(file)
+    # Batched status checks can update the cache from several threads.
+    with tmux_socket_cache_lock:
+        if os.path.exists(cache_file):
+            with open(cache_file, "r") as file:
+                cache_data = json.load(file)
 
-    cache_data[server_id] = socket_name
+        cache_data[str(server_id)] = socket_name
 
-    with open(cache_file, "w") as file:
-        json.dump(cache_data, file)
+        # Write to tmp file then swap in, so readers never see partial json.
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as file:
+            json.dump(cache_data, file)
+        os.replace(tmp_file, cache_file)
 
 
 def get_tmux_socket_name_from_cache(server, gs_id_file_path):
@@ -530,6 +617,7 @@ def get_tmux_socket_name(server):
     return server.script_name + "-" + gs_id
 
 
+@single_flight.wrap("status")
 def get_server_status(server):
     """
     Get's the game server status (on/off) for a specific game server. For
@@ -588,10 +676,232 @@ def get_server_status(server):
     return True
 
 
+def get_tmux_socket_dir(uid=None):
+    """
+    Get's the directory tmux keeps its sockets in for a given uid. Same as
+    tmux, honors the TMUX_TMPDIR env var.
+
+    Args:
+        uid (int): Uid to get socket dir for. Defaults to the app user's uid.
+
+    Returns:
+        str: Path to tmux socket dir, ex: /tmp/tmux-1000.
+    """
+    if uid == None:
+        uid = os.getuid()
+    tmpdir = os.environ.get("TMUX_TMPDIR") or "/tmp"
+    return os.path.join(tmpdir, f"tmux-{uid}")
+
+
+def get_local_tmux_sockets():
+    """
+    Builds an index of the socket paths of all running tmux servers owned by
+    the app user, in a single pass over the process table. Lets the status of
+    every local same user install be answered without spawning a tmux process
+    per game server.
+
+    Returns:
+        set: Set of socket paths with a live tmux server behind them.
+    """
+    uid = os.getuid()
+    socket_dir = get_tmux_socket_dir(uid)
+    live_sockets = set()
+
+    for proc in psutil.process_iter(["name", "cmdline", "uids"]):
+        name = proc.info["name"] or ""
+        cmdline = proc.info["cmdline"] or []
+        uids = proc.info["uids"]
+
+        # Newer tmux names its processes "tmux: server" & "tmux: client".
+        if not name.startswith("tmux") or name == "tmux: client":
+            continue
+        if uids == None or uids.real != uid:
+            continue
+
+        # Socket path defaults to "default" in the socket dir, -L sets name in
+        # socket dir, -S sets full path.
+        socket_path = os.path.join(socket_dir, "default")
+        args = iter(cmdline[1:])
+        for arg in args:
+            if arg in ("-L", "-S"):
+                value = next(args, None)
+            elif arg.startswith(("-L", "-S")):
+                value = arg[2:]
+            elif arg.startswith("-"):
+                continue
+            else:
+                # First non option arg is the tmux command, options end there.
+                break
+
+            if value == None:
+                break
+            if arg.startswith("-L"):
+                socket_path = os.path.join(socket_dir, value)
+            else:
+                socket_path = value
+
+        live_sockets.add(socket_path)
+
+    # Only count sockets whose file still exists on disk.
+    return {path for path in live_sockets if os.path.exists(path)}
+
+
+def get_local_server_statuses(servers):
+    """
+    Get's the status of local same user installs from one process table scan,
+    see get_local_tmux_sockets().
+
+    Args:
+        servers (list): List of local same user GameServer objects.
+
+    Returns:
+        dict: Dictionary of game server ids to status (True/False/None).
+    """
+    live_sockets = get_local_tmux_sockets()
+    socket_dir = get_tmux_socket_dir()
+
+    statuses = dict()
+    for server in servers:
+        socket = get_tmux_socket_name(server)
+        if socket == None:
+            statuses[server.id] = None
+            continue
+
+        statuses[server.id] = os.path.join(socket_dir, socket) in live_sockets
+
+    return statuses
+
+
+def get_server_statuses_over_ssh(servers):
+    """
+    Get's the status of several game servers that share the same ssh host &
+    user in a single ssh round trip. Does so by running one small shell loop
+    that checks every tmux socket and echos back its exit status.
+
+    Args:
+        servers (list): GameServer objects with same install_host & username.
+
+    Returns:
+        dict: Dictionary of game server ids to status (True/False/None).
+    """
+    statuses = {server.id: None for server in servers}
+    sockets = dict()
+
+    for server in servers:
+        socket = get_tmux_socket_name(server)
+        if socket != None:
+            sockets[socket] = server.id
+
+    if not sockets:
+        return statuses
+
+    # Prints "<socket> <exit status>" for each socket.
+    script = ""
+    for socket in sockets:
+        tmux_cmd = shlex.join([PATHS["tmux"], "-L", socket, "list-session"])
+        script += f"{tmux_cmd} >/dev/null 2>&1; echo {shlex.quote(socket)} $?; "
+
+    proc_info = ProcInfoVessel()
+    host = servers[0].install_host
+    username = servers[0].username
+    keyfile = get_ssh_key_file(username, host)
+    success = run_cmd_ssh(
+        ["/bin/sh", "-c", script], host, username, keyfile, proc_info, timeout=10
+    )
+
+    # If the ssh connection itself fails all statuses are indeterminate.
+    if not success:
+        current_app.logger.info(proc_info)
+        return statuses
+
+    for line in proc_info.stdout:
+        try:
+            socket, exit_status = line.split()
+        except ValueError:
+            continue
+
+        if socket in sockets:
+            statuses[sockets[socket]] = exit_status == "0"
+
+    return statuses
+
+
+def get_server_statuses(all_game_servers, max_workers=8):
+    """
+    Get's the status of many game servers at once. Local same user installs
+    are all answered from one process table scan via
+    get_local_server_statuses(). Docker installs are checked concurrently on a
+    bounded thread pool. Installs reached over ssh are grouped by host & user,
+    so each remote host only costs one ssh round trip via
+    get_server_statuses_over_ssh().
+
+    Args:
+        all_game_servers (list): List of GameServer objects to get status of.
+        max_workers (int): Max number of concurrent status checks.
+
+    Returns:
+        list: List of dicts containing id, status, host, & elapsed_ms for
+              each game server. Servers sharing an ssh round trip share the
+              same elapsed_ms.
+    """
+    # Status checks run in pool threads, which need the app for logging.
+    app = current_app._get_current_object()
+
+    ssh_groups = dict()
+    local_servers = []
+    tasks = []
+    for server in all_game_servers:
+        if should_use_ssh(server):
+            key = (server.install_host, server.username)
+            ssh_groups.setdefault(key, []).append(server)
+        elif server.install_type == "local":
+            local_servers.append(server)
+        else:
+            tasks.append([server])
+
+    tasks += list(ssh_groups.values())
+    if local_servers:
+        tasks.append(local_servers)
+
+    def check_task(servers):
+        start = time.perf_counter()
+        with app.app_context():
+            if should_use_ssh(servers[0]):
+                statuses = get_server_statuses_over_ssh(servers)
+            elif servers[0].install_type == "local":
+                statuses = get_local_server_statuses(servers)
+            else:
+                statuses = {servers[0].id: get_server_status(servers[0])}
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        results = []
+        for server in servers:
+            results.append(
+                {
+                    "id": server.id,
+                    "status": statuses.get(server.id),
+                    "host": server.install_host,
+                    "elapsed_ms": elapsed_ms,
+                }
+            )
+        return results
+
+    server_statuses = []
+    if not tasks:
+        return server_statuses
+
+    workers = min(max_workers, len(tasks))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for results in executor.map(check_task, tasks):
+            server_statuses += results
+
+    return server_statuses
+
+
 def get_all_server_statuses(all_game_servers):
     """
     Get's a list of game server statuses (on/off) for all installed game
-    servers. Does so by wrapping get_server_status().
+    servers. Does so by wrapping get_server_statuses().
 
     Args:
         all_game_servers (list): List of all installed/added game servers.
@@ -599,34 +909,43 @@ def get_all_server_statuses(all_game_servers):
     Returns:
         dict: Dictionary of game server names to status (on/off = True/False).
     """
+    names = {server.id: server.install_name for server in all_game_servers}
 
     server_statuses = dict()
-
-    for server in all_game_servers:
-        # Initialize all servers False (aka inactive) to start with.
-        server_statuses[server.install_name] = False
-        server_statuses[server.install_name] = get_server_status(server)
+    for result in get_server_statuses(all_game_servers):
+        server_statuses[names[result["id"]]] = result["status"]
 
     return server_statuses
 
 
 def get_running_installs():
     """
-    Gets list of running install thread names, if any are currently running.
+    Gets list of queued & running install job names, if there are any, from
+    all workers.
 
     Returns:
-        thread_names (list): List of currently running install threads.
+        job_names (list): List of currently running install jobs.
     """
-    threads = threading.enumerate()
-    # Get all active threads.
-    thread_names = []
-    for thread in threads:
-        if thread.is_alive() and thread.name.startswith("Install_"):
-            thread_names.append(thread.name)
+    job_names = []
+    for job in job_executor.registry(active=True):
+        if job["name"].startswith("Install_") and job["name"] not in job_names:
+            job_names.append(job["name"])
 
-    return thread_names
+    return job_names
 
 
+def configure_job_executor():
+    """
+    Sets job executor's pool limits from the interactive_workers,
+    heavy_workers, & host_job_limit main.conf settings.
+    """
+    settings = settings_cache.get().settings
+    job_executor.set_limits(
+        settings.interactive_workers, settings.heavy_workers, settings.host_job_limit
+    )
+
+
+@single_flight.wrap("cfg_paths", ttl=CFG_PATHS_FLIGHT_TTL)
 def find_cfg_paths(server):
     """
     Finds a list of all valid cfg files for a given game server. Works for
@@ -643,14 +962,10 @@ def find_cfg_paths(server):
 
     # Try except in case problem with json files.
     try:
-        cfg_whitelist = open("json/accepted_cfgs.json", "r")
-        json_data = json.load(cfg_whitelist)
-        cfg_whitelist.close()
+        valid_gs_cfgs = json_registry.accepted_cfgs()
     except:
         return cfg_paths
 
-    valid_gs_cfgs = json_data["accepted_cfgs"]
-
     if should_use_ssh(server):
         proc_info = ProcInfoVessel()
         keyfile = get_ssh_key_file(server.username, server.install_host)
@@ -690,7 +1005,7 @@ def find_cfg_paths(server):
             current_app.logger.info(item)
 
             # Check str coming back is valid cfg name str.
-            if os.path.basename(item) in valid_gs_cfgs:
+            if json_registry.is_accepted_cfg(os.path.basename(item)):
                 cfg_paths.append(item)
 
     else:
@@ -700,7 +1015,7 @@ def find_cfg_paths(server):
             if "config-default" in root:
                 continue
             for file in files:
-                if file in valid_gs_cfgs:
+                if json_registry.is_accepted_cfg(file):
                     cfg_paths.append(os.path.join(root, file))
 
     return cfg_paths
@@ -813,16 +1128,7 @@ def valid_cfg_name(cfg_file):
     Returns:
         bool: True if valid cfg file name, False otherwise.
     """
-    gs_cfgs = open("json/accepted_cfgs.json", "r")
-    json_data = json.load(gs_cfgs)
-    gs_cfgs.close()
-
-    valid_gs_cfgs = json_data["accepted_cfgs"]
-
-    if cfg_file in valid_gs_cfgs:
-        return True
-
-    return False
+    return json_registry.is_accepted_cfg(cfg_file)
 
 
 def get_commands(server, send_cmd, current_user):
@@ -839,53 +1145,16 @@ def get_commands(server, send_cmd, current_user):
     Returns:
         commands (list): List of command objects for server.
     """
-    commands = []
-
     try:
-        with open("json/commands.json", "r") as commands_json:
-            json_data = json.load(commands_json)
-
-        with open("json/ctrl_exemptions.json", "r") as exemptions_json:
-            exemptions_data = json.load(exemptions_json)
-
+        # Exemptions & send cmd option are already applied by the registry.
+        cmds = json_registry.commands(server, send_cmd)
     except Exception as e:
         flash("Problem reading command json files!", category="error")
-        return commands
-
-    # Remove send cmd if option disabled in main.conf.
-    if send_cmd == False:
-        json_data["short_cmds"].remove("sd")
-        json_data["long_cmds"].remove("send")
-        json_data["descriptions"].remove("Send command to game server console.")
-
-    # Remove exempted cmds.
-    if server in exemptions_data:
-        for short_cmd in exemptions_data[server]["short_cmds"]:
-            json_data["short_cmds"].remove(short_cmd)
-        for long_cmd in exemptions_data[server]["long_cmds"]:
-            json_data["long_cmds"].remove(long_cmd)
-        for desc in exemptions_data[server]["descriptions"]:
-            json_data["descriptions"].remove(desc)
-
-    cmds = zip(
-        json_data["short_cmds"], json_data["long_cmds"], json_data["descriptions"]
-    )
+        return []
 
     # Remove commands for non-admin users. Part of permissions controls.
-    user_perms = json.loads(current_user.permissions)
-
-    for short_cmd, long_cmd, description in cmds:
-        if current_user.role != "admin":
-            if long_cmd not in user_perms["controls"]:
-                continue
-
-        cmd = CmdDescriptor()
-        cmd.long_cmd = long_cmd
-        cmd.short_cmd = short_cmd
-        cmd.description = description
-        commands.append(cmd)
-
-    return commands
+    user_perms = permissions_cache.get(current_user)
+    return [cmd for cmd in cmds if user_perms.has_control(cmd.long_cmd)]
 
 
 def get_servers():
@@ -895,19 +1164,9 @@ def get_servers():
     Returns:
         dict: Dictionary mapping short server names to long server names.
     """
-    # TODO v1.9: Eventually I need to change the structure of the underlying
-    # json file and just make it a freaking associated array in there. Then I
-    # can just read in the json and return it, instead of doing zip. Don't
-    # remember why I originally made the underlying json two arrays. Probably
-    # was just being silly. Oh well not too important rn, problem for next
-    # release...
-
     # Try except in case problem with json files.
     try:
-        with open("json/game_servers.json", "r") as file:
-            json_data = json.load(file)
-
-        return dict(zip(json_data["servers"], json_data["server_names"]))
+        return json_registry.servers()
     except:
         # Return empty dict triggers error. In python empty dict == False.
         return {}
@@ -917,8 +1176,8 @@ def valid_command(cmd, server, send_cmd, current_user):
     """
     Validates short commands from controls route form for game server. Some
     game servers may have specific game server command exemptions. This
-    function basically just checks if supplied cmd is in list of accepted cmds
-    from get_commands().
+    function basically just checks if supplied cmd is in the set of accepted
+    cmds for the game server & user.
 
     Args:
         cmd (str): Short cmd string to validate.
@@ -930,13 +1189,16 @@ def valid_command(cmd, server, send_cmd, current_user):
     Returns:
         bool: True if cmd is valid for user & game server, False otherwise.
     """
-    commands = get_commands(server, send_cmd, current_user)
-    for command in commands:
-        # Aka is valid command.
-        if cmd == command.short_cmd:
-            return True
+    try:
+        command = json_registry.command(server, send_cmd, cmd)
+    except Exception:
+        return False
 
-    return False
+    if command == None:
+        return False
+
+    # Part of permissions controls.
+    return permissions_cache.get(current_user).has_control(command.long_cmd)
 
 
 def valid_install_options(script_name, full_name):
@@ -952,11 +1214,10 @@ def valid_install_options(script_name, full_name):
     Returns:
         bool: True if short and long names are both valid, False otherwise.
     """
-    servers = get_servers()
-    for server, server_name in servers.items():
-        if server == script_name and server_name == full_name:
-            return True
-    return False
+    try:
+        return full_name != None and get_servers().get(script_name) == full_name
+    except TypeError:
+        return False
 
 
 def valid_script_name(script_name):
@@ -970,17 +1231,17 @@ def valid_script_name(script_name):
     Returns:
         bool: True if short name is valid, False otherwise.
     """
-    servers = get_servers()
-    for server, server_name in servers.items():
-        if server == script_name:
-            return True
-    return False
+    try:
+        return script_name in get_servers()
+    except TypeError:
+        return False
 
 
 def valid_server_name(server_name):
     """
     Validates supplied server_name for install route. Basically just checks if
-    supplied server_name is in list of accepted servers from get_servers().
+    supplied server_name is the unix friendly directory name of a server in
+    the list of accepted servers from get_servers().
 
     Args:
         server_name (str): Long name of game server to check.
@@ -988,15 +1249,10 @@ def valid_server_name(server_name):
     Returns:
         bool: True if long name is valid, False otherwise.
     """
-    servers = get_servers()
-    for server, s_name in servers.items():
-        # Convert s_name to a unix friendly directory name.
-        s_name = s_name.replace(" ", "_")
-        s_name = s_name.replace(":", "")
-
-        if s_name == server_name:
-            return True
-    return False
+    try:
+        return json_registry.script_name_for_dir(server_name) != None
+    except:
+        return False
 
 
 def get_lgsmsh(lgsmsh):
@@ -1117,8 +1373,10 @@ def update_self():
 
 def get_network_stats():
     """
-    Gets bytes in/out per second. Stores last got values in globals. Used by
+    Gets bytes in/out per second since the last call. Used by
     get_server_stats() to collect network status for /api/system-usage route.
+    Only the SystemSampler's thread calls it in the app, at a fixed cadence,
+    so the rate's interval is never tiny.
 
     Returns:
         dict: Dictionary containing bytes_sent_rate & bytes_recv_rate.
@@ -1131,6 +1389,10 @@ def get_network_stats():
     current_bytes_recv = net_io.bytes_recv
     current_time = time.time()
 
+    # Guard against divide by zero.
+    if current_time - prev_time <= 0:
+        current_time = prev_time + 1e-6
+
     # Calculate the rate of bytes sent and received per second.
     bytes_sent_rate = (current_bytes_sent - prev_bytes_sent) / (
         current_time - prev_time
@@ -1214,10 +1476,10 @@ def user_has_permissions(current_user, route, server_name=None):
     if current_user.role == "admin":
         return True
 
-    user_perms = json.loads(current_user.permissions)
+    user_perms = permissions_cache.get(current_user)
 
     if route == "install":
-        if not user_perms["install_servers"]:
+        if not user_perms.install_servers:
             flash(
                 "Your user does NOT have permission access the install page!",
                 category="error",
@@ -1225,7 +1487,7 @@ def user_has_permissions(current_user, route, server_name=None):
             return False
 
     if route == "add":
-        if not user_perms["add_servers"]:
+        if not user_perms.add_servers:
             flash(
                 "Your user does NOT have permission access the add page!",
                 category="error",
@@ -1233,14 +1495,14 @@ def user_has_permissions(current_user, route, server_name=None):
             return False
 
     if route == "delete":
-        if not user_perms["delete_server"]:
+        if not user_perms.delete_server:
             flash(
                 "Your user does NOT have permission to delete servers!",
                 category="error",
             )
             return False
 
-        if server_name not in user_perms["servers"]:
+        if not user_perms.has_server(server_name):
             flash(
                 "Your user does NOT have permission to delete this game server!",
                 category="error",
@@ -1248,7 +1510,7 @@ def user_has_permissions(current_user, route, server_name=None):
             return False
 
     if route == "settings":
-        if not user_perms["mod_settings"]:
+        if not user_perms.mod_settings:
             flash(
                 "Your user does NOT have permission access the settings page!",
                 category="error",
@@ -1256,7 +1518,7 @@ def user_has_permissions(current_user, route, server_name=None):
             return False
 
     if route == "controls":
-        if server_name not in user_perms["servers"]:
+        if not user_perms.has_server(server_name):
             flash(
                 "Your user does NOT have permission access this game server!",
                 category="error",
@@ -1265,16 +1527,28 @@ def user_has_permissions(current_user, route, server_name=None):
 
     # No flash for api routes. They return json.
     if route == "update-console":
-        if 'console' not in user_perms["controls"]:
+        if not user_perms.has_control("console"):
             return False
 
     if route == "server-statuses" or route == "cmd-output":
-        if server_name not in user_perms["servers"]:
+        if not user_perms.has_server(server_name):
             return False
 
     return True
 
 
+def invalidate_user(user_id):
+    """
+    Drops cached copies of a user & their compiled permissions. Must be called
+    after changing a user's password, role, or permissions.
+
+    Args:
+        user_id (int): Id of user that changed.
+    """
+    user_cache.invalidate(user_id)
+    permissions_cache.invalidate(user_id)
+
+
 def valid_install_type(install_type):
     """
     Check's install type is one of the allowed three types.
@@ -1399,7 +1673,7 @@ def run_cmd_ssh(
     key_filename,
     proc_info=ProcInfoVessel(),
     app_context=False,
-    timeout=5.0,
+    timeout=None,
 ):
     """
     Runs remote commands over ssh to admin game servers.
@@ -1413,28 +1687,27 @@ def run_cmd_ssh(
                                     process information.
         app_context (AppContext): Optional Current app context needed for
                                   logging in a thread.
-        timeout (float): Timeout in seconds for ssh command. None = no timeout.
+        timeout (float): Timeout in seconds to wait for any output from ssh
+                         command. None = no timeout.
 
     Returns:
         bool: True if command runs successfully, False otherwise.
     """
-    config = configparser.ConfigParser()
-    config.read("main.conf")
-    end_in_newlines = get_config_value(
-        config, "settings", "end_in_newlines", True, True
-    )
-    clear_output_on_reload = get_config_value(
-        config, "settings", "clear_output_on_reload", True, True
-    )
+    # App context needed for logging in threads. Popped when done, job pool
+    # threads get reused.
+    if app_context:
+        with app_context:
+            return run_cmd_ssh(
+                cmd, hostname, username, key_filename, proc_info, timeout=timeout
+            )
 
-    if clear_output_on_reload:
+    settings = settings_cache.get().settings
+    end_in_newlines = settings.end_in_newlines
+
+    if settings.clear_output_on_reload:
         proc_info.stdout.clear()
         proc_info.stderr.clear()
 
-    # App context needed for logging in threads.
-    if app_context:
-        app_context.push()
-
     safe_cmd = shlex.join(cmd)
 
     # Log info.
@@ -1446,75 +1719,64 @@ def run_cmd_ssh(
     current_app.logger.info("pre stdout: " + str(proc_info.stdout))
     current_app.logger.info("pre stderr: " + str(proc_info.stderr))
 
-    # Initialize SSH client.
-    client = paramiko.SSHClient()
-    # Automatically add the host key.
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    channel = None
+    ret_status = False
 
     try:
-        client.connect(
-            hostname, username=username, key_filename=key_filename, timeout=3
-        )
+        # Open a new session on the pooled (already authenticated) transport.
+        channel = ssh_pool.open_session(hostname, username, key_filename)
         current_app.logger.debug(cmd)
 
         proc_info.process_lock = True
-        # Open a new session and request a PTY.
-        channel = client.get_transport().open_session()
         #        channel.get_pty()  # This shut's off the stderr stream for some reason... Not sure if pty still needed.
         channel.set_combine_stderr(False)
         channel.exec_command(safe_cmd)
-
-        # Optionally set timeout (if provided).
-        if timeout:
-            channel.settimeout(timeout)
+        # Lets whoever's watching the output stop the remote cmd.
+        proc_info.channel = channel
+
+        # One line assembler per stream, chunks can split lines & characters.
+        outputs = [
+            (channel.recv_ready, channel.recv, proc_info.stdout, "stdout"),
+            (
+                channel.recv_stderr_ready,
+                channel.recv_stderr,
+                proc_info.stderr,
+                "stderr",
+            ),
+        ]
+        assemblers = [LineAssembler(end_in_newlines), LineAssembler(end_in_newlines)]
+
+        def append_lines(output, output_type, lines):
+            for line in lines:
+                output.append(line)
+                log_msg = log_wrap(output_type, line.strip())
+                current_app.logger.debug(log_msg)
 
         while True:
-            # Read stdout if data is available.
-            if channel.recv_ready():
-                stdout_chunk = channel.recv(8192).decode("utf-8")
-                stdout_lines = stdout_chunk.splitlines(keepends=True)
-                for line in stdout_lines:
-                    if line == "\r\n":
-                        continue
-                    if line not in proc_info.stdout:
-                        if end_in_newlines and not (
-                            line.endswith("\n") or line.endswith("\r")
-                        ):
-                            line += "\n"
-                        proc_info.stdout.append(line)
-                        log_msg = log_wrap("stdout", line.strip())
-                        current_app.logger.debug(log_msg)
-
-            if channel.recv_stderr_ready():
-                stderr_chunk = channel.recv_stderr(8192).decode("utf-8")
-                stderr_lines = stderr_chunk.splitlines(keepends=True)
-                for line in stderr_lines:
-                    if line == "\r\n":
-                        continue
-                    if line not in proc_info.stderr:
-                        if end_in_newlines and not (
-                            line.endswith("\n") or line.endswith("\r")
-                        ):
-                            line += "\n"
-                        proc_info.stderr.append(line)
-                        log_msg = log_wrap("stderr", line.strip())
-                        current_app.logger.debug(log_msg)
-
-            # Break the loop if the command has finished.
-            if channel.exit_status_ready():
-                # Ensure any remaining stderr and stdout are captured.
-                while channel.recv_stderr_ready():
-                    stderr_chunk = channel.recv_stderr(8192).decode("utf-8")
-                    proc_info.stderr.append(stderr_chunk)
-
-                while channel.recv_ready():
-                    stdout_chunk = channel.recv(8192).decode("utf-8")
-                    proc_info.stdout.append(stdout_chunk)
-
+            # Block until there's output on either stream or the channel hits
+            # EOF. Optional timeout is for no output at all in that time.
+            readable, _, _ = select.select([channel], [], [], timeout)
+            if not readable:
+                raise TimeoutError(f"No output for {timeout} seconds")
+
+            got_data = False
+            for (ready, recv, output, output_type), assembler in zip(
+                outputs, assemblers
+            ):
+                while ready():
+                    chunk = recv(8192)
+                    if not chunk:
+                        break
+                    got_data = True
+                    proc_info.last_output_at = time.time()
+                    append_lines(output, output_type, assembler.feed(chunk))
+
+            # All output's been read once remote end sent EOF.
+            if not got_data and (channel.eof_received or channel.closed):
                 break
 
-            # Keep CPU from burning.
-            time.sleep(0.1)
+        for (_, _, output, output_type), assembler in zip(outputs, assemblers):
+            append_lines(output, output_type, assembler.flush())
 
         # Wait for the command to finish and get the exit status.
         proc_info.exit_status = channel.recv_exit_status()
@@ -1535,8 +1797,19 @@ def run_cmd_ssh(
         proc_info.process_lock = False
         ret_status = False
 
+    except OSError as e:
+        # Connection refused, no route to host, etc.
+        current_app.logger.debug(str(e))
+        proc_info.stderr.append(str(e))
+        proc_info.exit_status = 5
+        proc_info.process_lock = False
+        ret_status = False
+
     finally:
-        client.close()
+        # Only close the channel, the transport stays pooled for reuse.
+        proc_info.channel = None
+        if channel:
+            channel.close()
         return ret_status
 
 
@@ -1557,24 +1830,15 @@ def read_file_over_ssh(server, file_path):
     pub_key_file = get_ssh_key_file(server.username, server.install_host)
 
     try:
-        # Open ssh client conn.
-        with paramiko.SSHClient() as ssh:
-            # Automatically add the host key.
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(
-                server.install_host,
-                username=server.username,
-                key_filename=pub_key_file,
-                timeout=3,
-            )
-
-            # Open sftp session.
-            with ssh.open_sftp() as sftp:
-                # Open file over sftp.
-                with sftp.open(file_path, "r") as file:
-                    content = file.read()
+        # Open sftp session on pooled ssh conn.
+        with ssh_pool.open_sftp(
+            server.install_host, server.username, pub_key_file
+        ) as sftp:
+            # Open file over sftp.
+            with sftp.open(file_path, "r") as file:
+                content = file.read()
 
-            return content.decode()
+        return content.decode()
 
     except Exception as e:
         current_app.logger.debug(e)
@@ -1600,19 +1864,11 @@ def write_file_over_ssh(server, file_path, content):
     pub_key_file = get_ssh_key_file(server.username, server.install_host)
 
     try:
-        with paramiko.SSHClient() as ssh:
-            # Automatically add the host key.
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(
-                server.install_host,
-                username=server.username,
-                key_filename=pub_key_file,
-                timeout=3,
-            )
-
-            with ssh.open_sftp() as sftp:
-                with sftp.open(file_path, "w") as file:
-                    file.write(content)
+        with ssh_pool.open_sftp(
+            server.install_host, server.username, pub_key_file
+        ) as sftp:
+            with sftp.open(file_path, "w") as file:
+                file.write(content)
 
         return True
 
@@ -1621,43 +1877,10 @@ def write_file_over_ssh(server, file_path, content):
         return False
 
 
-def get_config_value(config, section, option, default, is_bool=False):
-    """
-    Wraps checking config object for option. If no config option found return
-    default value.
-
-    Args:
-        config (ConfigParser): Config object to read & get options from.
-        section (str): Section of config to fetch option from.
-        option (str): The option to fetch value of.
-        default (str): Default value if can't find option in config.
-        is_bool (bool): Option type is a boolean (different option fetch method).
-
-    Returns:
-        str|bool: Value of configured option in config or default value if
-                  can't one get from config.
-    """
-    try:
-        if config and config.has_section(section):
-            if is_bool:
-                return config[section].getboolean(option)
-
-            return config[section][option]
-
-        else:
-            return default
-
-    except (ValueError, IndexError, KeyError) as e:
-        return default
-
-    except configparser.NoOptionError:
-        return default
-
-
 def read_config(route):
     """
-    Reads in relevant main config parameters for a given route. Also protects
-    against empty config options.
+    Reads in relevant main config parameters for a given route, from the
+    cached main.conf snapshot.
 
     Args:
         route (str): Name of route to fetch config parameters for.
@@ -1665,122 +1888,61 @@ def read_config(route):
     Returns:
         config_options (dict): Configuration options for route.
     """
-    # Import config data.
-    config = configparser.ConfigParser()
-    config.read("main.conf")
-
-    config_options = dict()
-
-    # NOTE: Probably a smarter way to do this than an if for each route, but
-    # ehh not a huge deal rn.
+    config = settings_cache.get()
+    aesthetic = config.aesthetic
+    settings = config.settings
 
     if route == "home":
-        config_options["text_color"] = get_config_value(
-            config, "aesthetic", "text_color", "#09ff00"
-        )
-        config_options["graphs_primary"] = get_config_value(
-            config, "aesthetic", "graphs_primary", "#e01b24"
-        )
-        config_options["graphs_secondary"] = get_config_value(
-            config, "aesthetic", "graphs_secondary", "#0d6efd"
-        )
-        config_options["show_stats"] = get_config_value(
-            config, "aesthetic", "show_stats", True, True
-        )
-        config_options["show_barrel_roll"] = get_config_value(
-            config, "aesthetic", "show_barrel_roll", True, True
-        )
-        return config_options
+        return {
+            "text_color": aesthetic.text_color,
+            "graphs_primary": aesthetic.graphs_primary,
+            "graphs_secondary": aesthetic.graphs_secondary,
+            "show_stats": aesthetic.show_stats,
+            "show_barrel_roll": aesthetic.show_barrel_roll,
+        }
 
     if route == "controls":
-        config_options["text_color"] = get_config_value(
-            config, "aesthetic", "text_color", "#09ff00"
-        )
-        config_options["terminal_height"] = get_config_value(
-            config, "aesthetic", "terminal_height", 10
-        )
-        config_options["cfg_editor"] = get_config_value(
-            config, "settings", "cfg_editor", False, True
-        )
-        config_options["send_cmd"] = get_config_value(
-            config, "settings", "send_cmd", False, True
-        )
-        config_options["show_stderr"] = get_config_value(
-            config, "settings", "show_stderr", True, True
-        )
-        return config_options
+        return {
+            "text_color": aesthetic.text_color,
+            "terminal_height": aesthetic.terminal_height,
+            "cfg_editor": settings.cfg_editor,
+            "send_cmd": settings.send_cmd,
+            "show_stderr": settings.show_stderr,
+        }
 
     if route == "install":
-        config_options["terminal_height"] = get_config_value(
-            config, "aesthetic", "terminal_height", 10
-        )
-        config_options["text_color"] = get_config_value(
-            config, "aesthetic", "text_color", "#09ff00"
-        )
-        config_options["create_new_user"] = get_config_value(
-            config, "settings", "install_create_new_user", True
-        )
-        return config_options
+        return {
+            "terminal_height": aesthetic.terminal_height,
+            "text_color": aesthetic.text_color,
+            "create_new_user": settings.install_create_new_user,
+        }
 
     if route == "settings":
-        config_options["text_color"] = get_config_value(
-            config, "aesthetic", "text_color", "#09ff00"
-        )
-        config_options["graphs_primary"] = get_config_value(
-            config, "aesthetic", "graphs_primary", "#e01b24"
-        )
-        config_options["graphs_secondary"] = get_config_value(
-            config, "aesthetic", "graphs_secondary", "#0d6efd"
-        )
-        config_options["terminal_height"] = get_config_value(
-            config, "aesthetic", "terminal_height", 10
-        )
-        config_options["show_stats"] = get_config_value(
-            config, "aesthetic", "show_stats", True, True
-        )
-        config_options["send_cmd"] = get_config_value(
-            config, "settings", "send_cmd", False, True
-        )
-        config_options["show_stderr"] = get_config_value(
-            config, "settings", "show_stderr", True, True
-        )
-        config_options["install_create_new_user"] = get_config_value(
-            config, "settings", "install_create_new_user", True, True
-        )
-        config_options["delete_user"] = get_config_value(
-            config, "settings", "delete_user", False, True
-        )
-        config_options["remove_files"] = get_config_value(
-            config, "settings", "remove_files", False, True
-        )
-        config_options["clear_output_on_reload"] = get_config_value(
-            config, "settings", "clear_output_on_reload", True, True
-        )
-        config_options["end_in_newlines"] = get_config_value(
-            config, "settings", "end_in_newlines", False, True
-        )
-        config_options["show_stderr"] = get_config_value(
-            config, "settings", "show_stderr", False, True
-        )
-        return config_options
+        return {
+            "text_color": aesthetic.text_color,
+            "graphs_primary": aesthetic.graphs_primary,
+            "graphs_secondary": aesthetic.graphs_secondary,
+            "terminal_height": aesthetic.terminal_height,
+            "show_stats": aesthetic.show_stats,
+            "send_cmd": settings.send_cmd,
+            "show_stderr": settings.show_stderr,
+            "install_create_new_user": settings.install_create_new_user,
+            "delete_user": settings.delete_user,
+            "remove_files": settings.remove_files,
+            "clear_output_on_reload": settings.clear_output_on_reload,
+            "end_in_newlines": settings.end_in_newlines,
+        }
 
     if route == "about":
-        config_options["text_color"] = get_config_value(
-            config, "aesthetic", "text_color", "#09ff00"
-        )
-        return config_options
+        return {"text_color": aesthetic.text_color}
 
     if route == "delete":
-        config_options["delete_user"] = get_config_value(
-            config, "settings", "delete_user", False, True
-        )
-        config_options["remove_files"] = get_config_value(
-            config, "settings", "remove_files", False, True
-        )
-        return config_options
+        return {
+            "delete_user": settings.delete_user,
+            "remove_files": settings.remove_files,
+        }
 
     if route == "edit":
-        config_options["cfg_editor"] = get_config_value(
-            config, "settings", "cfg_editor", False, True
-        )
-        return config_options
+        return {"cfg_editor": settings.cfg_editor}
+
+    return dict()
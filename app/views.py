@@ -3,13 +3,13 @@ import io
 import re
 import sys
 import json
+import math
 import time
+import uuid
 import signal
 import shutil
 import getpass
-import configparser
 
-from threading import Thread
 from werkzeug.security import generate_password_hash
 from flask_login import login_required, current_user
 from flask import (
@@ -30,6 +30,25 @@ from . import db
 from .utils import *
 from .models import *
 from .proc_info_vessel import ProcInfoVessel
+from .status_monitor import status_cache, status_monitor
+from .system_sampler import system_sampler
+from .server_metrics import server_metrics, LOCAL_INSTALL_TYPES
+from .remote_metrics import remote_metrics
+from .metrics_store import MAX_POINTS
+from .downsample import downsample
+from .metrics_recorder import (
+    metrics_recorder,
+    series_name,
+    HOST_METRICS,
+    SERVER_METRICS,
+)
+from .console_stream import (
+    LEASE_TTL,
+    get_console_stream,
+    find_console_stream,
+    remove_console_stream,
+    console_stats,
+)
 
 # Constants.
 CWD = os.getcwd()
@@ -40,6 +59,15 @@ PATHS = {
     "sudo": "/usr/bin/sudo",
     "tmux": "/usr/bin/tmux",
 }
+# LGSM cmds that run long enough to go in the job executor's heavy lane.
+HEAVY_CMDS = ("u", "ul", "b")
+# Max seconds a status request will wait on the status monitor for a fresh
+# result, when the cached one is missing or being refreshed.
+STATUS_WAIT = 5
+# Seconds between keep-alive comments on idle output streams & max seconds a
+# stream stays open before the client is made to reconnect.
+STREAM_KEEPALIVE = 15
+STREAM_MAX_AGE = 300
 
 # Globals.
 servers = {}  # Holds ProcInfoVessel objects.
@@ -136,13 +164,11 @@ def controls():
         flash("Error loading commands.json file!", category="error")
         return redirect(url_for("views.home"))
 
-    # Object to hold process info from cmd in daemon thread.
-    proc_info = ProcInfoVessel()
-
     # If this is the first time we're ever seeing the server_name then put it
-    # and its associated proc_info in the global servers dictionary.
+    # and its associated proc_info in the global servers dictionary. Object
+    # holds process info from cmd in daemon thread.
     if not server_name in servers:
-        servers[server_name] = proc_info
+        servers[server_name] = get_server_proc_info(server_name)
 
     proc_info = servers[server_name]
 
@@ -161,7 +187,7 @@ def controls():
 
         # Console option, use tmux capture-pane to get output.
         if short_cmd == "c":
-            active = get_server_status(server)
+            active = status_monitor.get(server, wait=STATUS_WAIT)["status"]
             if not active:
                 flash("Server is Off! No Console Output!", category="error")
                 return redirect(url_for("views.controls", server=server_name))
@@ -188,7 +214,7 @@ def controls():
                 flash("No command provided!", category="error")
                 return redirect(url_for("views.controls", server=server_name))
 
-            active = get_server_status(server)
+            active = status_monitor.get(server, wait=STATUS_WAIT)["status"]
             if not active:
                 flash(
                     "Server is Off! Cannot send commands to console!", category="error"
@@ -199,33 +225,35 @@ def controls():
 
             if should_use_ssh(server):
                 pub_key_file = get_ssh_key_file(server.username, server.install_host)
-                daemon = Thread(
-                    target=run_cmd_ssh,
-                    args=(
-                        cmd,
-                        server.install_host,
-                        server.username,
-                        pub_key_file,
-                        proc_info,
-                        current_app.app_context(),
-                        None,
-                    ),
-                    daemon=True,
+                job_executor.submit(
+                    run_cmd_ssh,
+                    cmd,
+                    server.install_host,
+                    server.username,
+                    pub_key_file,
+                    proc_info,
+                    current_app.app_context(),
+                    None,
                     name="send",
+                    host=server.install_host,
+                    proc_info=proc_info,
+                    server_name=server_name,
                 )
-                daemon.start()
                 return redirect(url_for("views.controls", server=server_name))
 
             if server.install_type == "docker":
                 cmd = docker_cmd_build(server) + cmd
 
-            daemon = Thread(
-                target=run_cmd_popen,
-                args=(cmd, proc_info, current_app.app_context()),
-                daemon=True,
+            job_executor.submit(
+                run_cmd_popen,
+                cmd,
+                proc_info,
+                current_app.app_context(),
                 name="ConsoleCMD",
+                host=server.install_host,
+                proc_info=proc_info,
+                server_name=server_name,
             )
-            daemon.start()
             return redirect(url_for("views.controls", server=server_name))
 
         else:
@@ -235,35 +263,46 @@ def controls():
                 purge_tmux_socket_cache()
 
             cmd = [script_path, short_cmd]
+            lane = "heavy" if short_cmd in HEAVY_CMDS else "interactive"
 
+            # Cached status is held while the command runs, then the status
+            # monitor re-probes it.
             if should_use_ssh(server):
                 pub_key_file = get_ssh_key_file(server.username, server.install_host)
-                daemon = Thread(
-                    target=run_cmd_ssh,
-                    args=(
-                        cmd,
-                        server.install_host,
-                        server.username,
-                        pub_key_file,
-                        proc_info,
-                        current_app.app_context(),
-                    ),
-                    daemon=True,
+                job_executor.submit(
+                    status_cache.run_held,
+                    server.id,
+                    run_cmd_ssh,
+                    cmd,
+                    server.install_host,
+                    server.username,
+                    pub_key_file,
+                    proc_info,
+                    current_app.app_context(),
                     name="Command",
+                    lane=lane,
+                    host=server.install_host,
+                    proc_info=proc_info,
+                    server_name=server_name,
                 )
-                daemon.start()
                 return redirect(url_for("views.controls", server=server_name))
 
             if server.install_type == "docker":
                 cmd = docker_cmd_build(server) + cmd
 
-            daemon = Thread(
-                target=run_cmd_popen,
-                args=(cmd, proc_info, current_app.app_context()),
-                daemon=True,
+            job_executor.submit(
+                status_cache.run_held,
+                server.id,
+                run_cmd_popen,
+                cmd,
+                proc_info,
+                current_app.app_context(),
                 name="Command",
+                lane=lane,
+                host=server.install_host,
+                proc_info=proc_info,
+                server_name=server_name,
             )
-            daemon.start()
             return redirect(url_for("views.controls", server=server_name))
 
     current_app.logger.info(log_wrap("server_name", server_name))
@@ -321,19 +360,26 @@ def install():
             install_name = server_name
 
             if cancel == "true":
-                # Check if install thread is still running.
-                thread_name = "Install_" + server_name
-                if thread_name not in running_installs:
+                # Check if install job is still queued or running.
+                job_name = "Install_" + server_name
+                if job_name not in running_installs:
                     flash(
                         f"Install for {server_name} not currently running!",
                         category="error",
                     )
                     return redirect(url_for("views.install"))
 
-                proc_info = servers[server_name]
+                # Installs that haven't started yet just come off the queue.
+                for job in job_executor.jobs(name=job_name, active=True):
+                    if job_executor.cancel(job.id):
+                        flash("Installation Canceled!")
+                        return redirect(url_for("views.install"))
+
+                # Install may be running in another worker.
+                proc_info = output_publisher.find(server_name, servers.get(server_name))
                 current_app.logger.info(log_wrap("proc_info", proc_info))
 
-                if proc_info.pid:
+                if proc_info and proc_info.pid:
                     success = cancel_install(proc_info)
                     if success:
                         flash("Installation Canceled!")
@@ -379,7 +425,7 @@ def install():
         # TODO v1.9: Make all this work via game server ID's, more reliable than
         # names.
         # Clobber any previously held proc_info objects for server.
-        servers[server_install_name] = ProcInfoVessel()
+        servers[server_install_name] = get_server_proc_info(server_install_name)
         proc_info = servers[server_install_name]
 
         install_exists = GameServer.query.filter_by(
@@ -451,6 +497,7 @@ def install():
             user_perms["servers"].append(server_install_name)
             user_ident.permissions = json.dumps(user_perms)
             db.session.commit()
+            invalidate_user(user_ident.id)
 
         cmd = [
             PATHS["sudo"],
@@ -464,13 +511,17 @@ def install():
         current_app.logger.info(log_wrap("cmd", cmd))
         current_app.logger.info(log_wrap("servers", servers))
 
-        install_daemon = Thread(
-            target=run_cmd_popen,
-            args=(cmd, proc_info, current_app.app_context()),
-            daemon=True,
+        job_executor.submit(
+            run_cmd_popen,
+            cmd,
+            proc_info,
+            current_app.app_context(),
             name=f"Install_{server_install_name}",
+            lane="heavy",
+            host=server.install_host,
+            proc_info=proc_info,
+            server_name=server_install_name,
         )
-        install_daemon.start()
 
         return render_template(
             "install.html",
@@ -516,52 +567,28 @@ def update_console():
         )
         return response
 
-    tmux_socket = get_tmux_socket_name(server)
-
-    cmd = [
-        PATHS["tmux"],
-        "-L",
-        tmux_socket,
-        "capture-pane",
-        "-pt",
-        server.script_name,
-        "-S",
-        "-",
-        "-E",
-        "-",
-        "-J",
-    ]
-
-    if server.install_type == "docker":
-        cmd = docker_cmd_build(server) + cmd
-
     if server.install_name in servers:
         proc_info = servers[server.install_name]
     else:
-        proc_info = ProcInfoVessel()
+        proc_info = get_server_proc_info(server.install_name)
         servers[server.install_name] = proc_info
 
-    if should_use_ssh(server):
-        pub_key_file = get_ssh_key_file(server.username, server.install_host)
-        run_cmd_ssh(
-            cmd,
-            server.install_host,
-            server.username,
-            pub_key_file,
-            proc_info,
-            None,
-            None,
-        )
-    else:
-        run_cmd_popen(cmd, proc_info)
-
-    if proc_info.exit_status > 0:
+    # Follows the game server's console via tmux pipe-pane, started once &
+    # restarted here if it has stopped. One follower is shared by all viewers,
+    # each of which holds a lease renewed by calling this route. Stopped once
+    # the last viewer is gone. See console_stream.py.
+    viewer = request.form.get("viewer", f"user-{current_user.id}")
+    console = get_console_stream(server, f"lease-{viewer}", ttl=LEASE_TTL)
+    if console == None or console.failed():
         resp_dict = {"Error": "Refresh cmd failed!"}
         response = Response(
             json.dumps(resp_dict, indent=4), status=503, mimetype="application/json"
         )
         return response
 
+    # Keep /api/cmd-output?server= serving console output, new lines only.
+    console.mirror_into(proc_info)
+
     resp_dict = {"Success": "Output updated!"}
     response = Response(
         json.dumps(resp_dict, indent=4), status=200, mimetype="application/json"
@@ -599,8 +626,78 @@ def get_status():
         )
         return response
 
-    server_status = get_server_status(server)
-    resp_dict = {"id": server.id, "status": server_status}
+    # Served from the status monitor's cache, only probes if there's no
+    # monitor running to do so.
+    max_age = status_monitor.read_intervals()[0] * 2
+    resp_dict = status_monitor.get(server, wait=STATUS_WAIT, max_age=max_age)
+    current_app.logger.info(log_wrap("resp_dict", resp_dict))
+
+    response = Response(
+        json.dumps(resp_dict, indent=4), status=200, mimetype="application/json"
+    )
+    return response
+
+
+@views.route("/api/server-statuses", methods=["GET"])
+@login_required
+def get_statuses():
+    # Collect args from GET request. Comma separated list of ids, if none
+    # supplied get status of all servers user has access to.
+    server_ids = request.args.get("ids")
+    missing_ids = set()
+
+    if server_ids == None or server_ids == "":
+        all_servers = GameServer.query.filter_by(install_finished=True).all()
+        game_servers = []
+        for server in all_servers:
+            if user_has_permissions(
+                current_user, "server-statuses", server.install_name
+            ):
+                game_servers.append(server)
+    else:
+        try:
+            server_ids = {int(server_id) for server_id in server_ids.split(",")}
+        except ValueError:
+            resp_dict = {"Error": "Invalid ids"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+            )
+            return response
+
+        # Unknown ids (ex: servers deleted since the page loaded) are
+        # reported as missing, the rest are still served.
+        game_servers = GameServer.query.filter(GameServer.id.in_(server_ids)).all()
+        missing_ids = server_ids - {server.id for server in game_servers}
+
+        for server in game_servers:
+            if not user_has_permissions(
+                current_user, "server-statuses", server.install_name
+            ):
+                resp_dict = {"Error": "Permission Denied!"}
+                response = Response(
+                    json.dumps(resp_dict, indent=4),
+                    status=403,
+                    mimetype="application/json",
+                )
+                return response
+
+    # Served from the status monitor's cache, only probes if there's no
+    # monitor running to do so. The elapsed_ms of each server is from the
+    # last probe of it.
+    start = time.perf_counter()
+    max_age = status_monitor.read_intervals()[0] * 2
+    deadline = time.time() + STATUS_WAIT
+    server_statuses = []
+    for server in game_servers:
+        wait = max(deadline - time.time(), 0)
+        server_statuses.append(status_monitor.get(server, wait=wait, max_age=max_age))
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    resp_dict = {
+        "servers": server_statuses,
+        "missing": sorted(missing_ids),
+        "elapsed_ms": elapsed_ms,
+    }
     current_app.logger.info(log_wrap("resp_dict", resp_dict))
 
     response = Response(
@@ -609,18 +706,352 @@ def get_status():
     return response
 
 
+######### API Server Metrics #########
+
+@views.route("/api/server-metrics", methods=["GET"])
+@login_required
+def get_server_metrics():
+    # Collect args from GET request. If no server supplied get metrics of all
+    # servers user has access to.
+    server_name = request.args.get("server")
+
+    if server_name == None or server_name == "":
+        all_servers = GameServer.query.filter_by(install_finished=True).all()
+        game_servers = [
+            server
+            for server in all_servers
+            if user_has_permissions(
+                current_user, "server-statuses", server.install_name
+            )
+        ]
+    else:
+        server = GameServer.query.filter_by(install_name=server_name).first()
+        if server == None:
+            resp_dict = {"Error": "Invalid server"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+            )
+            return response
+
+        if not user_has_permissions(current_user, "server-statuses", server_name):
+            resp_dict = {"Error": "Permission Denied!"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=403, mimetype="application/json"
+            )
+            return response
+        game_servers = [server]
+
+    # Served from the last process sweep, never sweeps itself. Remote installs
+    # aren't swept, their processes aren't on this machine.
+    metrics = []
+    for server in game_servers:
+        entry = server_metrics.get(server.id)
+        if entry == None:
+            entry = {
+                "server_id": server.id,
+                "server": server.install_name,
+                "supported": server.install_type in LOCAL_INSTALL_TYPES,
+            }
+        else:
+            entry = dict(entry, supported=True)
+        metrics.append(entry)
+
+    resp_dict = {"servers": metrics, "interval": server_metrics.interval}
+    response = Response(
+        json.dumps(resp_dict, indent=4), status=200, mimetype="application/json"
+    )
+    return response
+
+
 ######### API System Usage #########
 
 @views.route("/api/system-usage", methods=["GET"])
 @login_required
 def get_stats():
-    server_stats = get_server_stats()
+    # Collect args from GET request. If host supplied get stats of that remote
+    # host instead of this one.
+    host = request.args.get("host")
+    history = request.args.get("history")
+
+    if history != None:
+        try:
+            history = int(history)
+        except ValueError:
+            resp_dict = {"Error": "Invalid history"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+            )
+            return response
+
+    if host == None or host == "":
+        # Latest background sample, optionally with the last N samples.
+        server_stats = dict(system_sampler.latest())
+        if history != None:
+            server_stats["history"] = system_sampler.history(history)
+
+        response = Response(
+            json.dumps(server_stats, indent=4), status=200, mimetype="application/json"
+        )
+        return response
+
+    remote_servers = GameServer.query.filter_by(
+        install_type="remote", install_host=host
+    ).all()
+    if not remote_servers:
+        resp_dict = {"Error": "Invalid host"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    # Users can see a host's usage if they can see a server on it.
+    if not any(
+        user_has_permissions(current_user, "server-statuses", server.install_name)
+        for server in remote_servers
+    ):
+        resp_dict = {"Error": "Permission Denied!"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=403, mimetype="application/json"
+        )
+        return response
+
+    # Served from the last background ssh sample, never samples itself.
+    server_stats = remote_metrics.latest(host)
+    if server_stats == None:
+        resp_dict = {"Error": "No samples for host yet"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=503, mimetype="application/json"
+        )
+        return response
+
+    server_stats = dict(server_stats)
+    if history != None:
+        server_stats["history"] = remote_metrics.history(host, history)
+
     response = Response(
         json.dumps(server_stats, indent=4), status=200, mimetype="application/json"
     )
     return response
 
 
+######### API Metrics History #########
+
+@views.route("/api/metrics-history", methods=["GET"])
+@login_required
+def get_metrics_history():
+    # Collect args from GET request. Source is "local" (this host),
+    # "host:HOSTNAME" (a remote host), or "server:NAME" (a game server). If
+    # target supplied each series is downsampled to that many points.
+    source = request.args.get("source") or "local"
+    metrics = request.args.get("metrics")
+    target = request.args.get("target")
+    now = time.time()
+
+    try:
+        end = float(request.args.get("end", now))
+        start = float(request.args.get("start", end - 3600))
+        # Downsampling reads finer points than it returns, so picks from a
+        # finer resolution.
+        default_points = MAX_POINTS if target == None else 10 * MAX_POINTS
+        max_points = int(request.args.get("points", default_points))
+    except ValueError:
+        resp_dict = {"Error": "Invalid range"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    # float() takes "nan" & "inf" too.
+    if not (math.isfinite(start) and math.isfinite(end)):
+        resp_dict = {"Error": "Invalid range"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    if start >= end or not 0 < max_points <= 10 * MAX_POINTS:
+        resp_dict = {"Error": "Invalid range"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    if target != None:
+        try:
+            target = int(target)
+        except ValueError:
+            target = 0
+
+    if target != None and not 3 <= target <= MAX_POINTS:
+        resp_dict = {"Error": "Invalid target"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    kind, _, name = source.partition(":")
+    if kind == "local" and name == "":
+        source_metrics = HOST_METRICS
+        store_source = "local"
+
+    elif kind == "host" and name != "":
+        remote_servers = GameServer.query.filter_by(
+            install_type="remote", install_host=name
+        ).all()
+        if not remote_servers:
+            resp_dict = {"Error": "Invalid host"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+            )
+            return response
+
+        # Users can see a host's usage if they can see a server on it.
+        if not any(
+            user_has_permissions(current_user, "server-statuses", server.install_name)
+            for server in remote_servers
+        ):
+            resp_dict = {"Error": "Permission Denied!"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=403, mimetype="application/json"
+            )
+            return response
+        source_metrics = HOST_METRICS
+        store_source = source
+
+    elif kind == "server" and name != "":
+        server = GameServer.query.filter_by(install_name=name).first()
+        if server == None:
+            resp_dict = {"Error": "Invalid server"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+            )
+            return response
+
+        if not user_has_permissions(current_user, "server-statuses", name):
+            resp_dict = {"Error": "Permission Denied!"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=403, mimetype="application/json"
+            )
+            return response
+        source_metrics = SERVER_METRICS
+        store_source = f"server:{server.id}"
+
+    else:
+        resp_dict = {"Error": "Invalid source"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    if metrics == None or metrics == "":
+        metrics = list(source_metrics)
+    else:
+        metrics = metrics.split(",")
+        if not set(metrics) <= set(source_metrics):
+            resp_dict = {"Error": "Invalid metrics"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+            )
+            return response
+
+    # Resolution is picked so each series has at most max_points points.
+    history = metrics_store.query(
+        [series_name(store_source, metric) for metric in metrics],
+        start,
+        end,
+        max_points,
+        now,
+    )
+    resp_dict = {
+        "source": source,
+        "start": start,
+        "end": end,
+        "resolution": history["resolution"],
+        "target": target,
+        "series": {},
+    }
+    for metric in metrics:
+        points = history["series"][series_name(store_source, metric)]
+        if target != None:
+            points = downsample(points, target)
+        resp_dict["series"][metric] = points
+    response = Response(
+        json.dumps(resp_dict, indent=4), status=200, mimetype="application/json"
+    )
+    return response
+
+
+######### API App Stats #########
+
+@views.route("/api/app-stats", methods=["GET"])
+@login_required
+def get_app_stats():
+    # Internal counters are for admins only.
+    if current_user.role != "admin":
+        resp_dict = {"Error": "Permission Denied!"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=403, mimetype="application/json"
+        )
+        return response
+
+    app_stats = {
+        "ssh_pool": ssh_pool.stats(),
+        "status_monitor": status_monitor.stats(),
+        "consoles": console_stats(),
+        "single_flight": single_flight.stats(),
+        "jobs": job_executor.stats(),
+        "output_publisher": output_publisher.stats(),
+        "json_registry": json_registry.stats(),
+        "permissions": permissions_cache.stats(),
+        "users": user_cache.stats(),
+        "system_sampler": system_sampler.stats(),
+        "server_metrics": server_metrics.stats(),
+        "remote_metrics": remote_metrics.stats(),
+        "metrics_history": metrics_recorder.stats(),
+    }
+    response = Response(
+        json.dumps(app_stats, indent=4), status=200, mimetype="application/json"
+    )
+    return response
+
+
+######### API Jobs #########
+
+@views.route("/api/jobs", methods=["GET"])
+@login_required
+def get_jobs():
+    # Collect args from GET request.
+    job_id = request.args.get("id")
+
+    # Jobs from every worker.
+    jobs = job_executor.registry()
+
+    if job_id != None:
+        jobs = [job for job in jobs if job["id"] == job_id]
+        if not jobs:
+            resp_dict = {"Error": "Invalid id"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+            )
+            return response
+
+    # Only show jobs for game servers the user can see output for.
+    jobs = [
+        job
+        for job in jobs
+        if (job["server"] == None and current_user.role == "admin")
+        or (
+            job["server"] != None
+            and user_has_permissions(current_user, "cmd-output", job["server"])
+        )
+    ]
+
+    response = Response(
+        json.dumps(jobs, indent=4), status=200, mimetype="application/json"
+    )
+    return response
+
+
 ######### API CMD Output Page #########
 
 @views.route("/api/cmd-output", methods=["GET"])
@@ -639,8 +1070,10 @@ def no_output():
         )
         return response
 
-    # Can't do anything if we don't recognize the server_name.
-    if server_name not in servers:
+    # Can't do anything if we don't recognize the server_name. Output can be
+    # this worker's or published by another worker.
+    output = output_publisher.find(server_name, servers.get(server_name))
+    if output == None:
         resp_dict = {"error": "eer never heard of em"}
         response = Response(
             json.dumps(resp_dict, indent=4), status=200, mimetype="application/json"
@@ -654,13 +1087,203 @@ def no_output():
         )
         return response
 
-    # If its a server in the servers dict set the output object to the
-    # one from that dictionary.
-    if server_name in servers:
-        output = servers[server_name]
+    # Console mode reads straight from the server's console stream.
+    if request.args.get("console") == "true":
+        if not user_has_permissions(current_user, "update-console"):
+            resp_dict = {"Error": "Permission Denied!"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=403, mimetype="application/json"
+            )
+            return response
+
+        console = find_console_stream(server_name)
+        if console == None:
+            resp_dict = {"Error": "No console output for supplied server!"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+            )
+            return response
+        output = console.proc_info
+
+    # Optional cursor, only return what changed after seq number since.
+    since = request.args.get("since")
+    if since != None:
+        try:
+            since = int(since)
+        except ValueError:
+            resp_dict = {"Error": "Invalid since"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+            )
+            return response
+
+    # Tag before reading, so a change in between is never hidden by a 304.
+    etag = output.etag()
+
+    if since == None:
+        # Returns json for used by ajax code on /controls route.
+        response = Response(output.toJSON(), status=200, mimetype="application/json")
+    else:
+        resp_dict = output.changes_since(since)
+        response = Response(
+            json.dumps(resp_dict, sort_keys=True, indent=4),
+            status=200,
+            mimetype="application/json",
+        )
+
+    # Turns into a 304 if client's If-None-Match is still current.
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+@views.route("/api/cmd-output-history", methods=["GET"])
+@login_required
+def cmd_output_history():
+    global servers
+
+    # Collect args from GET request.
+    server_name = request.args.get("server")
+    stream = request.args.get("stream", "stdout")
+    before = request.args.get("before")
+    limit = request.args.get("limit", 200)
+
+    if server_name == None:
+        resp_dict = {"Error": "Required var: server"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    # Checked first, so the response never tells whether the server exists.
+    if not user_has_permissions(current_user, "cmd-output", server_name):
+        resp_dict = {"Error": "Permission Denied!"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=403, mimetype="application/json"
+        )
+        return response
 
-    # Returns json for used by ajax code on /controls route.
-    response = Response(output.toJSON(), status=200, mimetype="application/json")
+    # Output may be held by another worker.
+    proc_info = output_publisher.find(server_name, servers.get(server_name))
+    if proc_info == None:
+        resp_dict = {"Error": "No output for supplied server!"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    if stream not in ("stdout", "stderr"):
+        resp_dict = {"Error": "Invalid stream"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    try:
+        if before != None:
+            before = int(before)
+        limit = min(max(int(limit), 1), 1000)
+    except ValueError:
+        resp_dict = {"Error": "Invalid before or limit"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    # Pages back through output, including what's been spilled to disk.
+    lines, first_seq = proc_info.history(stream, before, limit)
+
+    # Pass before back in to get the previous page. No lines means no more.
+    resp_dict = {"stream": stream, "lines": lines, "before": first_seq}
+    response = Response(
+        json.dumps(resp_dict, indent=4), status=200, mimetype="application/json"
+    )
+    return response
+
+
+@views.route("/api/cmd-output-stream", methods=["GET"])
+@login_required
+def cmd_output_stream():
+    global servers
+
+    # Collect args from GET request.
+    server_name = request.args.get("server")
+
+    if server_name == None:
+        resp_dict = {"Error": "Required var: server"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    proc_info = output_publisher.find(server_name, servers.get(server_name))
+    if proc_info == None:
+        resp_dict = {"Error": "No output for supplied server!"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+        )
+        return response
+
+    if not user_has_permissions(current_user, "cmd-output", server_name):
+        resp_dict = {"Error": "Permission Denied!"}
+        response = Response(
+            json.dumps(resp_dict, indent=4), status=403, mimetype="application/json"
+        )
+        return response
+
+    console = None
+
+    # Console mode reads straight from the server's console stream.
+    if request.args.get("console") == "true":
+        if not user_has_permissions(current_user, "update-console"):
+            resp_dict = {"Error": "Permission Denied!"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=403, mimetype="application/json"
+            )
+            return response
+
+        # Stream connection counts as a viewer for as long as it's open.
+        token = f"stream-{uuid.uuid4()}"
+        server = GameServer.query.filter_by(install_name=server_name).first()
+        if server != None:
+            console = get_console_stream(server, token)
+        if server == None or console == None:
+            resp_dict = {"Error": "No console output for supplied server!"}
+            response = Response(
+                json.dumps(resp_dict, indent=4), status=400, mimetype="application/json"
+            )
+            return response
+        proc_info = console.proc_info
+
+    # Browsers send back the id of the last event they got when reconnecting.
+    last_seq = request.headers.get("Last-Event-ID", request.args.get("since", 0))
+    try:
+        last_seq = int(last_seq)
+    except ValueError:
+        last_seq = 0
+
+    def generate(seq):
+        deadline = time.time() + STREAM_MAX_AGE
+        yield "retry: 1000\n\n"
+
+        while time.time() < deadline:
+            if not proc_info.wait_for_change(seq, timeout=STREAM_KEEPALIVE):
+                yield ": keep-alive\n\n"
+                continue
+
+            changes = proc_info.changes_since(seq)
+            seq = changes["seq"]
+            yield f"id: {seq}\nevent: output\ndata: {json.dumps(changes)}\n\n"
+
+    # Server-Sent Events stream, only pushes what changed.
+    response = Response(
+        generate(last_seq),
+        status=200,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    if console != None:
+        response.call_on_close(lambda: console.unsubscribe(token))
     return response
 
 
@@ -673,11 +1296,7 @@ def settings():
     if not user_has_permissions(current_user, "settings"):
         return redirect(url_for("views.home"))
 
-    # Since settings also writes to config, open config parse here too.
-    config = configparser.ConfigParser()
-    config.read("main.conf")
-
-    # But still pull all settings from read_config() wrapper.
+    # Pull all settings from read_config() wrapper.
     config_options = read_config("settings")
     current_app.logger.info(log_wrap("config_options", config_options))
 
@@ -689,6 +1308,9 @@ def settings():
             config_options=config_options,
         )
 
+    # Since settings also writes to config, get an editable copy here.
+    config = settings_cache.parser()
+
     # TODO v1.9: Retrieve form options via separate function like read_config()
     # (maybe read_form()) to cleanup the mess that is the block of text below.
     text_color_pref = request.form.get("text_color")
@@ -784,7 +1406,7 @@ def settings():
         config["aesthetic"]["show_stats"] = "yes"
 
     # Set default text area height setting.
-    config["aesthetic"]["terminal_height"] = config_options["terminal_height"]
+    config["aesthetic"]["terminal_height"] = str(config_options["terminal_height"])
     if height_pref:
         # Validate terminal height is int.
         try:
@@ -801,8 +1423,8 @@ def settings():
         # Have to cast back to string to save in config.
         config["aesthetic"]["terminal_height"] = str(height_pref)
 
-    with open("main.conf", "w") as configfile:
-        config.write(configfile)
+    # Atomic write, also drops the cached snapshot.
+    settings_cache.write(config)
 
     # Update's the weblgsm.
     if update_weblgsm:
@@ -815,13 +1437,13 @@ def settings():
         flash(status)
 
         cmd = ["./web-lgsm.py", "--restart"]
-        restart_daemon = Thread(
-            target=run_cmd_popen,
-            args=(cmd, ProcInfoVessel(), current_app.app_context()),
-            daemon=True,
+        job_executor.submit(
+            run_cmd_popen,
+            cmd,
+            ProcInfoVessel(),
+            current_app.app_context(),
             name="restart",
         )
-        restart_daemon.start()
         return redirect(url_for("views.settings"))
 
     flash("Settings Updated!")
@@ -1028,6 +1650,15 @@ def delete():
 
         if server_name in servers:
             del servers[server_name]
+        remove_output_spills(server_name)
+
+        remove_console_stream(server_name)
+        output_publisher.unregister(server_name)
+        output_publisher.unregister(f"{server_name}-console")
+        status_cache.remove(server.id)
+        single_flight.forget(server.id)
+        server_metrics.remove(server.id)
+        metrics_recorder.forget_server(server.id)
 
         # Log to ensure delete from global servers worked.
         current_app.logger.info(log_wrap("servers", servers))
@@ -29,6 +29,7 @@ PKILL = '/usr/bin/pkill'
 sys.path.append(CWD)
 from app import db
 from app.models import User, GameServer
+from app.db_setup import setup_engine
 
 # Global options hash.
 O = {"dry": False, "keep": False}
@@ -61,7 +62,7 @@ def db_get(server_id):
     Returns:
         GameServer: GameServer object matching ID.
     """
-    engine = create_engine('sqlite:///app/database.db')
+    engine = setup_engine(create_engine('sqlite:///app/database.db'))
     
     # Use new db session context.
     # Can't use app context in ansible connector.
@@ -241,7 +242,7 @@ def run_install_new_game_server(server_id):
 
     # Mark finished with new session context.
     # Can't use app context in ansible connector.
-    engine = create_engine('sqlite:///app/database.db')
+    engine = setup_engine(create_engine('sqlite:///app/database.db'))
     with Session(engine) as session:
         server = session.get(GameServer, server_id)
         server.install_finished = True
@@ -1,5 +1,6 @@
 #!/usr/bin/env bash
-# Updates database to ensure has required fields for v1.8.
+# Updates database to ensure has required fields for v1.8 & switches it to
+# SQLite's WAL journal mode. Safe to re-run.
 
 set -e
 [[ $1 =~ '-d' ]] && set -x
@@ -16,7 +17,8 @@ if ! [[ -e $(which sqlite3) ]]; then
 fi
 
 echo "Backing up existing DB..."
-cp database.db database.db.bak
+# Online backup, a plain cp can miss changes still in the WAL file.
+sqlite3 database.db ".backup database.db.bak"
 
 mig_schema_sql=$(cat <<'EOF'
 -- Add new columns to `user`
@@ -40,6 +42,17 @@ UPDATE game_server SET is_container = 0, install_type = 'local', install_host =
 EOF
 )
 
-sqlite3 database.db <<< $mig_schema_sql
+# Only pre v1.6 databases are missing the new columns.
+if ! sqlite3 database.db "PRAGMA table_info(user);" | grep -q '|role|'; then
+    echo "Adding v1.6 fields..."
+    sqlite3 database.db <<< $mig_schema_sql
+fi
+
+# Readers don't block the writer. Persists in the db file. Username &
+# install_name lookups are already indexed by their UNIQUE constraints.
+tuning_sql="PRAGMA journal_mode=WAL;"
+
+echo "Applying SQLite tuning..."
+sqlite3 database.db <<< $tuning_sql > /dev/null
 
 echo "Database Update Completed!"
@@ -878,6 +878,111 @@ def test_system_usage(app, client):
         assert isinstance(network["bytes_recv_rate"], float)
 
 
+### API server-statuses tests.
+# Test unknown ids don't fail the whole request.
+def test_server_statuses_missing_ids(app, client):
+    with client:
+        # Log test user in.
+        response = client.post(
+            "/login", data={"username": USERNAME, "password": PASSWORD}
+        )
+        assert response.status_code == 302
+
+        response = client.get("/api/server-statuses?ids=999998,999999")
+        assert response.status_code == 200
+        resp_json = json.loads(response.data.decode())
+        assert resp_json["servers"] == []
+        assert resp_json["missing"] == [999998, 999999]
+
+        response = client.get("/api/server-statuses?ids=abc")
+        assert response.status_code == 400
+
+
+### API cmd-output-stream tests.
+# Smoke test, two output streams & the cmd they watch all run at once, each on
+# its own thread, same as gunicorn's gthread workers serve them.
+def test_output_streams_concurrent(app):
+    import threading
+    from app.views import servers
+    from app.utils import (
+        get_server_proc_info,
+        job_executor,
+        output_publisher,
+        run_cmd_popen,
+    )
+
+    with app.app_context():
+        proc_info = get_server_proc_info("StreamTest")
+    servers["StreamTest"] = proc_info
+
+    def watch(lines):
+        client = app.test_client()
+        response = client.post(
+            "/login", data={"username": USERNAME, "password": PASSWORD}
+        )
+        assert response.status_code == 302
+
+        response = client.get(
+            "/api/cmd-output-stream?server=StreamTest", buffered=False
+        )
+        for chunk in response.iter_encoded():
+            if not chunk.startswith(b"id:"):
+                continue
+            changes = json.loads(chunk.decode().split("data: ", 1)[1])
+            lines.extend(line.strip() for line in changes["stdout"])
+            if changes["process_lock"] == False and changes["exit_status"] != None:
+                break
+        response.close()
+
+    results = [[], []]
+    watchers = [
+        threading.Thread(target=watch, args=(lines,), daemon=True)
+        for lines in results
+    ]
+    try:
+        for watcher in watchers:
+            watcher.start()
+        time.sleep(0.5)
+
+        cmd = ["/bin/sh", "-c", "for i in 1 2 3; do echo line $i; sleep 0.2; done"]
+        job_executor.submit(
+            run_cmd_popen,
+            cmd,
+            proc_info,
+            app.app_context(),
+            proc_info=proc_info,
+            server_name="StreamTest",
+        )
+
+        for watcher in watchers:
+            watcher.join(timeout=10)
+            assert watcher.is_alive() == False
+        assert results == [["line 1", "line 2", "line 3"]] * 2
+    finally:
+        del servers["StreamTest"]
+        output_publisher.unregister("StreamTest")
+
+
+### API metrics-history tests.
+# Test bad ranges are rejected.
+def test_metrics_history_range(app, client):
+    with client:
+        # Log test user in.
+        response = client.post(
+            "/login", data={"username": USERNAME, "password": PASSWORD}
+        )
+        assert response.status_code == 302
+
+        response = client.get("/api/metrics-history")
+        assert response.status_code == 200
+        assert "cpu_usage" in json.loads(response.data.decode())["series"]
+
+        for query in ("start=nan", "end=inf", "start=-inf", "start=10&end=5"):
+            response = client.get(f"/api/metrics-history?{query}")
+            assert response.status_code == 400
+            assert json.loads(response.data.decode()) == {"Error": "Invalid range"}
+
+
 ### Edit page tests.
 # Test edit page basic content.
 def test_edit_content(app, client):
@@ -1370,6 +1475,27 @@ def game_server_start_stop(client):
     assert b'"process_lock": false' in client.get("/api/cmd-output?server=Minecraft").data
 #    print(client.get("/api/cmd-output?server=Minecraft").data.decode("utf8"))
 
+    # Check incremental output cursor.
+    response = client.get("/api/cmd-output?server=Minecraft&since=0")
+    assert response.status_code == 200
+    json_data = json.loads(response.data.decode("utf8"))
+    assert len(json_data["stdout"]) > 0
+    seq = json_data["seq"]
+
+    response = client.get(f"/api/cmd-output?server=Minecraft&since={seq}")
+    assert response.status_code == 200
+    json_data = json.loads(response.data.decode("utf8"))
+    assert json_data["stdout"] == []
+    assert json_data["seq"] == seq
+
+    # Nothing changed, so 304.
+    etag = response.headers["ETag"]
+    response = client.get(
+        f"/api/cmd-output?server=Minecraft&since={seq}",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
     #    print("######################## Minecraft Start Log\n")
     #    os.system("cat Minecraft/logs/script/mcserver-script.log")
     #    os.system("cat Minecraft/log/server/latest.log")
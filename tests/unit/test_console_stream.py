@@ -0,0 +1,127 @@
+import time
+import shutil
+import threading
+import subprocess
+import pytest
+from app.console_stream import (
+    ConsoleStream,
+    console_streams,
+    reap_console_streams,
+    ere_escape,
+)
+from app.proc_info_vessel import ProcInfoVessel
+
+
+# Mock game server class.
+class ModGameServer:
+    def __init__(self):
+        self.install_name = "Minecraft"
+        self.install_path = "/home/mcserver/GameServers/Minecraft"
+        self.script_name = "mcserver"
+
+
+def test_build_cmd():
+    console = ConsoleStream(ModGameServer())
+    cmd = console.build_cmd(ModGameServer(), "mcserver-abcd")
+
+    assert cmd[:2] == ["/bin/sh", "-c"]
+    assert "#{pane_pipe}" in cmd[2]
+    assert "pipe-pane -t mcserver" in cmd[2]
+    assert "tail -n 200 -F" in cmd[2]
+    assert "Minecraft/log/console/mcserver-console.log" in cmd[2]
+
+
+@pytest.mark.skipif(shutil.which("tmux") == None, reason="Needs tmux")
+def test_pipe_script_keeps_existing_pipe(tmp_path):
+    server = ModGameServer()
+    server.install_path = str(tmp_path)
+    console = ConsoleStream(server)
+    socket = "web-lgsm-test-pipe"
+    tmux = ["tmux", "-L", socket]
+    subprocess.run(tmux + ["new-session", "-d", "-s", "mcserver"], check=True)
+
+    try:
+        # Running it twice (ex: follower restarts) must not toggle the pipe off.
+        for _ in range(2):
+            script = console.pipe_script(server, socket)
+            subprocess.run(["/bin/sh", "-c", script], check=True)
+            piped = subprocess.run(
+                tmux + ["display", "-p", "-t", "mcserver", "#{pane_pipe}"],
+                capture_output=True,
+                text=True,
+            )
+            assert piped.stdout.strip() == "1"
+    finally:
+        subprocess.run(tmux + ["kill-server"])
+
+
+def test_mirror_into():
+    console = ConsoleStream(ModGameServer())
+    proc_info = ProcInfoVessel()
+    proc_info.stdout.append("old cmd output\n")
+
+    # Console (re)started, server's output is replaced with console history.
+    console.proc_info.stdout.clear()
+    console.proc_info.stdout.extend(["line 1\n", "line 2\n"])
+    console.mirror_into(proc_info)
+    assert list(proc_info.stdout) == ["line 1\n", "line 2\n"]
+
+    # Only new lines get copied after that.
+    console.proc_info.stdout.append("line 3\n")
+    console.mirror_into(proc_info)
+    console.mirror_into(proc_info)
+    assert list(proc_info.stdout) == ["line 1\n", "line 2\n", "line 3\n"]
+
+
+def test_last_viewer_stops_follower():
+    console = ConsoleStream(ModGameServer())
+
+    # Stand in for a running follow cmd.
+    proc = subprocess.Popen(["sleep", "30"])
+    console.proc_info.pid = proc.pid
+    console.thread = threading.Thread(target=proc.wait, daemon=True)
+    console.thread.start()
+    console_streams["Minecraft"] = console
+
+    try:
+        console.subscribe("stream-1")
+        console.subscribe("lease-1", ttl=0.2)
+        assert console.subscribers() == 2
+
+        # Lease expires, stream viewer is still there.
+        time.sleep(0.3)
+        reap_console_streams()
+        assert console.subscribers() == 1
+        assert console.is_running() == True
+
+        # Last viewer leaves, follow cmd gets stopped.
+        console.unsubscribe("stream-1")
+        reap_console_streams()
+        console.thread.join(timeout=5)
+        assert console.is_running() == False
+        assert proc.poll() != None
+    finally:
+        del console_streams["Minecraft"]
+        proc.kill()
+
+
+def test_docker_stop_kills_inside_container():
+    console = ConsoleStream(ModGameServer())
+
+    # Stand ins for the docker exec client & the tail it runs in the container.
+    client = subprocess.Popen(["sleep", "30"])
+    follower = subprocess.Popen(["sleep", "30.5"])
+    console.proc_info.pid = client.pid
+    console.thread = threading.Thread(target=follower.wait, daemon=True)
+    console.thread.start()
+    console.docker_stop_cmd = ["pkill", "-x", "-f", ere_escape("sleep 30.5")]
+
+    try:
+        console.stop()
+        console.thread.join(timeout=5)
+        assert follower.poll() != None
+        # Follower is only matched by its exact cmdline.
+        assert client.poll() == None
+    finally:
+        client.kill()
+        follower.kill()
@@ -0,0 +1,18 @@
+import os
+from sqlalchemy import create_engine, text
+from app.db_setup import setup_engine, BUSY_TIMEOUT
+
+
+def test_setup_engine(tmp_path):
+    db_path = os.path.join(tmp_path, "database.db")
+    engine = setup_engine(create_engine(f"sqlite:///{db_path}"))
+    # Setting up twice doesn't add a second listener.
+    setup_engine(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == BUSY_TIMEOUT
+        # NORMAL.
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+
+    engine.dispose()
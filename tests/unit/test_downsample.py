@@ -0,0 +1,42 @@
+import math
+import pytest
+from app.downsample import lttb_indices, downsample
+
+
+def test_lttb_keeps_shape():
+    xs = list(range(1000))
+    ys = [math.sin(x / 50) for x in xs]
+    # One spike, flattened by averaging, kept by lttb.
+    ys[500] = 10.0
+
+    kept = lttb_indices(xs, ys, 100, use_numpy=False)
+    assert len(kept) == 100
+    assert kept[0] == 0
+    assert kept[-1] == 999
+    assert kept == sorted(set(kept))
+    assert 500 in kept
+
+    # Nothing to drop.
+    assert lttb_indices(xs[:50], ys[:50], 100) == list(range(50))
+    assert lttb_indices(xs[:50], ys[:50], 2) == list(range(50))
+
+
+def test_numpy_matches_python():
+    pytest.importorskip("numpy")
+
+    xs = list(range(5000))
+    ys = [math.sin(x / 7) * (x % 13) for x in xs]
+    for threshold in (3, 10, 333, 4999):
+        assert lttb_indices(xs, ys, threshold) == lttb_indices(
+            xs, ys, threshold, use_numpy=False
+        )
+
+
+def test_downsample_points():
+    points = [{"time": t, "min": 0, "max": t, "avg": t % 7} for t in range(300)]
+
+    kept = downsample(points, 30)
+    assert len(kept) == 30
+    assert kept[0] is points[0]
+    assert kept[-1] is points[-1]
+    assert downsample(points[:10], 30) == points[:10]
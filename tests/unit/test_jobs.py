@@ -0,0 +1,164 @@
+import time
+import threading
+from app.jobs import JobExecutor
+from app.proc_info_vessel import ProcInfoVessel
+
+
+def wait_for(executor, count):
+    for i in range(100):
+        if executor.stats()["completed"] + executor.stats()["failed"] == count:
+            return
+        time.sleep(0.05)
+
+
+def test_lane_limit_queues():
+    executor = JobExecutor(interactive_workers=2, heavy_workers=1, host_limit=10)
+    release = threading.Event()
+
+    jobs = [
+        executor.submit(release.wait, name="Command", host=f"host{i}")
+        for i in range(5)
+    ]
+    time.sleep(0.2)
+
+    # Pool doesn't grow past its limit, the rest wait in line.
+    stats = executor.stats()
+    assert stats["lanes"]["interactive"]["workers"] == 2
+    assert stats["lanes"]["interactive"]["running"] == 2
+    assert stats["lanes"]["interactive"]["queued"] == 3
+    assert [job.state for job in jobs].count("queued") == 3
+
+    # Heavy lane has its own workers.
+    heavy = executor.submit(lambda: 0, name="Install_Minecraft", lane="heavy")
+    wait_for(executor, 1)
+    assert heavy.state == "finished"
+    assert heavy.started_at >= heavy.created_at
+
+    release.set()
+    wait_for(executor, 6)
+    assert all(job.state == "finished" for job in jobs)
+    assert executor.stats()["max_wait_ms"] > 0
+
+
+def test_burst_runs_concurrently():
+    executor = JobExecutor(interactive_workers=4, host_limit=4)
+
+    # Leaves one idle worker behind.
+    executor.submit(lambda: 0)
+    wait_for(executor, 1)
+    time.sleep(0.1)
+
+    # A burst must not all land on that one idle worker.
+    start = time.time()
+    for i in range(4):
+        executor.submit(time.sleep, 0.5)
+    wait_for(executor, 5)
+    assert time.time() - start < 1.5
+    assert executor.stats()["lanes"]["interactive"]["workers"] == 4
+
+
+def test_host_limit():
+    executor = JobExecutor(interactive_workers=4, host_limit=1)
+    release = threading.Event()
+
+    first = executor.submit(release.wait, host="10.0.0.2")
+    second = executor.submit(release.wait, host="10.0.0.2")
+    other = executor.submit(release.wait, host="10.0.0.3")
+    time.sleep(0.2)
+
+    assert first.state == "running"
+    assert second.state == "queued"
+    assert other.state == "running"
+    assert executor.stats()["hosts"] == {"10.0.0.2": 1, "10.0.0.3": 1}
+
+    release.set()
+    wait_for(executor, 3)
+    assert second.state == "finished"
+
+
+def test_host_limit_per_lane():
+    executor = JobExecutor(interactive_workers=2, heavy_workers=2, host_limit=2)
+    release = threading.Event()
+
+    # Two installs saturate the heavy lane's share of the host.
+    installs = [
+        executor.submit(release.wait, lane="heavy", host="127.0.0.1")
+        for _ in range(2)
+    ]
+    queued = executor.submit(release.wait, lane="heavy", host="127.0.0.1")
+    # Start / stop cmds on the same host still run.
+    start = executor.submit(lambda: 0, host="127.0.0.1")
+    wait_for(executor, 1)
+
+    assert all(job.state == "running" for job in installs)
+    assert queued.state == "queued"
+    assert start.state == "finished"
+    assert executor.stats()["hosts"] == {"127.0.0.1": 2}
+
+    release.set()
+    wait_for(executor, 4)
+    assert queued.state == "finished"
+
+
+def test_exit_status_and_cancel():
+    executor = JobExecutor(interactive_workers=1)
+    release = threading.Event()
+
+    proc_info = ProcInfoVessel()
+
+    def failing_cmd():
+        proc_info.exit_status = 3
+
+    def broken_cmd():
+        raise RuntimeError("no such file")
+
+    blocker = executor.submit(release.wait)
+    failing = executor.submit(failing_cmd, proc_info=proc_info, server_name="mc")
+    broken = executor.submit(broken_cmd)
+    time.sleep(0.1)
+
+    # Queued jobs can be taken off the queue, running ones can't.
+    assert executor.cancel(broken.id) == True
+    assert executor.cancel(blocker.id) == False
+    assert broken.state == "cancelled"
+
+    release.set()
+    wait_for(executor, 2)
+    assert failing.state == "failed"
+    assert failing.exit_status == 3
+    assert failing.toJSON()["server"] == "mc"
+    assert executor.get(failing.id) == failing
+    assert len(executor.jobs(active=True)) == 0
+
+
+def test_queued_cmd_output_stays_open():
+    executor = JobExecutor(interactive_workers=1)
+    release = threading.Event()
+    proc_info = ProcInfoVessel()
+
+    def cmd():
+        release.wait()
+        proc_info.process_lock = False
+
+    # Previous run's output is done, a new cmd queues behind a busy worker.
+    proc_info.process_lock = False
+    blocker = executor.submit(release.wait)
+    queued = executor.submit(cmd, proc_info=proc_info)
+    time.sleep(0.1)
+
+    changes = proc_info.changes_since(0)
+    assert queued.state == "queued"
+    assert changes["process_lock"] == False
+    assert changes["queued"] == 1
+
+    release.set()
+    wait_for(executor, 2)
+    assert proc_info.changes_since(0)["queued"] == 0
+
+    # Cancelled cmds don't leave viewers waiting either.
+    release.clear()
+    blocker = executor.submit(release.wait)
+    cancelled = executor.submit(cmd, proc_info=proc_info)
+    assert executor.cancel(cancelled.id) == True
+    assert proc_info.queued == 0
+    release.set()
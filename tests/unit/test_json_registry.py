@@ -0,0 +1,89 @@
+import os
+import json
+import pytest
+from app.json_registry import JsonRegistry
+
+
+@pytest.fixture
+def json_dir(tmp_path):
+    files = {
+        "commands.json": {
+            "short_cmds": ["st", "sp", "c", "sd"],
+            "long_cmds": ["start", "stop", "console", "send"],
+            "descriptions": ["Start it.", "Stop it.", "Console.", "Send cmd."],
+        },
+        "ctrl_exemptions.json": {
+            "bf1942server": {
+                "short_cmds": ["c"],
+                "long_cmds": ["console"],
+                "descriptions": ["Console."],
+            }
+        },
+        "accepted_cfgs.json": {"accepted_cfgs": ["common.cfg", "server.cfg"]},
+        "game_servers.json": {
+            "servers": ["mcserver", "ahlserver"],
+            "server_names": ["Minecraft", "Action: Half-Life"],
+        },
+    }
+    for name, data in files.items():
+        with open(os.path.join(tmp_path, name), "w") as f:
+            json.dump(data, f)
+    return str(tmp_path)
+
+
+def test_command_tables(json_dir):
+    registry = JsonRegistry(json_dir)
+
+    shorts = [cmd.short_cmd for cmd in registry.commands("mcserver", True)]
+    assert shorts == ["st", "sp", "c", "sd"]
+
+    # Send cmd disabled & exemptions applied.
+    shorts = [cmd.short_cmd for cmd in registry.commands("bf1942server", False)]
+    assert shorts == ["st", "sp"]
+
+    assert registry.command("mcserver", True, "sd").long_cmd == "send"
+    assert registry.command("mcserver", False, "sd") == None
+    assert registry.command("bf1942server", True, "c") == None
+    assert registry.command("mcserver", True, ["st"]) == None
+
+
+def test_lookups(json_dir):
+    registry = JsonRegistry(json_dir)
+
+    assert registry.is_accepted_cfg("server.cfg") == True
+    assert registry.is_accepted_cfg("fart.cfg") == False
+    assert registry.accepted_cfgs() == ("common.cfg", "server.cfg")
+
+    assert registry.servers() == {
+        "mcserver": "Minecraft",
+        "ahlserver": "Action: Half-Life",
+    }
+    assert registry.script_name_for_dir("Action_Half-Life") == "ahlserver"
+    assert registry.script_name_for_dir("Action: Half-Life") == None
+
+
+def test_reload_on_change(json_dir):
+    registry = JsonRegistry(json_dir)
+
+    # Only parsed once while file is unchanged.
+    first = registry.servers()
+    assert registry.servers() is first
+    assert registry.loads == 1
+
+    path = os.path.join(json_dir, "game_servers.json")
+    with open(path, "w") as f:
+        json.dump({"servers": ["vhserver"], "server_names": ["Valheim"]}, f)
+
+    assert registry.servers() == {"vhserver": "Valheim"}
+    assert registry.loads == 2
+
+    # Broken file raises & isn't cached, fixing it recovers.
+    with open(path, "w") as f:
+        f.write("{")
+    with pytest.raises(json.JSONDecodeError):
+        registry.servers()
+    assert registry.errors == 1
+
+    with open(path, "w") as f:
+        json.dump({"servers": ["mcserver"], "server_names": ["Minecraft"]}, f)
+    assert registry.servers() == {"mcserver": "Minecraft"}
@@ -0,0 +1,36 @@
+from app.line_assembler import LineAssembler
+
+
+def test_lines_across_chunks():
+    assembler = LineAssembler()
+    assert assembler.feed(b"hello wo") == []
+    assert assembler.feed(b"rld\nsecond") == ["hello world\n"]
+    assert assembler.feed(b" line\n\nthird") == ["second line\n"]
+    assert assembler.flush() == ["third\n"]
+
+
+def test_carriage_returns():
+    assembler = LineAssembler()
+    assert assembler.feed(b"10%\r20%\r") == ["10%\r"]
+    # CR at end of chunk might be first half of a CRLF.
+    assert assembler.feed(b"\n") == ["20%\n"]
+    assert assembler.feed(b"crlf\r\nnext\n") == ["crlf\n", "next\n"]
+
+    assembler = LineAssembler(end_in_newlines=True)
+    assert assembler.feed(b"10%\r20%\rdone\n") == ["10%\r\n", "20%\r\n", "done\n"]
+
+
+def test_split_multibyte_chars():
+    data = "héllo wörld ✓\n".encode("utf-8")
+    assembler = LineAssembler()
+
+    lines = []
+    for i in range(len(data)):
+        lines += assembler.feed(data[i : i + 1])
+    assert lines == ["héllo wörld ✓\n"]
+
+
+def test_max_line():
+    assembler = LineAssembler(max_line=10)
+    assert assembler.feed(b"x" * 11) == ["x" * 11 + "\n"]
+    assert assembler.flush() == []
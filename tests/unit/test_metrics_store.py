@@ -0,0 +1,91 @@
+import os
+import time
+import pytest
+from app.metrics_store import MetricsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricsStore(os.path.join(tmp_path, "metrics.db"))
+
+
+def test_rollups(store):
+    # Two minutes of raw points, 10s apart, starting on an hour boundary.
+    start = 3600 * 1000
+    store.write([("local.cpu_usage", start + i * 10, i) for i in range(12)])
+
+    # Raw points are kept as is.
+    raw = store.query(["local.cpu_usage"], start, start + 110, now=start + 120)
+    assert raw["resolution"] == 10
+    assert [p["avg"] for p in raw["series"]["local.cpu_usage"]] == list(range(12))
+
+    # Each minute bucket has its points' min, max, & avg.
+    minutes = store.query(
+        ["local.cpu_usage"], start, start + 110, max_points=5, now=start + 120
+    )
+    assert minutes["resolution"] == 60
+    assert minutes["series"]["local.cpu_usage"] == [
+        {"time": start, "min": 0.0, "max": 5.0, "avg": 2.5},
+        {"time": start + 60, "min": 6.0, "max": 11.0, "avg": 8.5},
+    ]
+
+    # Series without points come back empty.
+    both = store.query(["local.cpu_usage", "local.rss"], start, start + 110)
+    assert both["series"]["local.rss"] == []
+
+
+def test_pick_resolution(store):
+    now = 1000000000
+    day = 86400
+
+    assert store.pick_resolution(now - 3600, now, now=now) == 0
+    assert store.pick_resolution(now - 3600, now, max_points=100, now=now) == 60
+    # Raw points only go back 6 hours.
+    assert store.pick_resolution(now - 7 * 3600, now, max_points=10000, now=now) == 60
+    assert store.pick_resolution(now - 7 * day, now, now=now) == 900
+    assert store.pick_resolution(now - 30 * day, now, now=now) == 3600
+
+
+def test_compact_and_delete(store):
+    now = 1000000000
+    store.write([("local.cpu_usage", now - 7 * 3600, 1), ("local.rss", now, 2)])
+
+    # Old raw point is dropped, its rollups are kept.
+    store.compact(now)
+    query = store.query(["local.cpu_usage"], now - 8 * 3600, now, 10000, now)
+    assert query["resolution"] == 60
+    assert len(query["series"]["local.cpu_usage"]) == 1
+    then = now - 7 * 3600
+    raw = store.query(["local.cpu_usage"], then - 60, then + 60, now=then)
+    assert raw["resolution"] == 10
+    assert raw["series"]["local.cpu_usage"] == []
+
+    store.delete(["local.rss"])
+    query = store.query(["local.rss"], now - 60, now, now=now)
+    assert query["series"]["local.rss"] == []
+
+    stats = store.stats()
+    assert stats["writes"] == 1
+    assert stats["points"] == 2
+    assert stats["compactions"] == 1
+
+
+def test_month_query_is_fast(store):
+    # 30 days of hourly rollups for 40 servers.
+    now = 3600 * 500000
+    series = [f"server:{i}.cpu_percent" for i in range(40)]
+    store.write(
+        [
+            (name, now - hour * 3600, hour % 100)
+            for name in series
+            for hour in range(720)
+        ]
+    )
+
+    start = time.perf_counter()
+    query = store.query(series, now - 30 * 86400, now, now=now)
+    elapsed = time.perf_counter() - start
+
+    assert query["resolution"] == 3600
+    assert all(len(points) == 720 for points in query["series"].values())
+    assert elapsed < 1
@@ -0,0 +1,81 @@
+import os
+import pytest
+from app.proc_info_vessel import ProcInfoVessel
+
+
+@pytest.fixture
+def proc_info(tmp_path):
+    return ProcInfoVessel(
+        max_lines=100, max_bytes=10000, spill_path=os.path.join(tmp_path, "server")
+    )
+
+
+def test_buffer_list_ops(proc_info):
+    proc_info.stdout.append("first\n")
+    proc_info.stdout.extend(["second\n", "third\n"])
+
+    assert len(proc_info.stdout) == 3
+    assert proc_info.stdout[0] == "first\n"
+    assert "second\n" in proc_info.stdout
+    assert list(proc_info.stdout) == ["first\n", "second\n", "third\n"]
+    assert proc_info.stdout == ["first\n", "second\n", "third\n"]
+
+    proc_info.stdout.clear()
+    assert len(proc_info.stdout) == 0
+
+
+def test_buffer_line_cap_spills(proc_info, tmp_path):
+    for i in range(1000):
+        proc_info.stdout.append(f"line {i}\n")
+
+    # Memory stays under cap, rest is on disk.
+    assert len(proc_info.stdout) <= 100
+    assert proc_info.stdout[-1] == "line 999\n"
+    assert proc_info.stdout.evicted + len(proc_info.stdout) == 1000
+    assert os.path.isfile(os.path.join(tmp_path, "server-stdout.log"))
+    assert not os.path.exists(os.path.join(tmp_path, "server-stderr.log"))
+
+    # Page back through everything, memory & spilled.
+    lines = []
+    before = None
+    while True:
+        page, before = proc_info.stdout.history(before, limit=64)
+        if not page:
+            break
+        lines = page + lines
+
+    assert lines == [f"line {i}\n" for i in range(1000)]
+
+    proc_info.remove_spill()
+    assert not os.path.exists(os.path.join(tmp_path, "server-stdout.log"))
+
+
+def test_buffer_byte_cap(proc_info):
+    for i in range(50):
+        proc_info.stderr.append("x" * 999 + "\n")
+
+    assert len(proc_info.stderr) <= 10
+    page, before = proc_info.stderr.history(limit=50)
+    assert len(page) == 50
+
+
+def test_buffer_clear_restarts_spill(proc_info):
+    for i in range(200):
+        proc_info.stdout.append(f"old {i}\n")
+    proc_info.stdout.clear()
+
+    for i in range(200):
+        proc_info.stdout.append(f"new {i}\n")
+
+    page, before = proc_info.stdout.history(limit=1000)
+    assert page == [f"new {i}\n" for i in range(200)]
+
+
+def test_buffer_no_spill_drops_old():
+    proc_info = ProcInfoVessel(max_lines=10)
+    for i in range(100):
+        proc_info.stdout.append(f"line {i}\n")
+
+    assert len(proc_info.stdout) <= 10
+    page, before = proc_info.stdout.history(limit=100)
+    assert page == list(proc_info.stdout)
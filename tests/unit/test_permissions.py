@@ -0,0 +1,56 @@
+import json
+import pytest
+import dataclasses
+from app.permissions import PermissionsCache, compile_permissions
+
+
+# Mock user class.
+class ModUser:
+    def __init__(self, id, role, permissions):
+        self.id = id
+        self.role = role
+        self.permissions = permissions
+
+
+def test_compile_permissions():
+    permissions = {
+        "install_servers": True,
+        "add_servers": False,
+        "controls": ["start", "stop"],
+        "servers": ["mc1"],
+    }
+    perms = compile_permissions("user", json.dumps(permissions))
+
+    assert perms.install_servers == True
+    # Missing flags default to False.
+    assert perms.mod_settings == False
+    assert perms.has_server("mc1") == True
+    assert perms.has_server("mc2") == False
+    assert perms.has_control("stop") == True
+    assert perms.has_control("console") == False
+
+    admin = compile_permissions("admin", json.dumps({"admin": True}))
+    assert admin.has_server("mc2") == True
+    assert admin.has_control("console") == True
+
+    # Compiled permissions are read only.
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        perms.install_servers = False
+
+
+def test_cache_versioned_by_permissions():
+    cache = PermissionsCache()
+    user = ModUser(2, "user", json.dumps({"servers": ["mc1"]}))
+
+    first = cache.get(user)
+    assert cache.get(user) is first
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+    # Changed permissions are never served stale, even w/o invalidate().
+    user.permissions = json.dumps({"servers": ["mc2"]})
+    assert cache.get(user).has_server("mc2") == True
+    assert cache.misses == 2
+
+    cache.invalidate(2)
+    assert cache.stats()["users"] == 0
@@ -0,0 +1,101 @@
+import json
+import threading
+from app.proc_info_vessel import ProcInfoVessel
+
+
+def test_changes_since():
+    proc_info = ProcInfoVessel()
+    proc_info.process_lock = True
+    proc_info.stdout.append("line 1\n")
+    proc_info.stderr.append("err 1\n")
+
+    changes = proc_info.changes_since(0)
+    assert changes["stdout"] == ["line 1\n"]
+    assert changes["stderr"] == ["err 1\n"]
+    assert changes["process_lock"] == True
+    assert changes["reset"] == False
+
+    seq = changes["seq"]
+    proc_info.stdout.append("line 2\n")
+    changes = proc_info.changes_since(seq)
+    assert changes["stdout"] == ["line 2\n"]
+    assert changes["stderr"] == []
+
+    # Nothing new.
+    assert proc_info.changes_since(changes["seq"])["stdout"] == []
+
+
+def test_changes_since_reset():
+    proc_info = ProcInfoVessel()
+    proc_info.stdout.append("old\n")
+    seq = proc_info.seq
+
+    proc_info.stdout.clear()
+    proc_info.stdout.append("new\n")
+    changes = proc_info.changes_since(seq)
+    assert changes["reset"] == True
+    assert changes["stdout"] == ["new\n"]
+
+    # Seq from some other vessel, aka after restart.
+    changes = proc_info.changes_since(1000)
+    assert changes["reset"] == True
+    assert changes["stdout"] == ["new\n"]
+
+
+def test_changes_since_truncated():
+    proc_info = ProcInfoVessel(max_lines=10)
+    proc_info.stdout.append("seen\n")
+    seq = proc_info.seq
+    assert proc_info.changes_since(0)["truncated"] == False
+
+    # Lines past the caller's cursor get evicted before it reads them.
+    for i in range(20):
+        proc_info.stdout.append(f"line {i}\n")
+    changes = proc_info.changes_since(seq)
+    assert changes["truncated"] == True
+    assert changes["stdout"][-1] == "line 19\n"
+
+    # Caller that kept up didn't miss anything.
+    assert proc_info.changes_since(changes["seq"])["truncated"] == False
+
+    # Clearing starts over.
+    proc_info.stdout.clear()
+    proc_info.stdout.append("new\n")
+    assert proc_info.changes_since(0)["truncated"] == False
+
+
+def test_wait_for_change():
+    proc_info = ProcInfoVessel()
+    assert proc_info.wait_for_change(0, timeout=0.01) == False
+
+    threading.Timer(0.05, proc_info.stdout.append, args=("line\n",)).start()
+    assert proc_info.wait_for_change(0, timeout=5) == True
+
+
+def test_to_json():
+    proc_info = ProcInfoVessel()
+    proc_info.stdout.append("line\n")
+    proc_info.process_lock = False
+    proc_info.exit_status = 0
+
+    json_str = proc_info.toJSON()
+    assert '"process_lock": false' in json_str
+    assert json.loads(json_str) == {
+        "stdout": ["line\n"],
+        "stderr": [],
+        "process_lock": False,
+        "pid": None,
+        "exit_status": 0,
+    }
+
+
+def test_etag():
+    proc_info = ProcInfoVessel()
+    etag = proc_info.etag()
+    assert proc_info.etag() == etag
+
+    proc_info.stdout.append("line\n")
+    assert proc_info.etag() != etag
+
+    # Different vessels at same seq never share an etag.
+    assert ProcInfoVessel().etag() != ProcInfoVessel().etag()
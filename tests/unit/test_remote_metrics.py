@@ -0,0 +1,99 @@
+from app.remote_metrics import RemoteMetrics, build_script, parse_sample
+
+
+def script_output(cpu_total, cpu_idle, recv, sent):
+    # Canned output of build_script()'s script, cpu line has 8 counters.
+    user = cpu_total - cpu_idle
+    return [
+        "@stat\n",
+        f"cpu  {user} 0 0 {cpu_idle} 0 0 0 0 0 0\n",
+        "cpu0 1 0 0 1 0 0 0 0 0 0\n",
+        "cpu1 1 0 0 1 0 0 0 0 0 0\n",
+        "@meminfo\n",
+        "MemTotal:        4000 kB\n",
+        "MemFree:          500 kB\n",
+        "MemAvailable:    1000 kB\n",
+        "@loadavg\n",
+        "1.00 0.50 0.25 1/100 1234\n",
+        "@netdev\n",
+        "Inter-|   Receive                            |  Transmit\n",
+        " face |bytes    packets errs drop fifo frame compressed multicast|bytes\n",
+        "    lo: 999 1 0 0 0 0 0 0 999 1 0 0 0 0 0 0\n",
+        f"  eth0: {recv} 1 0 0 0 0 0 0 {sent} 1 0 0 0 0 0 0\n",
+        "@df\n",
+        "%/home/gs/mcserver\n",
+        "/dev/sda1 1000 400 600 40% /home\n",
+        "%/home/gs/missing\n",
+        "%/srv/gs\n",
+        "my disk 3000 300 2700 10% /srv\n",
+        "%/home/gs/rustserver\n",
+        "/dev/sda1 1000 400 600 40% /home\n",
+    ]
+
+
+def test_build_script():
+    script = build_script(["/home/gs/mc", "/home/gs/it's", "/home/gs/mc"])
+
+    # One df per distinct install path, each path quoted.
+    assert script.count("df -Pk") == 2
+    assert "'/home/gs/it'\"'\"'s'" in script
+    for section in ("@stat", "@meminfo", "@loadavg", "@netdev", "@df"):
+        assert f"echo {section};" in script
+
+
+def test_parse_sample():
+    sample, counters = parse_sample(script_output(1000, 800, 5000, 2000), now=100)
+
+    # No previous counters, cpu usage is load1 per cpu & rates are 0.
+    assert sample["cpu"]["cpus"] == 2
+    assert sample["cpu"]["load1"] == 1.0
+    assert sample["cpu"]["cpu_usage"] == 50.0
+    assert sample["network"]["bytes_sent_rate"] == 0.0
+
+    assert sample["mem"]["total"] == 4000 * 1024
+    assert sample["mem"]["free"] == 1000 * 1024
+    assert sample["mem"]["percent_used"] == 75.0
+
+    # Missing paths are skipped & shared filesystems counted once.
+    disks = sample["disks"]
+    assert [disk["path"] for disk in disks] == [
+        "/home/gs/mcserver",
+        "/srv/gs",
+        "/home/gs/rustserver",
+    ]
+    assert disks[1]["mount"] == "/srv"
+    assert sample["disk"]["total"] == 4000 * 1024
+    assert sample["disk"]["used"] == 700 * 1024
+
+    # Deltas since the previous sample.
+    sample, _ = parse_sample(script_output(2000, 1550, 8000, 2500), counters, 110)
+    assert sample["cpu"]["cpu_usage"] == 25.0
+    assert sample["network"]["bytes_recv_rate"] == 300.0
+    assert sample["network"]["bytes_sent_rate"] == 50.0
+    assert sample["time"] == 110
+
+
+def test_history_and_backoff():
+    metrics = RemoteMetrics(interval=10, size=3)
+    for now in range(5):
+        metrics.record("gs1", script_output(1000, 800, 5000, 2000), now + 1)
+
+    # Only the newest size samples are kept, oldest first.
+    history = metrics.history("gs1", 10)
+    assert [sample["time"] for sample in history] == [3, 4, 5]
+    assert metrics.latest("gs1")["host"] == "gs1"
+    assert metrics.latest("gs2") == None
+
+    # Unreachable hosts back off exponentially, up to the max.
+    metrics.fail("gs2", 0)
+    assert metrics._hosts["gs2"]["next_check"] == 20
+    metrics.fail("gs2", 0)
+    assert metrics._hosts["gs2"]["next_check"] == 40
+    for _ in range(10):
+        metrics.fail("gs2", 0)
+    assert metrics._hosts["gs2"]["next_check"] == 600
+
+    stats = metrics.stats()
+    assert stats["samples"] == 5
+    assert stats["failures"] == 12
+    assert stats["hosts"]["gs1"]["buffered"] == 3
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import pytest
+import psutil
+import subprocess
+from app.server_metrics import ServerMetrics, tmux_socket_name
+
+# Child that listens on a tcp port, so the tree has a socket to find.
+LISTENER = (
+    "import socket, time; s = socket.socket(); s.bind(('127.0.0.1', 0)); "
+    "s.listen(); time.sleep(30)"
+)
+
+
+def test_tmux_socket_name():
+    assert tmux_socket_name(["tmux: server (/tmp/tmux-1000/mc-abc)"]) == "mc-abc"
+    assert tmux_socket_name(["tmux", "-L", "mc-abc", "new-session"]) == "mc-abc"
+    assert tmux_socket_name(["tmux", "-Lmc-abc", "list-session"]) == "mc-abc"
+    assert tmux_socket_name(["tmux", "new-session"]) == None
+
+
+@pytest.fixture
+def fake_tmux(tmp_path):
+    # Shell named tmux, started w/ a -L socket, w/ a listener & sleep under it.
+    tmux = os.path.join(tmp_path, "tmux")
+    os.symlink("/bin/sh", tmux)
+    script = f'{sys.executable} -c "{LISTENER}" & sleep 30 & wait'
+    proc = subprocess.Popen([tmux, "-c", script, "-L", "mc-test"])
+    time.sleep(0.5)
+    yield proc
+    for child in psutil.Process(proc.pid).children(recursive=True):
+        child.kill()
+    proc.kill()
+    proc.wait()
+
+
+def test_sweep_process_tree(fake_tmux):
+    metrics = ServerMetrics()
+    servers = [(1, "mc", "mc-test"), (2, "off", "mc-nope")]
+
+    first = metrics.sweep(servers)
+    assert first[2]["running"] == False
+    entry = first[1]
+    assert entry["running"] == True
+    assert entry["pid"] == fake_tmux.pid
+    assert entry["processes"] == 3
+    assert entry["rss"] > 0
+    assert entry["threads"] >= 3
+    # Needs a previous sweep.
+    assert entry["cpu_percent"] == None
+
+    second = metrics.sweep(servers)[1]
+    assert isinstance(second["cpu_percent"], float)
+    assert len(second["tcp_ports"]) == 1
+    assert second["binary"]["name"].startswith("python")
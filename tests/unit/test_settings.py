@@ -0,0 +1,69 @@
+import os
+import pytest
+import dataclasses
+from app.settings import SettingsCache
+
+
+@pytest.fixture
+def conf_path(tmp_path):
+    conf_path = os.path.join(tmp_path, "main.conf")
+    with open(conf_path, "w") as conf:
+        conf.write(
+            "[aesthetic]\n"
+            "text_color = #ffffff\n"
+            "terminal_height = tall\n"
+            "[settings]\n"
+            "send_cmd = yes\n"
+            "status_interval = 30\n"
+            "[server]\n"
+            "port = 8080\n"
+        )
+    return conf_path
+
+
+def test_typed_snapshot(conf_path):
+    settings = SettingsCache(conf_path).get()
+
+    assert settings.aesthetic.text_color == "#ffffff"
+    # Unparseable & missing options get defaults.
+    assert settings.aesthetic.terminal_height == 10
+    assert settings.settings.cfg_editor == False
+    assert settings.settings.end_in_newlines == True
+    assert settings.debug.log_level == "info"
+
+    assert settings.settings.send_cmd == True
+    assert settings.settings.status_interval == 30
+    assert settings.server.port == 8080
+
+    # Snapshots are read only.
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        settings.settings.send_cmd = False
+
+
+def test_reload_on_change(conf_path):
+    cache = SettingsCache(conf_path)
+
+    # Only parsed once while file is unchanged.
+    first = cache.get()
+    assert cache.get() is first
+    assert cache.loads == 1
+
+    # Atomic write replaces the file & drops the snapshot.
+    os.chmod(conf_path, 0o640)
+    config = cache.parser()
+    config["settings"]["send_cmd"] = "no"
+    cache.write(config)
+    assert cache.get().settings.send_cmd == False
+    assert cache.loads == 2
+    assert os.listdir(os.path.dirname(conf_path)) == ["main.conf"]
+    assert os.stat(conf_path).st_mode & 0o777 == 0o640
+
+    # Changes made behind the cache's back get picked up too.
+    with open(conf_path, "a") as conf:
+        conf.write("[debug]\ndebug = yes\n")
+    assert cache.get().debug.debug == True
+
+
+def test_missing_file(tmp_path):
+    cache = SettingsCache(os.path.join(tmp_path, "missing.conf"))
+    assert cache.get().server.host == "127.0.0.1"
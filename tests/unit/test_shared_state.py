@@ -0,0 +1,168 @@
+import os
+import pytest
+from app.shared_state import SharedState, OutputPublisher, SharedVessel
+from app.proc_info_vessel import ProcInfoVessel
+from app.status_monitor import StatusCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return os.path.join(tmp_path, "shared_state.db")
+
+
+def test_values_and_leases(db_path):
+    # Two workers sharing one db.
+    worker1 = SharedState(db_path)
+    worker2 = SharedState(db_path)
+
+    worker1.put("net", "sample", [1, 2, 3.0])
+    assert worker2.get("net", "sample") == [1, 2, 3.0]
+    assert worker2.get("net", "missing", "default") == "default"
+
+    # Only one worker holds a lease at a time.
+    assert worker1.acquire_lease("status_monitor", 30) == True
+    assert worker2.acquire_lease("status_monitor", 30) == False
+    assert worker1.acquire_lease("status_monitor", 30) == True
+
+    # Lapsed lease gets taken over.
+    worker1.acquire_lease("status_monitor", -1)
+    assert worker2.acquire_lease("status_monitor", 30) == True
+
+    # Leftovers from another run are wiped, same run's aren't.
+    worker1.reset("run1")
+    worker1.put("jobs", "abc", {"state": "running"})
+    worker2.reset("run1")
+    assert worker1.items("jobs") == {"abc": {"state": "running"}}
+    worker2.reset("run2")
+    assert worker1.items("jobs") == {}
+
+
+def test_output_published_to_other_worker(db_path):
+    worker1 = SharedState(db_path)
+    worker2 = SharedState(db_path)
+    publisher = OutputPublisher(worker1)
+
+    proc_info = ProcInfoVessel()
+    publisher.register("Minecraft", proc_info)
+    proc_info.process_lock = True
+    proc_info.stdout.extend(["line 1\n", "line 2\n"])
+    publisher.publish()
+
+    # Worker without a vessel of its own serves the published one.
+    vessel = OutputPublisher(worker2).find("Minecraft")
+    assert isinstance(vessel, SharedVessel)
+    changes = vessel.changes_since(0)
+    assert changes["stdout"] == ["line 1\n", "line 2\n"]
+    assert changes["process_lock"] == True
+    seq = changes["seq"]
+
+    # Cursor only gets what's new.
+    proc_info.stdout.append("line 3\n")
+    proc_info.process_lock = False
+    publisher.publish()
+    assert vessel.wait_for_change(seq, timeout=1) == True
+    changes = vessel.changes_since(seq)
+    assert changes["reset"] == False
+    assert changes["stdout"] == ["line 3\n"]
+    assert changes["process_lock"] == False
+
+    # Output cleared by a new cmd.
+    proc_info.stdout.clear()
+    proc_info.stdout.append("new run\n")
+    publisher.publish()
+    changes = vessel.changes_since(changes["seq"])
+    assert changes["reset"] == True
+    assert changes["stdout"] == ["new run\n"]
+
+    # Worker that ran the cmd keeps serving its own vessel.
+    assert publisher.find("Minecraft", proc_info) is proc_info
+
+    publisher.unregister("Minecraft")
+    assert OutputPublisher(worker2).find("Minecraft") == None
+
+
+def test_published_output_truncated(db_path):
+    worker1 = SharedState(db_path)
+    worker2 = SharedState(db_path)
+    publisher = OutputPublisher(worker1)
+
+    proc_info = ProcInfoVessel(max_lines=10)
+    publisher.register("Minecraft", proc_info)
+    proc_info.stdout.append("seen\n")
+    publisher.publish()
+    vessel = OutputPublisher(worker2).find("Minecraft")
+    seq = vessel.changes_since(0)["seq"]
+
+    # Published lines pruned past max_lines before the reader got them.
+    for i in range(4):
+        proc_info.stdout.extend([f"line {i}-{j}\n" for j in range(5)])
+        publisher.publish()
+    changes = vessel.changes_since(seq)
+    assert changes["truncated"] == True
+    assert changes["stdout"][-1] == "line 3-4\n"
+    assert vessel.changes_since(changes["seq"])["truncated"] == False
+
+    publisher.unregister("Minecraft")
+
+
+def test_published_output_history(db_path, tmp_path):
+    worker1 = SharedState(db_path)
+    worker2 = SharedState(db_path)
+    publisher = OutputPublisher(worker1)
+
+    # Output that's been spilled to disk by the worker running the cmd.
+    spill_path = os.path.join(tmp_path, "Minecraft-1234")
+    proc_info = ProcInfoVessel(max_lines=10, spill_path=spill_path)
+    publisher.register("Minecraft", proc_info)
+    for i in range(10):
+        proc_info.stdout.extend([f"line {i}-{j}\n" for j in range(5)])
+        publisher.publish()
+
+    # Other worker pages back through published output, then the spill file.
+    vessel = OutputPublisher(worker2).find("Minecraft")
+    lines = []
+    before = None
+    while True:
+        page, before = vessel.history("stdout", before, limit=7)
+        if not page:
+            break
+        lines = page + lines
+
+    assert lines == [f"line {i}-{j}\n" for i in range(10) for j in range(5)]
+    assert vessel.history("stderr") == ([], None)
+
+    publisher.unregister("Minecraft")
+
+
+def test_status_cache_shared(db_path):
+    leader = StatusCache(SharedState(db_path))
+    standby = StatusCache(SharedState(db_path))
+
+    leader.update([{"id": 1, "status": True, "elapsed_ms": 5, "host": "127.0.0.1"}])
+    assert standby.get(1)["status"] == True
+    assert standby.get(1)["stale"] == False
+
+    # Re-probes asked for by one worker get done by the leader.
+    standby.invalidate(1)
+    assert 1 in leader.dirty_ids()
+
+    leader.update([{"id": 1, "status": False, "elapsed_ms": 5, "host": "127.0.0.1"}])
+    assert leader.dirty_ids() == set()
+    entry = standby.get(1, wait=1)
+    assert entry["status"] == False
+    assert entry["stale"] == False
+
+
+def test_main_keeps_live_state(monkeypatch):
+    from app import main, BOOT_ID_ENV
+    from app.utils import shared_state
+    from app.status_monitor import status_monitor
+
+    # CLI cmds & tests building the app don't wipe a running server's state
+    # or start background threads.
+    monkeypatch.delenv(BOOT_ID_ENV, raising=False)
+    shared_state.put("test", "live", True)
+    main()
+    assert shared_state.get("test", "live") == True
+    assert status_monitor.thread == None
+    shared_state.delete("test")
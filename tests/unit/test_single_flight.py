@@ -0,0 +1,128 @@
+import time
+import threading
+import pytest
+from app.single_flight import SingleFlight
+
+
+# Mock game server class.
+class ModGameServer:
+    def __init__(self, server_id):
+        self.id = server_id
+
+
+def test_concurrent_calls_coalesce():
+    single_flight = SingleFlight()
+    calls = []
+
+    @single_flight.wrap("status")
+    def probe(server):
+        calls.append(server.id)
+        time.sleep(0.2)
+        return f"status {server.id}"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(probe(ModGameServer(1))))
+        for i in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Ten callers, one execution, everybody gets the same result.
+    assert calls == [1]
+    assert results == ["status 1"] * 10
+    assert single_flight.stats()["coalesced"] == 9
+
+    # Nothing cached with no ttl, different servers don't share.
+    assert probe(ModGameServer(1)) == "status 1"
+    assert probe(ModGameServer(2)) == "status 2"
+    assert calls == [1, 1, 2]
+
+
+def test_result_ttl_and_errors():
+    single_flight = SingleFlight()
+    calls = []
+
+    def probe():
+        calls.append(1)
+        return len(calls)
+
+    assert single_flight.do(("cfg_paths", 1), probe, ttl=60) == 1
+    assert single_flight.do(("cfg_paths", 1), probe, ttl=60) == 1
+    assert single_flight.stats()["cache_hits"] == 1
+
+    single_flight.forget(1)
+    assert single_flight.do(("cfg_paths", 1), probe, ttl=60) == 2
+
+    def broken():
+        raise RuntimeError("ssh down")
+
+    # Errors are raised to the caller, but never cached.
+    for i in range(2):
+        with pytest.raises(RuntimeError):
+            single_flight.do(("status", 1), broken, ttl=60)
+    assert single_flight.stats()["executions"] == 4
+
+
+def test_forget_detaches_in_flight_calls():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def probe():
+        calls.append(1)
+        status = "off" if len(calls) == 1 else "on"
+        started.set()
+        release.wait(5)
+        return status
+
+    # Probe starts before a start cmd finishes.
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(single_flight.do(("status", 1), probe))
+    )
+    thread.start()
+    started.wait(5)
+
+    # Callers after the cmd finished get a fresh probe, not the stale one.
+    single_flight.forget(1)
+    release.set()
+    assert single_flight.do(("status", 1), probe) == "on"
+    thread.join()
+    assert results == ["off"]
+
+
+def test_waiters_get_own_exception():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def broken():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("ssh down")
+
+    errors = []
+
+    def call():
+        try:
+            single_flight.do(("status", 1), broken)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for i in range(3)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    # Same error for everybody, but never the same object.
+    assert [str(e) for e in errors] == ["ssh down"] * 3
+    assert len({id(e) for e in errors}) == 3
@@ -0,0 +1,101 @@
+import pytest
+from app.ssh_pool import SSHConnectionPool
+
+
+# Mock paramiko client / transport / channel classes.
+class ModChannel:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ModTransport:
+    def __init__(self):
+        self.active = True
+        # Looks alive but fails to open channels, like a dropped connection.
+        self.broken = False
+
+    def is_active(self):
+        return self.active
+
+    def open_session(self):
+        if self.broken:
+            raise EOFError()
+        return ModChannel()
+
+
+class ModClient:
+    def __init__(self):
+        self.transport = ModTransport()
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.transport.active = False
+
+
+@pytest.fixture
+def pool():
+    pool = SSHConnectionPool(idle_timeout=300)
+    pool._connect = lambda hostname, username, key_filename: ModClient()
+    return pool
+
+
+def test_pool_reuses_transport(pool):
+    t1 = pool.get_transport("host", "user", "key")
+    t2 = pool.get_transport("host", "user", "key")
+    assert t1 is t2
+
+    stats = pool.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["open_connections"] == 1
+
+    # Different connection key gets its own transport.
+    t3 = pool.get_transport("host", "user2", "key")
+    assert t3 is not t1
+    assert pool.stats()["open_connections"] == 2
+
+
+def test_pool_reconnects_dead_transport(pool):
+    t1 = pool.get_transport("host", "user", "key")
+    t1.active = False
+
+    t2 = pool.get_transport("host", "user", "key")
+    assert t2 is not t1
+    assert t2.is_active() == True
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_pool_close_idle(pool):
+    channel = pool.open_session("host", "user", "key")
+
+    # Connections with open channels are never idle.
+    assert pool.close_idle(idle_timeout=0) == 0
+    assert pool.stats()["open_connections"] == 1
+
+    # Recently used connections aren't idle either.
+    channel.close()
+    assert pool.close_idle() == 0
+
+    assert pool.close_idle(idle_timeout=0) == 1
+    assert pool.stats()["open_connections"] == 0
+    assert pool.stats()["idle_closed"] == 1
+
+
+def test_pool_counts_reconnect_once(pool):
+    t1 = pool.get_transport("host", "user", "key")
+    t1.broken = True
+
+    # Channel open fails, pool reconnects & retries once.
+    channel = pool.open_session("host", "user", "key")
+    assert channel.closed == False
+    assert t1.active == False
+
+    stats = pool.stats()
+    assert stats["reconnects"] == 1
+    assert stats["misses"] == 2
+    assert stats["open_connections"] == 1
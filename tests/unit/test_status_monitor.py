@@ -0,0 +1,139 @@
+import os
+import time
+import socket
+import pytest
+import threading
+from app.status_monitor import StatusCache, StatusMonitor
+from app.tmux_watcher import TmuxSocketWatcher
+
+
+def result(server_id, status):
+    return {"id": server_id, "status": status, "host": "127.0.0.1", "elapsed_ms": 1}
+
+
+def test_cache_get_missing():
+    cache = StatusCache()
+    entry = cache.get(1)
+    assert entry["status"] == None
+    assert entry["stale"] == True
+    # Missing entries wake the monitor.
+    assert cache.wake.is_set() == True
+    assert 1 in cache.dirty_ids()
+
+
+def test_cache_update_and_max_age():
+    cache = StatusCache()
+    cache.update([result(1, True)])
+    entry = cache.get(1, max_age=60)
+    assert entry["status"] == True
+    assert entry["stale"] == False
+    assert cache.dirty_ids() == set()
+
+    entry = cache.get(1, max_age=-1)
+    assert entry["stale"] == True
+
+
+def test_cache_hold_waits_for_reprobe():
+    cache = StatusCache()
+    cache.update([result(1, False)])
+    cache.hold(1)
+
+    # Held entries aren't handed to the monitor until released.
+    assert cache.get(1)["stale"] == True
+    assert cache.dirty_ids() == set()
+
+    cache.release(1)
+    assert cache.dirty_ids() == {1}
+
+    # Simulate monitor re-probe while a reader is waiting.
+    threading.Timer(0.1, cache.update, args=([result(1, True)],)).start()
+    entry = cache.get(1, wait=5)
+    assert entry["status"] == True
+    assert entry["stale"] == False
+
+
+def test_run_held():
+    cache = StatusCache()
+    cache.update([result(1, False)])
+    held = []
+
+    # Only held while the cmd runs.
+    cache.run_held(1, lambda: held.append(cache.dirty_ids() == set()))
+    assert held == [True]
+    assert cache.dirty_ids() == {1}
+
+
+# Mock game server class.
+class ModGameServer:
+    def __init__(self):
+        self.id = 1
+        self.install_host = "127.0.0.1"
+
+
+def test_monitor_get_probes_without_thread(monkeypatch):
+    probes = []
+
+    def mock_status(server):
+        probes.append(server.id)
+        return True
+
+    monkeypatch.setattr("app.status_monitor.get_server_status", mock_status)
+    monitor = StatusMonitor(StatusCache())
+    assert monitor.is_running() == False
+
+    # No monitor thread to re-probe, missing entry is probed right away.
+    entry = monitor.get(ModGameServer(), wait=5, max_age=60)
+    assert entry["status"] == True
+    assert entry["stale"] == False
+    assert probes == [1]
+
+    # Fresh entries are served from the cache.
+    monitor.get(ModGameServer(), max_age=60)
+    assert probes == [1]
+
+    # Held by a running cmd, nobody else would re-probe it.
+    monitor.cache.hold(1)
+    monitor.get(ModGameServer(), max_age=60)
+    monitor.cache.release(1)
+    monitor.get(ModGameServer(), max_age=60)
+    assert probes == [1, 1, 1]
+
+
+def test_monitor_backoff():
+    monitor = StatusMonitor(StatusCache(), max_backoff=300)
+    now = time.time()
+    for _ in range(5):
+        monitor.schedule_host("host", False, now, 60, 120)
+    assert monitor._hosts["host"]["next_check"] == now + 300
+    assert monitor.stats()["unreachable_hosts"] == ["host"]
+
+    monitor.schedule_host("host", True, now, 60, 120)
+    assert monitor._hosts["host"]["next_check"] == now + 60
+    assert monitor.stats()["unreachable_hosts"] == []
+
+
+def test_watcher_pushes_socket_events(tmp_path):
+    cache = StatusCache()
+    watcher = TmuxSocketWatcher(cache)
+    if not watcher.start():
+        pytest.skip("inotify not available")
+
+    socket_path = os.path.join(tmp_path, "gameserver-1234")
+    watcher.watch({socket_path: 1})
+
+    def wait_for(status):
+        for _ in range(50):
+            if cache.get(1)["status"] == status:
+                return True
+            time.sleep(0.02)
+        return False
+
+    # Same as tmux server start / kill-server.
+    sock = socket.socket(socket.AF_UNIX)
+    sock.bind(socket_path)
+    assert wait_for(True) == True
+
+    sock.close()
+    os.unlink(socket_path)
+    assert wait_for(False) == True
+    assert watcher.stats()["events"] == 2
@@ -0,0 +1,38 @@
+import time
+from app.system_sampler import SystemSampler
+
+
+def test_ring_buffer():
+    calls = []
+
+    def sample_func():
+        calls.append(1)
+        return {"cpu": {"cpu_usage": float(len(calls))}}
+
+    sampler = SystemSampler(sample_func, interval=0.01, size=5)
+
+    # Samples on the spot if nothing's buffered yet.
+    assert sampler.latest()["cpu"]["cpu_usage"] == 1.0
+
+    for _ in range(9):
+        sampler.sample()
+
+    # Only the newest size samples are kept, oldest first.
+    history = sampler.history(100)
+    assert [s["cpu"]["cpu_usage"] for s in history] == [6.0, 7.0, 8.0, 9.0, 10.0]
+    assert [s["cpu"]["cpu_usage"] for s in sampler.history(2)] == [9.0, 10.0]
+    assert sampler.history(-1) == []
+    assert sampler.latest() is history[-1]
+    assert history[0]["time"] <= history[-1]["time"]
+
+
+def test_background_cadence():
+    sampler = SystemSampler(lambda: {}, interval=0.05, size=100)
+    sampler.start()
+    time.sleep(0.3)
+    sampler.stop()
+    sampler.thread.join(1)
+
+    stats = sampler.stats()
+    assert 3 <= stats["samples"] <= 8
+    assert stats["running"] == False
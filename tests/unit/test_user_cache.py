@@ -0,0 +1,66 @@
+import time
+import pytest
+from app.user_cache import UserCache
+from app.shared_state import SharedState
+
+
+# Mock user model class.
+class ModUser:
+    def __init__(self, id, username, permissions):
+        self.id = id
+        self.username = username
+        self.password = "hash"
+        self.role = "user"
+        self.permissions = permissions
+        self.date_created = None
+
+
+@pytest.fixture
+def db_users():
+    return {1: ModUser(1, "admin", "{}"), 2: ModUser(2, "bob", "{}")}
+
+
+def test_hits_evicts_and_expires(db_users):
+    loads = []
+
+    def loader(user_id):
+        loads.append(user_id)
+        return db_users.get(user_id)
+
+    cache = UserCache(max_users=1, ttl=0.2)
+
+    user = cache.get(1, loader)
+    assert user.username == "admin"
+    assert user.get_id() == "1"
+    assert cache.get(1, loader) is user
+    assert loads == [1]
+
+    # Unknown users aren't cached.
+    assert cache.get(3, loader) == None
+    assert cache.stats()["users"] == 1
+
+    # Least recently used user is evicted.
+    cache.get(2, loader)
+    cache.get(1, loader)
+    assert loads == [1, 3, 2, 1]
+
+    time.sleep(0.3)
+    cache.get(1, loader)
+    assert loads == [1, 3, 2, 1, 1]
+
+
+def test_invalidate_reaches_other_workers(tmp_path, db_users):
+    shared = SharedState(str(tmp_path / "shared_state.db"))
+    worker1 = UserCache(shared=shared)
+    worker2 = UserCache(shared=shared)
+    worker2.SYNC_INTERVAL = 0
+
+    loader = db_users.get
+    assert worker2.get(2, loader).permissions == "{}"
+
+    # Worker 1 changes the user's permissions.
+    db_users[2].permissions = '{"servers": ["mc1"]}'
+    worker1.invalidate(2)
+
+    assert worker2.get(2, loader).permissions == '{"servers": ["mc1"]}'
+    assert worker2.stats()["misses"] == 2
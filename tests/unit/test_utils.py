@@ -1,6 +1,7 @@
 import os
 import pytest
 import json
+import sys
 from app.utils import *
 
 
@@ -216,3 +217,105 @@ def test_get_server_stats():
     # Ensure the result can be serialized to JSON
     json_string = json.dumps(stats)
     assert isinstance(json_string, str)
+
+
+@pytest.mark.skipif(not os.path.isfile("/usr/bin/tmux"), reason="tmux not installed")
+def test_get_local_tmux_sockets():
+    socket_path = os.path.join(get_tmux_socket_dir(), "web-lgsm-test")
+
+    os.system("/usr/bin/tmux -L web-lgsm-test new-session -d 'sleep 30'")
+    try:
+        assert socket_path in get_local_tmux_sockets()
+    finally:
+        os.system("/usr/bin/tmux -L web-lgsm-test kill-server")
+
+    assert socket_path not in get_local_tmux_sockets()
+
+
+def test_run_cmd_popen_no_pipe_deadlock(app):
+    proc_info = ProcInfoVessel()
+
+    # Fills the stderr pipe before writing any stdout. Reading stdout to
+    # completion first would hang forever here.
+    script = "import sys; sys.stderr.write('e\\n' * 200000); print('done')"
+    with app.app_context():
+        run_cmd_popen([sys.executable, "-c", script], proc_info)
+
+    assert proc_info.exit_status == 0
+    assert list(proc_info.stdout) == ["done\n"]
+    assert proc_info.stderr.evicted + len(proc_info.stderr) == 200000
+
+
+
+def test_run_cmd_popen_pops_app_context(app):
+    from flask import has_app_context
+
+    # Job pool threads get reused, a cmd mustn't leave its context pushed.
+    proc_info = ProcInfoVessel()
+    run_cmd_popen(["true"], proc_info, app.app_context())
+
+    assert proc_info.exit_status == 0
+    assert has_app_context() == False
+
+
+# Mock paramiko channel, with all output already received.
+class ModSSHChannel:
+    def __init__(self, stdout, stderr):
+        self.out = {"stdout": stdout, "stderr": stderr}
+        self.pos = {"stdout": 0, "stderr": 0}
+        self.eof_received = True
+        self.closed = False
+        # Always readable, like paramiko's pipe after EOF.
+        self.read_fd, self.write_fd = os.pipe()
+        os.write(self.write_fd, b"x")
+
+    def fileno(self):
+        return self.read_fd
+
+    def set_combine_stderr(self, combine):
+        pass
+
+    def exec_command(self, cmd):
+        pass
+
+    def _recv(self, stream, nbytes):
+        pos = self.pos[stream]
+        self.pos[stream] += nbytes
+        return self.out[stream][pos : pos + nbytes]
+
+    def recv_ready(self):
+        return self.pos["stdout"] < len(self.out["stdout"])
+
+    def recv(self, nbytes):
+        return self._recv("stdout", nbytes)
+
+    def recv_stderr_ready(self):
+        return self.pos["stderr"] < len(self.out["stderr"])
+
+    def recv_stderr(self, nbytes):
+        return self._recv("stderr", nbytes)
+
+    def recv_exit_status(self):
+        return 0
+
+    def close(self):
+        self.closed = True
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+def test_run_cmd_ssh_output(app, monkeypatch):
+    # Repeated lines & lines split across 8 KiB chunk boundaries.
+    stdout = b"".join(f"update line {i % 100}\n".encode() for i in range(50000))
+    channel = ModSSHChannel(stdout, b"warning\n" * 3)
+    monkeypatch.setattr(ssh_pool, "open_session", lambda *args: channel)
+
+    proc_info = ProcInfoVessel(max_lines=100000, max_bytes=10000000)
+    with app.app_context():
+        assert run_cmd_ssh(["update"], "host", "user", "key", proc_info) == True
+
+    assert proc_info.exit_status == 0
+    assert len(proc_info.stdout) == 50000
+    assert proc_info.stdout[12345] == "update line 45\n"
+    assert list(proc_info.stderr) == ["warning\n"] * 3
+    assert channel.closed == True
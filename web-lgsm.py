@@ -4,6 +4,7 @@
 
 import os
 import sys
+import uuid
 import signal
 import subprocess
 
@@ -89,27 +90,21 @@ import getopt
 import shutil
 import string
 import getpass
-import configparser
 from dotenv import load_dotenv
 from werkzeug.security import generate_password_hash
 from app import db, main as appmain
 from app.models import User
-from app.utils import contains_bad_chars, check_and_get_lgsmsh
+from app.settings import SettingsCache
+from app.utils import contains_bad_chars, check_and_get_lgsmsh, invalidate_user
 
 # Import config data.
-CONFIG = configparser.ConfigParser()
-CONFIG.read(os.path.join(SCRIPTPATH, "main.conf"))
-try:
-    HOST = CONFIG["server"]["host"]
-    PORT = CONFIG["server"]["port"]
-    DEBUG = CONFIG["debug"].getboolean("debug")
-    LOG_LEVEL = CONFIG["debug"]["log_level"]
-except KeyError as e:
-    print(f" [!] Configuration setting {e} not set.")
-    HOST = "127.0.0.1"
-    PORT = "12357"
-    DEBUG = False
-    LOG_LEVEL = "info"
+SETTINGS = SettingsCache(os.path.join(SCRIPTPATH, "main.conf")).get()
+HOST = SETTINGS.server.host
+PORT = str(SETTINGS.server.port)
+WORKERS = SETTINGS.server.workers
+THREADS = max(SETTINGS.server.threads, 1)
+DEBUG = SETTINGS.debug.debug
+LOG_LEVEL = SETTINGS.debug.log_level
 
 os.environ["LOG_LEVEL"] = LOG_LEVEL
 
@@ -189,16 +184,28 @@ def start_server():
             error_log,
             "--log-level",
             LOG_LEVEL,
+            # Threaded workers, so long lived output streams only tie up a
+            # thread each. Not gevent, the app's background work is real
+            # threads & blocking calls (sqlite, psutil, pipe reads) that would
+            # stall a worker's whole event loop.
+            "--worker-class",
+            "gthread",
+            f"--threads={THREADS}",
+            # Workers share state through app/shared_state.db.
+            f"--workers={WORKERS}",
             f"--bind={HOST}:{PORT}",
             "--daemon",
             "app:main()",
         ]
         print(cmd)
+        # Marks this as a server run for app.main(), see BOOT_ID_ENV.
+        env = dict(os.environ, WEB_LGSM_BOOT_ID=uuid.uuid4().hex)
         process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            universal_newlines=True
+            universal_newlines=True,
+            env=env,
         )
         print(f" [*] Launched Gunicorn server with PID: {process.pid}")
     except Exception as e:
@@ -213,7 +220,7 @@ def start_debug():
 
     # For clean ctrl + c handling.
     signal.signal(signal.SIGINT, signalint_handler)
-    app = main()
+    app = main(background=True)
     app.run(debug=True, host=HOST, port=PORT)
 
 
@@ -290,6 +297,8 @@ def change_password():
     # Update the user's password hash
     user.password = generate_password_hash(password1, method="pbkdf2:sha256")
     db.session.commit()
+    # Make running web workers reload the user.
+    invalidate_user(user.id)
 
     print("Password updated successfully!")
 